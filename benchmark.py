@@ -0,0 +1,274 @@
+"""
+Benchmarks dos caminhos críticos da simulação, em vários tamanhos de parque.
+
+Cada caso mede a vazão (unidades/s) e o pico de memória alocada (tracemalloc) e o resultado
+é salvo em JSON. Com `--baseline` os números são comparados com uma execução anterior e as
+regressões acima da tolerância são apontadas (código de saída 1).
+
+Exemplos:
+    python benchmark.py --tamanhos 10 1000 10000 --saida bench_atual.json
+    python benchmark.py --baseline bench_atual.json --tolerancia 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from config import *
+from machine import Maquina
+from fleet_engine import FrotaVetorizada
+from logger import DataLogger
+from ml_model import MLModel
+from compiled_forest import caminho_compilado
+from simulator import Simulator
+from features import calcular_features_lote, NOMES_FEATURES
+from training_data import gerar_dados_treinamento
+
+MODELO_MAQUINA = "Prensa Hidráulica PH-300T"
+
+# --- Preparação compartilhada ---
+
+def treinar_modelo_pequeno(seed=0):
+    """Treina um RandomForest com os hiperparâmetros de `train_model.py` em poucos dados, para rodar offline."""
+    from sklearn.ensemble import RandomForestClassifier
+    df = calcular_features_lote(gerar_dados_treinamento(10, 1000, seed=seed)).dropna()
+    df = df[df['health_phase'] != FASES_SAUDE["Falha"]]
+    modelo = RandomForestClassifier(n_estimators=150, random_state=42, class_weight='balanced', n_jobs=-1,
+                                    max_depth=20, min_samples_leaf=5)
+    modelo.fit(df[NOMES_FEATURES], df['health_phase'])
+    return modelo
+
+def carregar_modelo(caminho):
+    ml_model = MLModel(model_path=caminho or "")
+    if not (caminho and ml_model.load()):
+        print("Benchmark: treinando um modelo pequeno para os casos de ML...")
+        ml_model.definir_modelo(treinar_modelo_pequeno())
+    return ml_model
+
+def matriz_features(n, seed=0):
+    df = calcular_features_lote(gerar_dados_treinamento(max(1, n // 200 + 1), 250, seed=seed)).dropna()
+    X = df[NOMES_FEATURES].to_numpy()
+    return X[np.random.default_rng(seed).integers(0, len(X), n)]
+
+# --- Casos: cada um recebe o tamanho e devolve (função a medir, unidades processadas por chamada) ---
+
+def caso_maquina_simular_tick(tamanho, contexto):
+    random.seed(0)
+    maquinas = [Maquina(machine_id=f"B-{i}", modelo=MODELO_MAQUINA) for i in range(tamanho)]
+    def executar():
+        for maquina in maquinas:
+            if maquina.health_phase == FASES_SAUDE["Falha"]:
+                maquina.concluir_reparo()
+            maquina.simular_tick()
+    return executar, tamanho
+
+def caso_frota_simular_tick(tamanho, contexto):
+    frota = FrotaVetorizada(MODELO_MAQUINA, seed=0)
+    frota.adicionar_maquinas([f"B-{i}" for i in range(tamanho)])
+    def executar():
+        frota.concluir_reparo(np.flatnonzero(frota.health_phase == FASES_SAUDE["Falha"]))
+        frota.simular_tick(np.arange(len(frota)))
+    return executar, tamanho
+
+def _caso_executar_ciclo(motor):
+    def caso(tamanho, contexto):
+        random.seed(0)
+        logger = DataLogger(base_dir=os.path.join(contexto["tmp"], f"ciclo_{motor}_{tamanho}"))
+        logger.setup_directories_and_logs()
+        simulator = Simulator(logger, contexto["ml_model"], motor=motor, tamanho_parque=tamanho)
+        simulator.inicializar_parque()
+        simulator.executar_ciclo()  # aquecimento: enche o histórico de 24h para o ML
+        def executar():
+            simulator.executar_ciclo()
+        return executar, tamanho * HORAS_POR_CICLO
+    return caso
+
+def caso_ml_predict(tamanho, contexto):
+    # Previsão linha a linha é lenta: limita o número de chamadas e reporta linhas/s
+    X = matriz_features(min(tamanho, 200))
+    linhas = [dict(zip(NOMES_FEATURES, linha)) for linha in X]
+    ml_model = contexto["ml_model"]
+    def executar():
+        for linha in linhas:
+            ml_model.predict(linha)
+    return executar, len(linhas)
+
+def caso_ml_predict_lote(tamanho, contexto):
+    X = matriz_features(tamanho)
+    ml_model = contexto["ml_model"]
+    def executar():
+        ml_model.predict_lote(X)
+    return executar, tamanho
+
+def caso_log_sensor_tick(tamanho, contexto):
+    random.seed(0)
+    logger = DataLogger(base_dir=os.path.join(contexto["tmp"], f"log_{tamanho}"))
+    logger.setup_directories_and_logs()
+    maquinas = [Maquina(machine_id=f"B-{i}", modelo=MODELO_MAQUINA) for i in range(tamanho)]
+    def executar():
+        for maquina in maquinas:
+            logger.log_sensor_tick(maquina)
+        logger.flush()
+    return executar, tamanho
+
+def caso_calcular_features_lote(tamanho, contexto):
+    df = gerar_dados_treinamento(tamanho, 48, seed=0)
+    def executar():
+        calcular_features_lote(df)
+    return executar, len(df)
+
+# --- Casos de inicialização: não dependem do tamanho do parque e rodam uma vez ---
+
+MODULOS_PESADOS = ("pandas", "sklearn", "joblib")
+
+def caso_importacao_main_app(contexto):
+    # Processo novo a cada execução, para medir a importação a frio
+    codigo = ("import sys, main_app; "
+              f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))")
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    def executar():
+        saida = subprocess.run([sys.executable, "-c", codigo], cwd=diretorio, capture_output=True, text=True, check=True)
+        if saida.stdout.strip():
+            print(f"AVISO: importar main_app carregou módulos pesados: {saida.stdout.strip()}")
+    return executar, 1
+
+def _caso_carga_modelo(formato):
+    def caso(contexto):
+        ml_model = contexto["ml_model"]
+        caminho = os.path.join(contexto["tmp"], "modelo_benchmark.joblib")
+        if not os.path.exists(caminho):
+            import joblib
+            modelo = ml_model.modelo_sklearn if ml_model.modelo_sklearn is not None else joblib.load(ml_model.model_path)
+            joblib.dump(modelo, caminho)
+            ml_model.model.salvar(caminho_compilado(caminho))
+        def executar():
+            if formato == "joblib" and os.path.exists(caminho_compilado(caminho)):
+                os.remove(caminho_compilado(caminho))  # força o unpickling (e a recompilação)
+            MLModel(model_path=caminho).load()
+        return executar, 1
+    return caso
+
+CASOS_INICIALIZACAO = {
+    "main_app.importacao": caso_importacao_main_app,
+    "ml_model.load[compilado]": _caso_carga_modelo("compilado"),
+    "ml_model.load[joblib]": _caso_carga_modelo("joblib"),
+}
+
+CASOS = {
+    "maquina.simular_tick": caso_maquina_simular_tick,
+    "frota.simular_tick": caso_frota_simular_tick,
+    "simulator.executar_ciclo[objetos]": _caso_executar_ciclo("objetos"),
+    "simulator.executar_ciclo[vetorizado]": _caso_executar_ciclo("vetorizado"),
+    "ml_model.predict": caso_ml_predict,
+    "ml_model.predict_lote": caso_ml_predict_lote,
+    "logger.log_sensor_tick": caso_log_sensor_tick,
+    "features.calcular_features_lote": caso_calcular_features_lote,
+}
+
+# --- Medição ---
+
+def medir(executar, unidades, repeticoes, tempo_minimo):
+    """Roda `executar` ao menos `repeticoes` vezes (e por `tempo_minimo` segundos) e mede o pico de memória à parte."""
+    tempos = []
+    inicio_total = time.perf_counter()
+    while len(tempos) < repeticoes or time.perf_counter() - inicio_total < tempo_minimo:
+        inicio = time.perf_counter()
+        executar()
+        tempos.append(time.perf_counter() - inicio)
+
+    # O tracemalloc deixa o código mais lento, então a memória é medida em uma execução separada
+    tracemalloc.start()
+    executar()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    melhor = min(tempos)
+    return {
+        "unidades_por_chamada": unidades,
+        "execucoes": len(tempos),
+        "melhor_s": melhor,
+        "mediana_s": float(np.median(tempos)),
+        "vazao_por_s": unidades / melhor if melhor > 0 else float("inf"),
+        "pico_memoria_mb": pico / 2**20,
+    }
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista os casos cuja vazão caiu mais que `tolerancia` (fração) em relação ao baseline."""
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get("resultados", {}).get(chave)
+        if anterior is None:
+            continue
+        razao = atual["vazao_por_s"] / anterior["vazao_por_s"]
+        if razao < 1 - tolerancia:
+            regressoes.append((chave, anterior["vazao_por_s"], atual["vazao_por_s"], razao))
+    return regressoes
+
+def metadados():
+    import sklearn
+    import pandas as pd
+    return {
+        "data": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do simulador.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10, 1000, 10000], help="Tamanhos de parque.")
+    todos = list(CASOS_INICIALIZACAO) + list(CASOS)
+    parser.add_argument("--casos", nargs="+", choices=sorted(todos), default=todos, help="Casos a executar.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções mínimas por caso.")
+    parser.add_argument("--tempo-minimo", type=float, default=0.5, help="Tempo mínimo de medição por caso (s).")
+    parser.add_argument("--modelo", default=None, help="Modelo .joblib; sem ele um modelo pequeno é treinado.")
+    parser.add_argument("--saida", default="benchmark_resultados.json", help="Arquivo JSON de saída.")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparação.")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Queda de vazão tolerada (fração).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        contexto = {"tmp": tmp, "ml_model": carregar_modelo(args.modelo)}
+        for nome in args.casos:
+            if nome in CASOS_INICIALIZACAO:
+                execucoes = [(nome, CASOS_INICIALIZACAO[nome](contexto))]
+            else:
+                execucoes = [(f"{nome}@{tamanho}", CASOS[nome](tamanho, contexto)) for tamanho in args.tamanhos]
+            for chave, (executar, unidades) in execucoes:
+                resultado = medir(executar, unidades, args.repeticoes, args.tempo_minimo)
+                resultados[chave] = resultado
+                print(f"{chave:<45} {resultado['vazao_por_s']:>14,.0f} unid/s   "
+                      f"{resultado['melhor_s'] * 1000:>10.2f} ms   {resultado['pico_memoria_mb']:>8.1f} MB")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({"metadados": metadados(), "resultados": resultados}, f, indent=2)
+    print(f"\nResultados salvos em '{args.saida}'.")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\nREGRESSÕES (queda de vazão maior que {args.tolerancia:.0%}):")
+            for chave, anterior, atual, razao in regressoes:
+                print(f"  {chave:<45} {anterior:>14,.0f} -> {atual:>14,.0f} unid/s ({razao - 1:+.1%})")
+            sys.exit(1)
+        print("\nNenhuma regressão em relação ao baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import numpy as np
+
+VERSAO_FORMATO = 1
+LINHAS_POR_BLOCO = 256
+PASSOS_ENTRE_COMPACTACOES = 3
+
+def caminho_compilado(model_path):
+    """Arquivo da floresta compilada que acompanha um modelo `.joblib` (ex.: `predictive_model.floresta.npz`)."""
+    return os.path.splitext(model_path)[0] + ".floresta.npz"
+
+class FlorestaCompilada:
+    """
+    Um `RandomForestClassifier` treinado, achatado em arrays NumPy contíguos para inferência rápida.
+
+    Os nós de todas as árvores ficam em um único conjunto de arrays (feature, limiar, filhos e índice
+    da folha); `filhos[2*no]` é o filho esquerdo e `filhos[2*no + 1]` o direito. As folhas apontam
+    para si mesmas, então todos os pares (linha, árvore) do lote avançam juntos, em `profundidade`
+    passos vetorizados. As previsões são as mesmas do sklearn: entrada convertida para float32,
+    `x <= limiar` vai para a esquerda e as distribuições das folhas são somadas na ordem das árvores.
+    """
+    def __init__(self, feature, limiar, filhos, folha, nan_esquerda, valores_folhas,
+                 raizes, profundidade, classes, nomes_features=None):
+        self.feature = feature
+        self.limiar = limiar
+        self.filhos = filhos
+        self.folha = folha
+        self.nan_esquerda = nan_esquerda
+        self.valores_folhas = valores_folhas
+        self.raizes = raizes
+        self.profundidade = int(profundidade)
+        self.classes_ = classes
+        self.nomes_features = list(nomes_features) if nomes_features is not None else None
+
+    @classmethod
+    def compilar(cls, modelo):
+        """Achata as árvores de um `RandomForestClassifier` já treinado."""
+        features, limiares, filhos, folhas, nan_esquerdas, valores, raizes = [], [], [], [], [], [], []
+        n_nos = n_folhas = profundidade = 0
+        for arvore in modelo.estimators_:
+            t = arvore.tree_
+            eh_folha = t.children_left == -1
+            indices = np.arange(t.node_count)
+            raizes.append(n_nos)
+            # Folhas apontam para si mesmas; nós internos têm os filhos deslocados para o índice global
+            filhos.append(np.column_stack([np.where(eh_folha, indices, t.children_left),
+                                           np.where(eh_folha, indices, t.children_right)]).ravel() + n_nos)
+            features.append(np.where(eh_folha, 0, t.feature))
+            limiares.append(t.threshold)
+            nan_esquerdas.append(getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=np.uint8)).astype(bool))
+            indice_folha = np.full(t.node_count, -1)
+            indice_folha[eh_folha] = np.arange(np.count_nonzero(eh_folha)) + n_folhas
+            folhas.append(indice_folha)
+            # Versões recentes do sklearn já guardam frações em `value`; as antigas guardavam contagens
+            # (ponderadas) e normalizavam em `predict_proba`. Só normaliza no segundo caso para não mudar bits.
+            valor = t.value[eh_folha, 0, :modelo.n_classes_]
+            normalizador = valor.sum(axis=1)
+            if not np.allclose(normalizador, 1.0):
+                normalizador[normalizador == 0.0] = 1.0
+                valor = valor / normalizador[:, None]
+            valores.append(valor)
+            n_nos += t.node_count
+            n_folhas += int(np.count_nonzero(eh_folha))
+            profundidade = max(profundidade, t.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            limiar=np.concatenate(limiares).astype(np.float64),
+            filhos=np.concatenate(filhos).astype(np.int32),
+            folha=np.concatenate(folhas).astype(np.int32),
+            nan_esquerda=np.concatenate(nan_esquerdas),
+            valores_folhas=np.concatenate(valores).astype(np.float64),
+            raizes=np.asarray(raizes, dtype=np.int32),
+            profundidade=profundidade,
+            classes=np.asarray(modelo.classes_),
+            nomes_features=getattr(modelo, 'feature_names_in_', None),
+        )
+
+    def salvar(self, path):
+        """Grava os arrays em um `.npz` sem compressão, que carrega muito mais rápido que o pickle do joblib."""
+        nomes = np.array(self.nomes_features if self.nomes_features is not None else [], dtype=str)
+        # Grava em um arquivo temporário e troca no fim para nunca deixar um cache pela metade
+        temporario = path + ".tmp.npz"
+        np.savez(temporario, versao=VERSAO_FORMATO, feature=self.feature, limiar=self.limiar,
+                 filhos=self.filhos, folha=self.folha, nan_esquerda=self.nan_esquerda,
+                 valores_folhas=self.valores_folhas, raizes=self.raizes, profundidade=self.profundidade,
+                 classes=self.classes_, nomes_features=nomes)
+        os.replace(temporario, path)
+
+    @classmethod
+    def carregar(cls, path):
+        with np.load(path, allow_pickle=False) as dados:
+            if int(dados['versao']) != VERSAO_FORMATO:
+                raise ValueError(f"Versão de formato {int(dados['versao'])} não suportada em '{path}'.")
+            nomes = dados['nomes_features'].tolist()
+            return cls(dados['feature'], dados['limiar'], dados['filhos'], dados['folha'],
+                       dados['nan_esquerda'], dados['valores_folhas'], dados['raizes'], dados['profundidade'],
+                       dados['classes'], nomes or None)
+
+    def _folhas(self, X):
+        """Percorre todas as árvores para todas as linhas; retorna o índice da folha (n_linhas, n_arvores)."""
+        # O sklearn converte a entrada para float32 antes de comparar com os limiares (float64)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_linhas, n_features = X.shape
+        n_arvores = len(self.raizes)
+        valores = X.ravel()
+        # Um elemento por par (linha, árvore): deslocamento da linha em `valores` e nó atual
+        deslocamento = np.repeat(np.arange(n_linhas, dtype=np.intp) * n_features, n_arvores)
+        nos = np.tile(self.raizes, n_linhas)
+        tem_nan = bool(np.isnan(valores).any())
+        # A cada PASSOS_ENTRE_COMPACTACOES níveis os pares que já chegaram a uma folha saem do lote
+        finais, pendentes = nos, None
+        for nivel in range(1, self.profundidade + 1):
+            x = valores.take(deslocamento + self.feature.take(nos))
+            vai_direita = ~(x <= self.limiar.take(nos))
+            if tem_nan:
+                vai_direita &= ~(np.isnan(x) & self.nan_esquerda.take(nos))
+            nos = self.filhos.take(2 * nos + vai_direita)
+            if nivel % PASSOS_ENTRE_COMPACTACOES == 0 and nivel < self.profundidade:
+                ativos = self.folha.take(nos) < 0
+                if pendentes is None:
+                    finais, pendentes = nos.copy(), np.flatnonzero(ativos)
+                else:
+                    finais[pendentes] = nos
+                    pendentes = pendentes[ativos]
+                nos, deslocamento = nos[ativos], deslocamento[ativos]
+                if len(nos) == 0:
+                    break
+        if pendentes is None:
+            finais = nos
+        else:
+            finais[pendentes] = nos
+        return self.folha.take(finais).reshape(n_linhas, n_arvores)
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        proba = np.empty((len(X), self.valores_folhas.shape[1]))
+        # Blocos de linhas mantêm os arrays de (linha, árvore) pequenos o bastante para caber no cache
+        for inicio in range(0, len(X), LINHAS_POR_BLOCO):
+            bloco = slice(inicio, inicio + LINHAS_POR_BLOCO)
+            # A redução ao longo do eixo das árvores soma em ordem, como o acumulador do sklearn
+            proba[bloco] = self.valores_folhas[self._folhas(X[bloco])].sum(axis=1)
+        proba /= len(self.raizes)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -2,8 +2,50 @@ import random
 
 # --- PARÂMETROS DA SIMULAÇÃO ---
 TAMANHO_DO_PARQUE = 10
+MODELO_PADRAO = "Prensa Hidráulica PH-300T"
+# Modelos de máquina do parque e o peso de cada um (proporção ou contagem; ver `distribuir_parque`)
+COMPOSICAO_DO_PARQUE = {MODELO_PADRAO: 1}
 HORAS_POR_CICLO = 24
 HORAS_ENTRE_TESTES_DE_SAUDE = 8
+MOTOR_SIMULACAO = "objetos"  # "objetos" (machine.py) ou "vetorizado" (fleet_engine.py)
+INSTRUMENTACAO_ATIVA = True  # Mede o tempo de cada fase do ciclo (custo quase nulo quando False)
+
+# --- PARÂMETROS DOS LOGS ---
+LOG_BUFFERIZADO = True  # Mantém os logs ativos abertos e grava em lotes (uma vez por ciclo)
+LOG_BUFFER_MAX_LINHAS = 50000
+LOG_BUFFER_MAX_SEGUNDOS = 5.0
+LOG_BACKEND_SENSORES = "colunar"  # "colunar" (binário, sensor_log/*.bin) ou "csv" (sensor_log.csv)
+ARQUIVO_CAUSAS_FALHA = "causas_falha.csv"  # Causa de cada falha arquivada, ao lado dos relatórios (lida pelo armazém de falhas)
+
+# --- PARÂMETROS DO MONITOR DE DESEMPENHO DO ML ---
+MONITOR_JANELA_CICLOS = 50      # Ciclos da janela deslizante de precisão/recall por fase
+MONITOR_MEIA_VIDA_CICLOS = 10   # Meia-vida (em ciclos) da média exponencial de precisão/recall por fase
+
+# --- PARÂMETROS DO APRENDIZADO ONLINE ---
+APRENDIZADO_ONLINE_ATIVO = False            # Atualiza os modelos de ML com os dados da própria simulação
+APRENDIZADO_BUFFER_LINHAS = 50000           # Linhas rotuladas mais recentes guardadas para o treino incremental
+APRENDIZADO_LINHAS_POR_ATUALIZACAO = 20000  # Linhas novas que disparam uma atualização do modelo
+APRENDIZADO_ARVORES_POR_ATUALIZACAO = 10    # Árvores novas treinadas (warm start) a cada atualização
+APRENDIZADO_MAX_ARVORES = 200               # Acima disso, as árvores mais antigas são descartadas
+
+# --- PARÂMETROS DA BUSCA DE HIPERPARÂMETROS (train_model.py) ---
+BUSCA_PASTA_CACHE = "cache_treino"  # Matrizes de features já calculadas (.npy mapeáveis em memória), reaproveitadas entre buscas
+BUSCA_GRADE = {                     # Valores testados de cada hiperparâmetro do RandomForest
+    "n_estimators": [100, 150, 250],
+    "max_depth": [12, 20, None],
+    "min_samples_leaf": [1, 5, 10],
+}
+BUSCA_AMOSTRAS = 0                  # 0 = grade completa; N > 0 = N configurações sorteadas da grade
+BUSCA_PROCESSOS = 0                 # Configurações avaliadas em paralelo (0 = todos os núcleos)
+
+# --- PARÂMETROS DO PAINEL AO VIVO (main_app.py) ---
+PAINEL_QUADROS_POR_SEGUNDO = 30     # Taxa máxima de atualização do painel, independente da velocidade da simulação
+PAINEL_PONTOS_GRAFICO = 300         # Pontos mantidos em cada gráfico ao vivo (um por quadro com ciclos novos)
+
+# --- PARÂMETROS DO ANALISADOR DE RELATÓRIOS ---
+ANALISADOR_CACHE_RELATORIOS = 32    # Relatórios já lidos mantidos em memória (LRU)
+ANALISADOR_PONTOS_GRAFICO = 2000    # Séries maiores são reduzidas (LTTB) a este número de pontos para o gráfico
+ARMAZEM_PROCESSOS_INGESTAO = 0       # Processos que leem os relatórios novos no armazém de falhas (0 = todos os núcleos)
 
 # --- PARÂMETROS DE DEGRADAÇÃO DA MÁQUINA ---
 FATOR_DESGASTE_INICIAL_MIN_NOVA = 50.0
@@ -30,7 +72,9 @@ FASES_SAUDE = {
 CATALOGO_SOLUCOES = {
     "SOL-H02": {"procedimento": "Limpar Trocador de Calor", "tempo_base_reparo_h": 24},
     "SOL-M01": {"procedimento": "Alinhamento a Laser de Eixo", "tempo_base_reparo_h": 8},
-    "SOL-G01": {"procedimento": "Revisão Geral e Substituição de Componentes", "tempo_base_reparo_h": 48}
+    "SOL-G01": {"procedimento": "Revisão Geral e Substituição de Componentes", "tempo_base_reparo_h": 48},
+    "SOL-T01": {"procedimento": "Troca dos Rolamentos do Fuso", "tempo_base_reparo_h": 16},
+    "SOL-E01": {"procedimento": "Revisão do Acionamento Elétrico", "tempo_base_reparo_h": 12}
 }
 
 # --- CATÁLOGO DE PROBLEMAS E GATILHOS DE FALHA ---
@@ -49,13 +93,36 @@ CATALOGO_PROBLEMAS = {
         "nome_problema": "Falha Geral por Desgaste",
         "gatilho_falha": {"sensor_id": "fator_desgaste", "condicao": ">", "valor": 1000.0},
         "solucao_otima": "SOL-G01"
+    },
+    "PROB-TC-001": {
+        "nome_problema": "Superaquecimento do Fuso",
+        "gatilho_falha": {"sensor_id": "temp_fuso", "condicao": ">", "valor": 80.0},
+        "solucao_otima": "SOL-T01"
+    },
+    "PROB-TC-002": {
+        "nome_problema": "Sobrecarga do Motor do Fuso",
+        "gatilho_falha": {"sensor_id": "corrente_motor", "condicao": ">=", "valor": 45.0},
+        "solucao_otima": "SOL-E01"
+    },
+    "PROB-TC-003": {
+        "nome_problema": "Perda de Pressão de Refrigeração",
+        "gatilho_falha": {"sensor_id": "pressao_refrigeracao", "condicao": "<", "valor": 1.0},
+        "solucao_otima": "SOL-M01"
     }
 }
 
 # --- CATÁLOGO DE MODELOS DE MÁQUINAS ---
+# "codigo" identifica o modelo nos nomes de arquivo e na linha de comando e "prefixo_id" inicia os
+# IDs das suas máquinas (ex: "PH-001"); "arquivo_modelo_ml" é o
+# modelo de ML treinado para ele. "estatisticas_janela" define as features de janela móvel de cada
+# sensor (padrão: média e desvio) e "colunas_volatilidade" o nome da coluna de volatilidade de cada
+# sensor (padrão: "volatilidade_<sensor_id>").
 CATALOGO_MAQUINAS = {
     "Prensa Hidráulica PH-300T": {
         "nome_amigavel": "Prensa Hidráulica 300 Ton",
+        "codigo": "PH-300T",
+        "prefixo_id": "PH",
+        "arquivo_modelo_ml": "predictive_model.joblib",
         "sensores_config": [
             {"sensor_id": "temp_oleo", "nome": "Temperatura do Óleo", "unidade": "°C", "faixa_normal": (45.0, 65.0)},
             {"sensor_id": "vibracao_motor", "nome": "Vibração do Motor Principal", "unidade": "mm/s", "faixa_normal": (0.5, 2.0)},
@@ -65,6 +132,40 @@ CATALOGO_MAQUINAS = {
             "PROB-PH-001",
             "PROB-PH-002",
             "PROB-PH-003"
-        ]
+        ],
+        "estatisticas_janela": {
+            "temp_oleo": ["mean", "std"],
+            "vibracao_motor": ["mean", "std", "max"],
+            "pressao_hidraulica": ["mean", "std"]
+        },
+        "colunas_volatilidade": {
+            "temp_oleo": "volatilidade_temp",
+            "vibracao_motor": "volatilidade_vibracao",
+            "pressao_hidraulica": "volatilidade_pressao"
+        }
+    },
+    "Torno CNC TC-500": {
+        "nome_amigavel": "Torno CNC 500 mm",
+        "codigo": "TC-500",
+        "prefixo_id": "TC",
+        "arquivo_modelo_ml": "predictive_model_tc500.joblib",
+        "sensores_config": [
+            {"sensor_id": "temp_fuso", "nome": "Temperatura do Fuso", "unidade": "°C", "faixa_normal": (35.0, 55.0)},
+            {"sensor_id": "vibracao_fuso", "nome": "Vibração do Fuso", "unidade": "mm/s", "faixa_normal": (0.3, 1.5)},
+            {"sensor_id": "corrente_motor", "nome": "Corrente do Motor do Fuso", "unidade": "A", "faixa_normal": (18.0, 30.0)},
+            {"sensor_id": "pressao_refrigeracao", "nome": "Pressão do Fluido de Refrigeração", "unidade": "bar", "faixa_normal": (4.0, 6.0)}
+        ],
+        "problemas_possiveis": [
+            "PROB-TC-001",
+            "PROB-TC-002",
+            "PROB-TC-003",
+            "PROB-PH-003"
+        ],
+        "estatisticas_janela": {
+            "temp_fuso": ["mean", "std"],
+            "vibracao_fuso": ["mean", "std", "max"],
+            "corrente_motor": ["mean", "std", "max"],
+            "pressao_refrigeracao": ["mean", "std"]
+        }
     }
 }
\ No newline at end of file
@@ -0,0 +1,44 @@
+import heapq
+import itertools
+
+class AgendaEventos:
+    """
+    Fila de eventos futuros da simulação, ordenada pela hora simulada (heap).
+
+    Cada evento é (hora, tipo, chave); eventos da mesma hora saem na ordem em que foram
+    agendados. O simulador só toca nas máquinas com eventos vencidos, em vez de visitar
+    todo o parque a cada ciclo para atualizar contadores.
+
+    `em_reparo` guarda as chaves com um "fim_reparo" pendente: entram quando o reparo é agendado
+    e saem quando o evento vence, e o simulador as deixa fora das iterações de cada ciclo.
+    """
+    def __init__(self):
+        self.heap = []
+        self.sequencia = itertools.count()
+        self.em_reparo = set()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def agendar(self, hora, tipo, chave):
+        heapq.heappush(self.heap, (hora, next(self.sequencia), tipo, chave))
+        if tipo == "fim_reparo":
+            self.em_reparo.add(chave)
+
+    def proxima_hora(self):
+        """Hora do próximo evento, ou None se a agenda estiver vazia."""
+        return self.heap[0][0] if self.heap else None
+
+    def retirar_vencidos(self, hora):
+        """Remove e devolve, em ordem, os eventos com hora <= `hora` como tuplas (hora, tipo, chave)."""
+        vencidos = []
+        while self.heap and self.heap[0][0] <= hora:
+            hora_evento, _, tipo, chave = heapq.heappop(self.heap)
+            vencidos.append((hora_evento, tipo, chave))
+            if tipo == "fim_reparo":
+                self.em_reparo.discard(chave)
+        return vencidos
+
+    def eventos(self):
+        """Todos os eventos pendentes, em ordem, sem removê-los."""
+        return [(hora, tipo, chave) for hora, _, tipo, chave in sorted(self.heap)]
@@ -0,0 +1,338 @@
+import os
+import sys
+import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+from config import *
+from machine_specs import ESPECIFICACOES, especificacao_do_cabecalho
+
+# Armazém de todos os relatórios de falha de uma pasta: os relatórios são lidos uma única vez
+# (em paralelo) e guardados como colunas contínuas por modelo de máquina, com uma tabela de resumo
+# (uma linha por máquina) que aponta para o trecho de cada máquina. A linha da hora `h` da
+# máquina `m` fica em `inicio[m] + h`, então consultas por máquina, por hora de operação ou sobre
+# todo o parque não precisam reabrir nenhum CSV.
+
+ARQUIVO_ARMAZEM = ".armazem_falhas.npz"
+VERSAO_ARMAZEM = 2  # Armazéns salvos por outra versão são reconstruídos
+
+# Causa das falhas sem registro no `ARQUIVO_CAUSAS_FALHA` (ex: relatórios de versões anteriores do simulador)
+PROBLEMA_DESCONHECIDO = "DESCONHECIDO"
+
+# Fases com tempo contado no resumo (a fase "Falha" é sempre a última hora do relatório)
+FASES_RESUMO = ("Normal", "Alerta", "Risco_Iminente")
+
+# Colunas numéricas do resumo, na ordem em que `ler_relatorio_falha` as preenche
+COLUNAS_RESUMO = (
+    ("horas", np.int64),
+    *((f"horas_{fase}", np.int64) for fase in FASES_RESUMO),
+    *((f"inicio_{fase}", np.int64) for fase in FASES_RESUMO),
+    ("eventos", np.int64),
+    ("desgaste_inicial", np.float64),
+    ("desgaste_final", np.float64),
+)
+
+def ler_causas(pasta):
+    """Problema de cada máquina arquivada (Series indexada por machine_id) pelo `ARQUIVO_CAUSAS_FALHA` da pasta."""
+    caminho = os.path.join(pasta, ARQUIVO_CAUSAS_FALHA)
+    try:
+        causas = pd.read_csv(caminho, dtype=str)
+    except FileNotFoundError:
+        return pd.Series(dtype=object)
+    except Exception as e:
+        print(f"Armazém de falhas: não foi possível ler '{caminho}'. Erro: {e}")
+        return pd.Series(dtype=object)
+    # Um relatório reescrito (mesmo ID) vale pela última causa registrada
+    return causas.drop_duplicates('machine_id', keep='last').set_index('machine_id')['problema']
+
+def ler_relatorio_falha(caminho):
+    """
+    Lê um relatório e devolve (arquivo, machine_id, modelo, resumo, colunas), em que `colunas`
+    são os arrays por hora (fase em int8, valores em float32). Devolve None se o relatório não puder
+    ser lido. Roda nos processos do pool, por isso é uma função de módulo.
+    """
+    arquivo = os.path.basename(caminho)
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            spec = especificacao_do_cabecalho(f.readline().strip().split(','))
+        tipos = dict.fromkeys(spec.colunas_valores, np.float32)
+        tipos['health_phase'] = np.int8
+        df = pd.read_csv(caminho, usecols=list(tipos), dtype=tipos)
+    except Exception as e:
+        print(f"Armazém de falhas: não foi possível ler '{arquivo}'. Erro: {e}")
+        return None
+    if df.empty:
+        return None
+
+    colunas = {coluna: df[coluna].to_numpy() for coluna in tipos}
+    fases = colunas['health_phase']
+    volatilidades = np.column_stack([colunas[c] for c in spec.colunas_volatilidade])
+    resumo = [len(df)]
+    resumo += [int(np.count_nonzero(fases == FASES_SAUDE[fase])) for fase in FASES_RESUMO]
+    for fase in FASES_RESUMO:
+        horas_na_fase = np.flatnonzero(fases == FASES_SAUDE[fase])
+        resumo.append(int(horas_na_fase[0]) if len(horas_na_fase) else -1)
+    resumo.append(int(np.count_nonzero((np.diff(volatilidades, axis=0) > 0.1).any(axis=1))))
+    resumo += [float(colunas['fator_desgaste'][0]), float(colunas['fator_desgaste'][-1])]
+
+    machine_id = arquivo[len("report_"):-len(".csv")]
+    return arquivo, machine_id, spec.modelo, resumo, colunas
+
+
+class ConteudoArmazem(NamedTuple):
+    """
+    Resumo e colunas por hora do armazém, publicados juntos. Nunca são alterados depois de
+    publicados: `atualizar` monta um conteúdo novo e o troca com uma única atribuição.
+    """
+    resumo: pd.DataFrame
+    series: dict
+
+
+class ArmazemFalhas:
+    """
+    Índice dos relatórios `report_*.csv` de uma pasta, salvo na própria pasta (`ARQUIVO_ARMAZEM`).
+    `atualizar` lê apenas os relatórios novos ou alterados desde a última vez; os removidos saem
+    do armazém. `resumo` tem uma linha por máquina (índice `machine_id`) e `series[modelo]` as
+    colunas por hora de todas as máquinas daquele modelo, em sequência. A coluna `problema` vem do
+    `ARQUIVO_CAUSAS_FALHA` que o logger grava junto com os relatórios (`PROBLEMA_DESCONHECIDO` se
+    a máquina não estiver nele); a causa nunca é deduzida dos valores dos sensores.
+
+    `atualizar` pode rodar em uma thread de fundo enquanto outra consulta o armazém: as consultas
+    leem o `conteudo` publicado, que só é substituído (nunca alterado) ao fim da atualização.
+    """
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, ARQUIVO_ARMAZEM)
+        self.manifesto = {}   # arquivo -> (mtime_ns, tamanho) do relatório já lido
+        self.assinatura_causas = (0, 0)   # (mtime_ns, tamanho) do arquivo de causas já lido
+        self.conteudo = ConteudoArmazem(self._resumo_vazio(), {})
+        self.carregar()
+
+    @property
+    def resumo(self):
+        return self.conteudo.resumo
+
+    @property
+    def series(self):
+        return self.conteudo.series
+
+    @staticmethod
+    def _resumo_vazio():
+        colunas = {'machine_id': pd.Series(dtype=object), 'arquivo': pd.Series(dtype=object),
+                   'modelo': pd.Series(dtype=object), 'problema': pd.Series(dtype=object),
+                   'inicio': pd.Series(dtype=np.int64)}
+        colunas.update({nome: pd.Series(dtype=tipo) for nome, tipo in COLUNAS_RESUMO})
+        return pd.DataFrame(colunas).set_index('machine_id')
+
+    # --- Persistência ---
+
+    def carregar(self):
+        if not os.path.exists(self.caminho):
+            return
+        try:
+            with np.load(self.caminho, allow_pickle=False) as dados:
+                arrays = {nome: dados[nome] for nome in dados.files}
+        except Exception as e:
+            print(f"Armazém de falhas: arquivo '{self.caminho}' ilegível, será reconstruído. Erro: {e}")
+            return
+        if 'versao' not in arrays or int(arrays['versao']) != VERSAO_ARMAZEM:
+            print(f"Armazém de falhas: '{self.caminho}' é de outra versão, será reconstruído.")
+            return
+        self.assinatura_causas = tuple(arrays['causas/assinatura'].tolist())
+        self.manifesto = dict(zip(arrays['manifesto/arquivo'].tolist(),
+                                  zip(arrays['manifesto/mtime_ns'].tolist(), arrays['manifesto/tamanho'].tolist())))
+        resumo = pd.DataFrame({nome[len('resumo/'):]: array for nome, array in arrays.items() if nome.startswith('resumo/')})
+        for coluna in ('machine_id', 'arquivo', 'modelo', 'problema'):
+            resumo[coluna] = resumo[coluna].astype(object)
+        series = {}
+        for modelo, spec in ESPECIFICACOES.items():
+            prefixo = f"series/{spec.codigo}/"
+            colunas = {nome[len(prefixo):]: array for nome, array in arrays.items() if nome.startswith(prefixo)}
+            if colunas:
+                series[modelo] = colunas
+        self.conteudo = ConteudoArmazem(resumo.set_index('machine_id'), series)
+
+    def salvar(self):
+        conteudo = self.conteudo
+        arrays = {
+            'versao': np.array(VERSAO_ARMAZEM),
+            'causas/assinatura': np.array(self.assinatura_causas, dtype=np.int64),
+            'manifesto/arquivo': np.array(list(self.manifesto), dtype=str),
+            'manifesto/mtime_ns': np.array([v[0] for v in self.manifesto.values()], dtype=np.int64),
+            'manifesto/tamanho': np.array([v[1] for v in self.manifesto.values()], dtype=np.int64),
+        }
+        resumo = conteudo.resumo.reset_index()
+        for coluna in resumo.columns:
+            valores = resumo[coluna].to_numpy()
+            arrays[f'resumo/{coluna}'] = valores.astype(str) if valores.dtype == object else valores
+        for modelo, colunas in conteudo.series.items():
+            codigo = ESPECIFICACOES[modelo].codigo
+            arrays.update({f'series/{codigo}/{coluna}': array for coluna, array in colunas.items()})
+        # Grava em um arquivo temporário e troca de uma vez: uma leitura nunca vê o armazém pela metade
+        temporario = self.caminho + ".tmp"
+        with open(temporario, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporario, self.caminho)
+
+    # --- Ingestão ---
+    # As funções abaixo recebem e devolvem (resumo, series) novos, sem tocar no conteúdo publicado
+
+    @staticmethod
+    def _remover(resumo, series, arquivos):
+        """Tira as máquinas dos relatórios `arquivos`, compactando as colunas por hora."""
+        removidas = resumo['arquivo'].isin(arquivos).to_numpy()
+        if not removidas.any():
+            return resumo, series
+        series = dict(series)
+        for modelo in list(series):
+            do_modelo = (resumo['modelo'] == modelo).to_numpy()
+            horas = resumo['horas'].to_numpy()[do_modelo]
+            manter = np.repeat(~removidas[do_modelo], horas)
+            series[modelo] = {coluna: array[manter] for coluna, array in series[modelo].items()}
+        return resumo[~removidas].copy(), series
+
+    @staticmethod
+    def _recalcular_inicios(resumo):
+        """`inicio` de cada máquina: as máquinas de um modelo ficam em sequência, na ordem do resumo."""
+        inicios = np.zeros(len(resumo), dtype=np.int64)
+        for modelo in resumo['modelo'].unique():
+            do_modelo = (resumo['modelo'] == modelo).to_numpy()
+            horas = resumo['horas'].to_numpy()[do_modelo]
+            inicios[do_modelo] = np.concatenate(([0], np.cumsum(horas)[:-1]))
+        resumo['inicio'] = inicios
+
+    @staticmethod
+    def _incluir(resumo, series, lidos):
+        novas = pd.DataFrame(
+            [[machine_id, arquivo, modelo, PROBLEMA_DESCONHECIDO, 0, *resumo] for arquivo, machine_id, modelo, resumo, _ in lidos],
+            columns=['machine_id', 'arquivo', 'modelo', 'problema', 'inicio', *(nome for nome, _ in COLUNAS_RESUMO)]
+        ).astype({nome: tipo for nome, tipo in COLUNAS_RESUMO}).set_index('machine_id')
+        resumo = pd.concat([resumo, novas]) if len(resumo) else novas
+
+        por_modelo = {}
+        for _, _, modelo, _, colunas in lidos:
+            por_modelo.setdefault(modelo, []).append(colunas)
+        series = dict(series)
+        for modelo, blocos in por_modelo.items():
+            existentes = series.get(modelo)
+            series[modelo] = {
+                coluna: np.concatenate(([existentes[coluna]] if existentes else []) + [bloco[coluna] for bloco in blocos])
+                for coluna in blocos[0]
+            }
+        return resumo, series
+
+    def atualizar(self, n_workers=ARMAZEM_PROCESSOS_INGESTAO):
+        """
+        Lê os relatórios novos ou alterados da pasta (em um pool de processos; `n_workers=0` usa
+        todos os núcleos), remove os que sumiram, relê as causas se o arquivo delas mudou e salva
+        o armazém. Retorna quantos relatórios foram lidos.
+
+        O pool usa processos iniciados do zero ("spawn"): a atualização pode rodar em uma thread
+        de um programa com interface gráfica, e um fork copiaria um processo com várias threads.
+        """
+        no_disco = {}
+        for caminho in glob.glob(os.path.join(self.pasta, "report_*.csv")):
+            info = os.stat(caminho)
+            no_disco[os.path.basename(caminho)] = (info.st_mtime_ns, info.st_size)
+        caminho_causas = os.path.join(self.pasta, ARQUIVO_CAUSAS_FALHA)
+        info = os.stat(caminho_causas) if os.path.exists(caminho_causas) else None
+        assinatura_causas = (info.st_mtime_ns, info.st_size) if info else (0, 0)
+
+        alterados = [arquivo for arquivo, assinatura in no_disco.items() if self.manifesto.get(arquivo) != assinatura]
+        sumiram = [arquivo for arquivo in self.manifesto if arquivo not in no_disco]
+        if not alterados and not sumiram and assinatura_causas == self.assinatura_causas:
+            return 0
+
+        conteudo = self.conteudo
+        resumo, series = self._remover(conteudo.resumo, conteudo.series, sumiram + alterados)
+        caminhos = [os.path.join(self.pasta, arquivo) for arquivo in sorted(alterados)]
+        if n_workers == 0:
+            n_workers = os.cpu_count() or 1
+        if n_workers > 1 and len(caminhos) > 1:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(caminhos)),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                chunksize = max(1, len(caminhos) // (4 * n_workers))
+                lidos = list(pool.map(ler_relatorio_falha, caminhos, chunksize=chunksize))
+        else:
+            lidos = [ler_relatorio_falha(caminho) for caminho in caminhos]
+
+        lidos = [lido for lido in lidos if lido is not None]
+        if lidos:
+            resumo, series = self._incluir(resumo, series, lidos)
+        # Cópia própria: o `resumo` publicado continua intacto até a troca
+        resumo = resumo.copy()
+        self._recalcular_inicios(resumo)
+        for arquivo in sumiram:
+            del self.manifesto[arquivo]
+        # Relatórios ilegíveis também entram no manifesto: só são relidos se o arquivo mudar
+        self.manifesto.update({arquivo: no_disco[arquivo] for arquivo in alterados})
+        # Todas as linhas: a causa pode ter sido registrada depois de o relatório ser lido
+        causas = ler_causas(self.pasta)
+        resumo['problema'] = causas.reindex(resumo.index).fillna(PROBLEMA_DESCONHECIDO).to_numpy(dtype=object)
+        self.assinatura_causas = assinatura_causas
+        self.conteudo = ConteudoArmazem(resumo, series)
+        self.salvar()
+        return len(alterados)
+
+    # --- Consultas ---
+
+    def serie(self, machine_id):
+        """Colunas por hora de uma máquina (DataFrame indexado pela hora de operação)."""
+        conteudo = self.conteudo
+        maquina = conteudo.resumo.loc[machine_id]
+        inicio, horas = int(maquina['inicio']), int(maquina['horas'])
+        colunas = conteudo.series[maquina['modelo']]
+        return pd.DataFrame({coluna: array[inicio:inicio + horas] for coluna, array in colunas.items()},
+                            index=pd.RangeIndex(horas, name='hora'))
+
+    def na_hora(self, modelo, hora, colunas=None, antes_da_falha=False):
+        """
+        Valores de todas as máquinas de `modelo` em uma hora de operação (ou `hora` horas antes da
+        última hora do relatório, com `antes_da_falha`). Máquinas que não chegaram a essa hora ficam de fora.
+        """
+        conteudo = self.conteudo
+        maquinas = conteudo.resumo[conteudo.resumo['modelo'] == modelo]
+        horas = maquinas['horas'].to_numpy()
+        posicoes = horas - 1 - hora if antes_da_falha else np.full(len(maquinas), hora)
+        validas = (posicoes >= 0) & (posicoes < horas)
+        linhas = maquinas['inicio'].to_numpy()[validas] + posicoes[validas]
+        series = conteudo.series.get(modelo, {})
+        colunas = list(series) if colunas is None else colunas
+        return pd.DataFrame({coluna: series[coluna][linhas] for coluna in colunas},
+                            index=maquinas.index[validas])
+
+    def filtrar(self, modelo=None, problema=None):
+        """Linhas do resumo de um modelo e/ou problema."""
+        resumo = self.resumo
+        selecionadas = np.ones(len(resumo), dtype=bool)
+        if modelo is not None:
+            selecionadas &= (resumo['modelo'] == modelo).to_numpy()
+        if problema is not None:
+            selecionadas &= (resumo['problema'] == problema).to_numpy()
+        return resumo[selecionadas]
+
+    def tempo_na_fase(self, fase, modelo=None, problema=None):
+        """Horas que cada máquina passou na `fase` (nome de FASES_SAUDE) antes de falhar."""
+        return self.filtrar(modelo, problema)[f"horas_{fase}"]
+
+    def agregado(self, por='problema'):
+        """
+        Estatísticas do parque agrupadas por `por` ('problema' ou 'modelo'): número de falhas,
+        vida média e as horas médias em cada fase antes da falha.
+        """
+        colunas = ['horas', *(f"horas_{fase}" for fase in FASES_RESUMO), 'eventos', 'desgaste_final']
+        resumo = self.resumo
+        tabela = resumo.groupby(por)[colunas].mean()
+        tabela.insert(0, 'falhas', resumo.groupby(por).size())
+        return tabela
+
+
+if __name__ == "__main__":
+    pasta = sys.argv[1] if len(sys.argv) > 1 else os.path.join("logs", "archived_data", "failure_reports")
+    armazem = ArmazemFalhas(pasta)
+    print(f"Relatórios lidos: {armazem.atualizar()} (total no armazém: {len(armazem.resumo)})")
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 1):
+        print(armazem.agregado())
@@ -0,0 +1,148 @@
+from typing import NamedTuple
+import numpy as np
+from config import *
+from machine_specs import especificacao
+
+# Janelas (em horas) das estatísticas móveis, iguais para todos os modelos de máquina
+JANELAS = [6, 12, 24]
+# Estatísticas de janela de um sensor quando o catálogo não define "estatisticas_janela"
+ESTATISTICAS_PADRAO = ['mean', 'std']
+
+class EsquemaFeatures(NamedTuple):
+    """Colunas e features que o modelo de ML de um modelo de máquina recebe, na ordem do treino."""
+    modelo: str
+    colunas_ultimo_registro: list   # colunas do registro de um tick usadas como features "instantâneas"
+    sensores_janela: list           # sensores com estatísticas de janela móvel
+    estatisticas: dict              # sensor -> estatísticas calculadas para ele
+    nomes_features: list
+
+def esquema_features(modelo=MODELO_PADRAO):
+    spec = especificacao(modelo)
+    estatisticas_catalogo = CATALOGO_MAQUINAS[modelo].get("estatisticas_janela", {})
+    sensores_janela = list(spec.sensor_ids)
+    estatisticas = {s: list(estatisticas_catalogo.get(s, ESTATISTICAS_PADRAO)) for s in sensores_janela}
+    colunas_ultimo_registro = ['horas_operadas', 'fator_desgaste', *spec.sensor_ids, *spec.colunas_volatilidade]
+    nomes_janela = [
+        f'{sensor_id}_{estatistica}_{janela}h'
+        for janela in JANELAS for sensor_id in sensores_janela for estatistica in estatisticas[sensor_id]
+    ]
+    return EsquemaFeatures(modelo, colunas_ultimo_registro, sensores_janela, estatisticas,
+                           colunas_ultimo_registro + nomes_janela)
+
+# Esquema do modelo padrão, mantido nos nomes de módulo usados antes dos parques mistos
+_ESQUEMA_PADRAO = esquema_features(MODELO_PADRAO)
+COLUNAS_ULTIMO_REGISTRO = _ESQUEMA_PADRAO.colunas_ultimo_registro
+SENSORES_JANELA = _ESQUEMA_PADRAO.sensores_janela
+ESTATISTICAS = _ESQUEMA_PADRAO.estatisticas
+NOMES_FEATURES = _ESQUEMA_PADRAO.nomes_features
+
+def centros_faixa(modelo=MODELO_PADRAO):
+    """
+    Centro da faixa normal de cada sensor de janela. As somas acumuladas são feitas
+    sobre (valor - centro) para reduzir o erro de arredondamento.
+    """
+    return np.array(especificacao(modelo).centros)
+
+def estatisticas_janela(soma, soma_q, n, centro):
+    """
+    Média e desvio padrão amostral (ddof=1, como no pandas) a partir da soma e da soma
+    de quadrados dos valores centrados de uma janela com `n` pontos.
+    Esta é a única fórmula usada tanto no modo em lote quanto no modo incremental.
+    """
+    media_centrada = soma / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variancia = np.maximum((soma_q - soma * media_centrada) / (n - 1), 0.0)
+        desvio = np.where(n > 1, np.sqrt(variancia), np.nan)
+    return media_centrada + centro, desvio
+
+def calcular_features_lote(df, modelo=MODELO_PADRAO):
+    """
+    Calcula todas as features de janela de todas as máquinas em uma única passada vetorizada.
+
+    As linhas são ordenadas por (machine_id, horas_operadas) e dispostas em uma matriz
+    (máquinas x horas). Somas acumuladas sequenciais ao longo do tempo dão a soma de qualquer
+    janela com uma subtração, exatamente como no `HistoricoSensores` do simulador, o que
+    garante features idênticas bit a bit entre treino e inferência online.
+    Janelas incompletas no início de cada máquina usam os pontos disponíveis (min_periods=1).
+    """
+    import pandas as pd
+    df = df.sort_values(by=['machine_id', 'horas_operadas'], kind='stable').reset_index(drop=True)
+    esquema = esquema_features(modelo)
+    sensores_janela, estatisticas = esquema.sensores_janela, esquema.estatisticas
+    centro = centros_faixa(modelo)
+
+    # --- Matriz (máquinas x horas x sensores) com as séries alinhadas à esquerda ---
+    codigos, _ = pd.factorize(df['machine_id'], sort=False)
+    tamanhos = np.bincount(codigos)
+    inicios = np.r_[0, np.cumsum(tamanhos)[:-1]]
+    posicao = np.arange(len(df)) - inicios[codigos]
+    n_maquinas, n_horas = len(tamanhos), int(tamanhos.max()) if len(tamanhos) else 0
+
+    valores = np.column_stack([df[s].to_numpy(dtype=np.float64) for s in sensores_janela])
+    centrado = np.zeros((n_maquinas, n_horas, len(sensores_janela)))
+    centrado[codigos, posicao] = valores - centro
+    acumulado = np.cumsum(centrado, axis=1)
+    acumulado_q = np.cumsum(centrado * centrado, axis=1)
+    # Soma acumulada *antes* de cada hora (o que o buffer circular guarda em `soma_antes`)
+    antes = np.concatenate([np.zeros((n_maquinas, 1, len(sensores_janela))), acumulado[:, :-1]], axis=1)
+    antes_q = np.concatenate([np.zeros((n_maquinas, 1, len(sensores_janela))), acumulado_q[:, :-1]], axis=1)
+
+    # Máximo móvel por "tabela esparsa": maximos[k][t] é o máximo das 2**k horas que terminam em t.
+    # As séries recebem -inf à esquerda para que janelas incompletas usem só os pontos existentes.
+    sensores_max = [j for j, s in enumerate(sensores_janela) if 'max' in estatisticas[s]]
+    margem = max(JANELAS) - 1
+    brutos = np.full((n_maquinas, n_horas + margem, len(sensores_max)), -np.inf)
+    brutos[codigos, posicao + margem] = valores[:, sensores_max]
+    maximos = [brutos]
+    while 2 ** len(maximos) <= max(JANELAS):
+        anterior, passo = maximos[-1], 2 ** (len(maximos) - 1)
+        proximo = anterior.copy()
+        proximo[:, passo:] = np.maximum(anterior[:, passo:], anterior[:, :-passo])
+        maximos.append(proximo)
+
+    novas_colunas = {}
+    for janela in JANELAS:
+        n = np.minimum(posicao + 1, janela)[:, None]
+        soma = acumulado[codigos, posicao] - antes[codigos, posicao - n[:, 0] + 1]
+        soma_q = acumulado_q[codigos, posicao] - antes_q[codigos, posicao - n[:, 0] + 1]
+        media, desvio = estatisticas_janela(soma, soma_q, n, centro)
+        k = janela.bit_length() - 1
+        fim = posicao + margem
+        maximo = np.maximum(maximos[k][codigos, fim], maximos[k][codigos, fim - (janela - 2 ** k)])
+        for j, sensor_id in enumerate(sensores_janela):
+            calculadas = {'mean': media[:, j], 'std': desvio[:, j]}
+            if j in sensores_max:
+                calculadas['max'] = maximo[:, sensores_max.index(j)]
+            for estatistica in estatisticas[sensor_id]:
+                novas_colunas[f'{sensor_id}_{estatistica}_{janela}h'] = calculadas[estatistica]
+
+    return pd.concat([df, pd.DataFrame(novas_colunas, index=df.index)], axis=1)
+
+def verificar_paridade(num_machines=5, hours_per_machine=300, seed=123, modelo=MODELO_PADRAO):
+    """
+    Confere que as features online (`HistoricoSensores`, alimentado tick a tick) são idênticas
+    bit a bit às do modo em lote para as mesmas séries. Retorna o número de linhas comparadas.
+    """
+    from training_data import gerar_dados_treinamento
+    from sensor_history import HistoricoSensores
+
+    esquema = esquema_features(modelo)
+    df = gerar_dados_treinamento(num_machines, hours_per_machine, seed=seed, modelo=modelo)
+    lote = calcular_features_lote(df, modelo)
+    historico = HistoricoSensores(modelo=modelo, capacidade_inicial=1)
+    comparadas = 0
+    for hora, bloco in lote.groupby(lote.groupby('machine_id').cumcount(), sort=True):
+        machine_ids = bloco['machine_id'].tolist()
+        historico.registrar(machine_ids, {col: bloco[col].to_numpy() for col in esquema.colunas_ultimo_registro})
+        elegiveis, X = historico.montar_features(machine_ids, esquema.nomes_features)
+        esperado = bloco[esquema.nomes_features].to_numpy()[elegiveis]
+        if not np.array_equal(X, esperado):
+            diferenca = np.abs(X - esperado).max()
+            raise AssertionError(f"Features online diferem do lote na hora {hora} (diferença máxima {diferenca}).")
+        comparadas += len(X)
+    return comparadas
+
+if __name__ == "__main__":
+    for modelo in CATALOGO_MAQUINAS:
+        linhas = verificar_paridade(modelo=modelo)
+        print(f"Paridade online/lote verificada ({modelo}): {linhas} linhas idênticas.")
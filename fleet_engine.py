@@ -0,0 +1,203 @@
+import numpy as np
+from config import *
+from machine_specs import especificacao
+from random_streams import uniformes, contadores, NASCIMENTO, RUIDO, TESTE_SAUDE, REPARO
+
+class FrotaVetorizada:
+    """
+    Motor de simulação alternativo ao `Maquina`: guarda o estado de todo o parque
+    em arrays NumPy (struct-of-arrays) e avança todas as máquinas uma hora por
+    passo vetorizado. As regras e os fluxos aleatórios de cada máquina (`random_streams.py`)
+    são os mesmos de `machine.py`, de modo que os dois motores produzem exatamente os
+    mesmos valores para as mesmas máquinas.
+    """
+    # Arrays com uma linha por máquina (o estado completo, junto com `ids`)
+    ARRAYS = ("fator_desgaste", "valores", "volatilidades", "health_phase", "horas_operadas",
+              "ticks_para_proximo_teste", "problema_ativo", "tempo_reparo_restante", "chaves", "gamas")
+    def __init__(self, modelo, seed=None):
+        self.modelo = modelo
+        self.config = CATALOGO_MAQUINAS[modelo]
+        self.rng = np.random.default_rng(seed)
+
+        # --- Constantes do modelo, compiladas uma única vez (machine_specs.py) ---
+        self.spec = especificacao(modelo)
+        self.sensor_ids = list(self.spec.sensor_ids)
+        self.faixa_min = self.spec.faixa_min
+        self.faixa_max = self.spec.faixa_max
+        self.centro_faixa = self.spec.centro_faixa
+        self.problemas = list(self.spec.problemas)
+        self.tempos_reparo = self.spec.tempos_reparo
+
+        # --- Estado do parque (uma linha por máquina) ---
+        n_sensores = len(self.sensor_ids)
+        self.ids = []
+        self.fator_desgaste = np.empty(0, dtype=np.float64)
+        self.valores = np.empty((0, n_sensores), dtype=np.float64)
+        self.volatilidades = np.empty((0, n_sensores), dtype=np.float64)
+        self.health_phase = np.empty(0, dtype=np.int64)
+        self.horas_operadas = np.empty(0, dtype=np.int64)
+        self.ticks_para_proximo_teste = np.empty(0, dtype=np.int64)
+        self.problema_ativo = np.empty(0, dtype=np.int64)
+        self.tempo_reparo_restante = np.empty(0, dtype=np.int64)
+        # Fluxo aleatório de cada máquina; `rng` só sorteia fluxos de máquinas adicionadas sem um
+        self.chaves = np.empty(0, dtype=np.uint64)
+        self.gamas = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _fluxos(self, fluxos, n):
+        if fluxos is not None:
+            return fluxos
+        return (self.rng.integers(0, 2**64, n, dtype=np.uint64, endpoint=False),
+                self.rng.integers(0, 2**64, n, dtype=np.uint64, endpoint=False) | np.uint64(1))
+
+    def adicionar_maquinas(self, machine_ids, fluxos=None):
+        """
+        Acrescenta novas máquinas ao final dos arrays e devolve seus índices. `fluxos` são os
+        arrays (chaves, gamas) dos fluxos aleatórios delas (ver `random_streams.fluxos_das_vagas`).
+        """
+        n_novas = len(machine_ids)
+        inicio = len(self.ids)
+        self.ids.extend(machine_ids)
+
+        n_sensores = len(self.sensor_ids)
+        self.fator_desgaste = np.concatenate([self.fator_desgaste, np.zeros(n_novas)])
+        self.valores = np.concatenate([self.valores, np.zeros((n_novas, n_sensores))])
+        self.volatilidades = np.concatenate([self.volatilidades, np.ones((n_novas, n_sensores))])
+        self.health_phase = np.concatenate([self.health_phase, np.zeros(n_novas, dtype=np.int64)])
+        self.horas_operadas = np.concatenate([self.horas_operadas, np.zeros(n_novas, dtype=np.int64)])
+        self.ticks_para_proximo_teste = np.concatenate([self.ticks_para_proximo_teste, np.zeros(n_novas, dtype=np.int64)])
+        self.problema_ativo = np.concatenate([self.problema_ativo, np.full(n_novas, -1, dtype=np.int64)])
+        self.tempo_reparo_restante = np.concatenate([self.tempo_reparo_restante, np.zeros(n_novas, dtype=np.int64)])
+        chaves, gamas = self._fluxos(fluxos, n_novas)
+        self.chaves = np.concatenate([self.chaves, np.asarray(chaves, dtype=np.uint64)])
+        self.gamas = np.concatenate([self.gamas, np.asarray(gamas, dtype=np.uint64)])
+
+        indices = np.arange(inicio, inicio + n_novas)
+        self._inicializar(indices)
+        return indices
+
+    def substituir_maquinas(self, indices, novos_ids, fluxos=None):
+        """Reaproveita as linhas `indices` para máquinas novas (equivale a criar um novo `Maquina`)."""
+        for i, machine_id in zip(indices, novos_ids):
+            self.ids[i] = machine_id
+        indices = np.asarray(indices, dtype=np.int64)
+        self.chaves[indices], self.gamas[indices] = self._fluxos(fluxos, len(indices))
+        self._inicializar(indices)
+
+    def _sortear(self, indices, horas, finalidade, posicoes=0):
+        """Números do fluxo de cada máquina em `indices` (mesmos contadores de `Maquina._sortear`)."""
+        return uniformes(self.chaves[indices], self.gamas[indices], contadores(horas, finalidade, posicoes))
+
+    def _inicializar(self, indices):
+        n = len(indices)
+        if n == 0:
+            return
+        n_sensores = len(self.sensor_ids)
+        # Sorteios da hora 0: nova/usada, desgaste inicial e o valor inicial de cada sensor
+        u = self._sortear(indices[:, None], np.zeros((n, 1), dtype=np.uint64), NASCIMENTO, np.arange(2 + n_sensores))
+        self.fator_desgaste[indices] = np.where(
+            u[:, 0] < 0.3,
+            FATOR_DESGASTE_INICIAL_MIN_NOVA + (FATOR_DESGASTE_INICIAL_MAX_NOVA - FATOR_DESGASTE_INICIAL_MIN_NOVA) * u[:, 1],
+            FATOR_DESGASTE_INICIAL_MIN_USADA + (FATOR_DESGASTE_INICIAL_MAX_USADA - FATOR_DESGASTE_INICIAL_MIN_USADA) * u[:, 1]
+        )
+        self.valores[indices] = self.faixa_min + (self.faixa_max - self.faixa_min) * u[:, 2:]
+        self.volatilidades[indices] = 1.0
+        self.health_phase[indices] = FASES_SAUDE["Normal"]
+        self.horas_operadas[indices] = 0
+        self.ticks_para_proximo_teste[indices] = HORAS_ENTRE_TESTES_DE_SAUDE
+        self.problema_ativo[indices] = -1
+        self.tempo_reparo_restante[indices] = 0
+
+    def exportar_estado(self):
+        """Cópia dos IDs e dos arrays de estado (ver `ARRAYS`), para `snapshot.py`."""
+        return list(self.ids), {nome: getattr(self, nome).copy() for nome in self.ARRAYS}
+
+    def carregar_estado(self, ids, arrays):
+        """Substitui todo o parque pelo estado exportado por `exportar_estado` (os arrays são copiados)."""
+        self.ids = list(ids)
+        for nome in self.ARRAYS:
+            setattr(self, nome, np.array(arrays[nome], dtype=getattr(self, nome).dtype))
+
+    def simular_tick(self, indices):
+        """
+        Avança uma hora para as máquinas em `indices` (todas fora de falha).
+        Retorna uma máscara booleana, alinhada com `indices`, das máquinas que falharam neste tick.
+        """
+        horas = self.horas_operadas[indices] + 1
+        self.horas_operadas[indices] = horas
+        desgaste = self.fator_desgaste[indices] + AUMENTO_DESGASTE_POR_HORA
+        valores = self.valores[indices]
+        volatilidades = self.volatilidades[indices]
+
+        ruido = (self._sortear(indices[:, None], horas[:, None], RUIDO, np.arange(len(self.sensor_ids))) - 0.5) * volatilidades
+        tendencia_degragacao = (valores - self.centro_faixa) * 0.001
+        valores += ruido + tendencia_degragacao
+
+        # --- Teste de saúde periódico (eventos de degradação) ---
+        ticks = self.ticks_para_proximo_teste[indices] - 1
+        em_teste = np.flatnonzero(ticks <= 0)
+        if len(em_teste):
+            chance_de_evento = desgaste[em_teste] / CHANCE_DE_EVENTO_DIVISOR
+            sorteio = self._sortear(indices[em_teste], horas[em_teste], TESTE_SAUDE, 0)
+            afetadas = em_teste[sorteio < chance_de_evento]
+            sensores_afetados = (self._sortear(indices[afetadas], horas[afetadas], TESTE_SAUDE, 1)
+                                 * len(self.sensor_ids)).astype(np.int64)
+            volatilidades[afetadas, sensores_afetados] *= AUMENTO_VOLATILIDADE_SENSOR
+            ticks[em_teste] = HORAS_ENTRE_TESTES_DE_SAUDE
+
+        # --- Fase de saúde ---
+        volatilidade_max = volatilidades.max(axis=1)
+        fase = np.where(
+            (desgaste > 850) | (volatilidade_max > 3), FASES_SAUDE["Risco_Iminente"],
+            np.where((desgaste > 600) | (volatilidade_max > 1.5), FASES_SAUDE["Alerta"], FASES_SAUDE["Normal"])
+        )
+
+        # --- Gatilhos de falha: vale o primeiro problema do catálogo que disparar ---
+        problema = self.spec.problemas_disparados(desgaste, valores)
+        falhou = problema >= 0
+        fase[falhou] = FASES_SAUDE["Falha"]
+
+        self.fator_desgaste[indices] = desgaste
+        self.valores[indices] = valores
+        self.volatilidades[indices] = volatilidades
+        self.ticks_para_proximo_teste[indices] = ticks
+        self.health_phase[indices] = fase
+        if falhou.any():
+            idx_falhas = indices[falhou]
+            self.problema_ativo[idx_falhas] = problema[falhou]
+            self.tempo_reparo_restante[idx_falhas] = self.tempos_reparo[problema[falhou]]
+        return falhou
+
+    def concluir_reparo(self, indices):
+        """Equivalente vetorizado de `Maquina.concluir_reparo`."""
+        if len(indices) == 0:
+            return
+        indices = np.asarray(indices)
+        u = self._sortear(indices[:, None], self.horas_operadas[indices][:, None], REPARO, np.arange(1 + len(self.sensor_ids)))
+        self.fator_desgaste[indices] += AUMENTO_DESGASTE_POS_REPARO_MIN + (AUMENTO_DESGASTE_POS_REPARO_MAX - AUMENTO_DESGASTE_POS_REPARO_MIN) * u[:, 0]
+        self.volatilidades[indices] = 1.0
+        self.valores[indices] = self.faixa_min + (self.faixa_max - self.faixa_min) * u[:, 1:]
+        self.health_phase[indices] = FASES_SAUDE["Normal"]
+        self.problema_ativo[indices] = -1
+        self.tempo_reparo_restante[indices] = 0
+
+    def valores_log(self, indices):
+        """Matriz (máquinas x `spec.colunas_valores`): desgaste, valores e volatilidades dos sensores."""
+        return np.column_stack([self.fator_desgaste[indices], self.valores[indices], self.volatilidades[indices]])
+
+    def registros(self, indices):
+        """Estado atual das máquinas em `indices` no mesmo formato de colunas do histórico do simulador."""
+        registros = {
+            'machine_id': [self.ids[i] for i in indices],
+            'horas_operadas': self.horas_operadas[indices],
+            'health_phase': self.health_phase[indices],
+            'fator_desgaste': self.fator_desgaste[indices],
+        }
+        valores = self.valores[indices]
+        volatilidades = self.volatilidades[indices]
+        for j, (sensor_id, coluna_volatilidade) in enumerate(zip(self.sensor_ids, self.spec.colunas_volatilidade)):
+            registros[sensor_id] = valores[:, j]
+            registros[coluna_volatilidade] = volatilidades[:, j]
+        return registros
@@ -0,0 +1,105 @@
+from collections import deque
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from config import PAINEL_PONTOS_GRAFICO
+
+class GraficosAoVivo:
+    """
+    Gráficos de vazão (ticks/s) e acurácia do ML ao longo dos ciclos, para o painel do `main_app.py`.
+
+    Usam blitting: o fundo (eixos, ticks e grades) é desenhado uma vez e guardado, e a cada quadro
+    só as linhas são redesenhadas sobre ele. O desenho completo só acontece quando uma escala muda
+    (a janela de ciclos avança meia largura, a vazão sai da faixa) ou a janela é redimensionada.
+    Cada quadro acrescenta um único ponto, com a média dos ciclos desde o quadro anterior, então
+    o custo por quadro não depende da velocidade da simulação.
+    """
+    def __init__(self, master, pontos=PAINEL_PONTOS_GRAFICO):
+        self.fig = Figure(figsize=(6, 3.4))
+        self.ax_vazao, self.ax_acuracia = self.fig.subplots(2, 1, sharex=True)
+        self.linha_vazao = self.ax_vazao.plot([], [], color='tab:blue', animated=True)[0]
+        self.linha_acuracia = self.ax_acuracia.plot([], [], color='tab:green', animated=True)[0]
+        self.ax_vazao.set_ylabel("Ticks/s")
+        self.ax_acuracia.set_ylabel("Acurácia (%)")
+        self.ax_acuracia.set_xlabel("Ciclo")
+        self.ax_acuracia.set_ylim(0, 105)
+        for axis in (self.ax_vazao, self.ax_acuracia):
+            axis.grid(True, linestyle='--', alpha=0.6)
+        self.fig.tight_layout()
+
+        self.ciclos = deque(maxlen=pontos)
+        self.vazoes = deque(maxlen=pontos)
+        self.acuracias = deque(maxlen=pontos)
+        self.anterior = None
+        self.fundo = None
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.canvas.mpl_connect('draw_event', self._guardar_fundo)
+        self.limpar()
+
+    def _guardar_fundo(self, _):
+        """A cada desenho completo (inclusive ao redimensionar) guarda o fundo sem as linhas e as desenha por cima."""
+        self.fundo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._desenhar_linhas()
+
+    def _desenhar_linhas(self):
+        self.ax_vazao.draw_artist(self.linha_vazao)
+        self.ax_acuracia.draw_artist(self.linha_acuracia)
+
+    def limpar(self):
+        """Apaga as séries (nova simulação) e volta às escalas iniciais."""
+        self.ciclos.clear(); self.vazoes.clear(); self.acuracias.clear()
+        self.anterior = None
+        self.linha_vazao.set_data([], [])
+        self.linha_acuracia.set_data([], [])
+        self.ax_vazao.set_xlim(0, 10)
+        self.ax_vazao.set_ylim(0, 1)
+        self.canvas.draw_idle()
+
+    def adicionar(self, resumo):
+        """
+        Acrescenta um ponto com a vazão e a acurácia entre o `ResumoCiclo` anterior e `resumo`.
+        A acurácia é a dos ciclos do intervalo (e não a acumulada), para mostrar mudanças recentes.
+        Retorna False se não houve ciclo novo.
+        """
+        anterior, self.anterior = self.anterior, resumo
+        if anterior is None or resumo.ciclo <= anterior.ciclo:
+            return False
+        segundos = resumo.instante - anterior.instante
+        previsoes = resumo.total_previsoes - anterior.total_previsoes
+        self.ciclos.append(resumo.ciclo)
+        self.vazoes.append((resumo.total_ticks - anterior.total_ticks) / segundos if segundos > 0 else 0.0)
+        self.acuracias.append((resumo.acertos - anterior.acertos) * 100 / previsoes if previsoes > 0 else np.nan)
+        return True
+
+    def _ajustar_escalas(self):
+        """Ajusta os limites que os dados novos ultrapassaram. Retorna True se o fundo precisa ser redesenhado."""
+        mudou = False
+        x_min, x_max = self.ax_vazao.get_xlim()
+        primeiro, ultimo = self.ciclos[0], self.ciclos[-1]
+        if ultimo > x_max:
+            # Avança meia largura de folga: o próximo redesenho completo só vem depois de muitos quadros
+            largura = max(ultimo - primeiro, 10)
+            self.ax_vazao.set_xlim(primeiro, ultimo + largura / 2)
+            mudou = True
+        y_max = self.ax_vazao.get_ylim()[1]
+        maior = max(self.vazoes)
+        if maior > y_max or maior < y_max / 4:
+            self.ax_vazao.set_ylim(0, maior * 1.25 or 1)
+            mudou = True
+        return mudou
+
+    def atualizar(self):
+        """Redesenha as linhas com os pontos atuais (blit) ou, se uma escala mudou, a figura inteira."""
+        if not self.ciclos:
+            return
+        self.linha_vazao.set_data(self.ciclos, self.vazoes)
+        self.linha_acuracia.set_data(self.ciclos, self.acuracias)
+        if self._ajustar_escalas() or self.fundo is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.fundo)
+        self._desenhar_linhas()
+        self.canvas.blit(self.fig.bbox)
@@ -1,14 +1,30 @@
 import os
 import csv
+import time
 from datetime import datetime
-import pandas as pd
+import numpy as np
+from config import (LOG_BUFFERIZADO, LOG_BUFFER_MAX_LINHAS, LOG_BUFFER_MAX_SEGUNDOS, LOG_BACKEND_SENSORES, MODELO_PADRAO,
+                    CATALOGO_MAQUINAS, ARQUIVO_CAUSAS_FALHA)
+from machine_specs import especificacao
+from sensor_storage import ARMAZENAMENTOS, SENSOR_HEADER, ler_log_sensores, nome_log_sensores
 
 class DataLogger:
     """
     Gerencia todas as operações de I/O (Input/Output) para os logs da simulação.
     Cria diretórios, escreve nos logs ativos e arquiva os históricos das máquinas.
+
+    No modo bufferizado os três logs ativos ficam abertos durante toda a simulação e as
+    linhas são acumuladas em memória, sendo gravadas em `flush()` (chamado pelo simulador
+    a cada ciclo) ou quando o buffer passa de `max_linhas_buffer` linhas ou `max_segundos_buffer`.
+
+    A telemetria dos sensores vai para um backend plugável (`sensor_storage.py`): "csv" (texto)
+    ou "colunar" (arquivos binários de tipo fixo, mapeáveis em memória). Cada modelo de máquina
+    tem o seu próprio log de sensores, com as colunas dos seus sensores (ver `nome_log_sensores`).
+    Os relatórios arquivados continuam sendo exportados em CSV.
     """
-    def __init__(self, base_dir="logs"):
+    def __init__(self, base_dir="logs", bufferizado=LOG_BUFFERIZADO,
+                 max_linhas_buffer=LOG_BUFFER_MAX_LINHAS, max_segundos_buffer=LOG_BUFFER_MAX_SEGUNDOS,
+                 backend_sensores=LOG_BACKEND_SENSORES):
         # --- Definição da Estrutura de Diretórios ---
         self.base_dir = base_dir
         self.active_dir = os.path.join(self.base_dir, "active_simulation")
@@ -17,98 +33,245 @@ class DataLogger:
         self.failure_dir = os.path.join(self.archive_dir, "failure_reports")
 
         # --- Definição dos Arquivos de Log Ativos ---
-        self.sensor_log_path = os.path.join(self.active_dir, "sensor_log.csv")
         self.event_log_path = os.path.join(self.active_dir, "event_log.csv")
         self.ml_predictions_log_path = os.path.join(self.active_dir, "ml_predictions_log.csv")
 
         # --- Definição dos Cabeçalhos dos CSVs ---
-        self.SENSOR_HEADER = [
-            'timestamp', 'machine_id', 'health_phase', 'fator_desgaste',
-            'temp_oleo', 'vibracao_motor', 'pressao_hidraulica',
-            'volatilidade_temp', 'volatilidade_vibracao', 'volatilidade_pressao'
-        ]
+        self.SENSOR_HEADER = SENSOR_HEADER
         self.EVENT_HEADER = ['timestamp', 'machine_id', 'event_type', 'description']
         self.ML_PREDICTIONS_HEADER = ['timestamp', 'machine_id', 'true_phase', 'predicted_phase', 'is_correct']
 
-    def setup_directories_and_logs(self):
+        # --- Estado do modo bufferizado ---
+        self.bufferizado = bufferizado
+        self.max_linhas_buffer = max_linhas_buffer
+        self.max_segundos_buffer = max_segundos_buffer
+        self.arquivos_abertos = {}
+        self.buffers = {}
+        self.buffer_sensores = None  # modelo de máquina -> blocos pendentes
+        self.linhas_no_buffer = 0
+        self.ultimo_flush = time.monotonic()
+        # Cópia em memória dos eventos, para quem precisa repassá-los (ver `reter_eventos`)
+        self.eventos_retidos = None
+
+        # --- Armazenamento da telemetria dos sensores (um por modelo de máquina) ---
+        if backend_sensores not in ARMAZENAMENTOS:
+            raise ValueError(f"Backend de log de sensores desconhecido: '{backend_sensores}'.")
+        self.backend_sensores = backend_sensores
+        self.logs_iniciados = False
+        self.retomando = False
+        self.sensor_stores = {}
+        self.sensor_store = self._armazenamento(MODELO_PADRAO)
+
+    def _armazenamento(self, modelo):
+        """Armazenamento do log de sensores de `modelo`, criado (e iniciado) no primeiro uso."""
+        store = self.sensor_stores.get(modelo)
+        if store is None:
+            store = self._novo_armazenamento(modelo)
+            self.sensor_stores[modelo] = store
+            if self.logs_iniciados:
+                store.retomar() if self.retomando else store.iniciar()
+                if self.buffer_sensores is not None:
+                    store.abrir()
+        return store
+
+    def _novo_armazenamento(self, modelo):
+        return ARMAZENAMENTOS[self.backend_sensores](self.active_dir, especificacao(modelo).colunas_valores,
+                                                     nome_log_sensores(modelo))
+
+    def setup_directories_and_logs(self, retomar=False):
         """
         Cria toda a estrutura de diretórios e inicializa os arquivos de log
         no início de uma nova execução da simulação.
+
+        Com `retomar=True` (simulação retomada de um snapshot) os logs já existentes são
+        mantidos e as novas linhas são acrescentadas ao final deles.
         """
         for path in [self.active_dir, self.success_dir, self.failure_dir]:
             os.makedirs(path, exist_ok=True)
         
-        with open(self.sensor_log_path, 'w', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(self.SENSOR_HEADER)
-        with open(self.event_log_path, 'w', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(self.EVENT_HEADER)
-        with open(self.ml_predictions_log_path, 'w', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(self.ML_PREDICTIONS_HEADER)
+        self.fechar()
+        self.retomando = retomar
+        if retomar:
+            # Logs de outros modelos já gravados no diretório: as máquinas deles também podem ser arquivadas
+            for modelo in CATALOGO_MAQUINAS:
+                if modelo not in self.sensor_stores:
+                    store = self._novo_armazenamento(modelo)
+                    if store.existe():
+                        self.sensor_stores[modelo] = store
+        for store in self.sensor_stores.values():
+            store.retomar() if retomar else store.iniciar()
+        self.logs_iniciados = True
+        for path, header in [(self.event_log_path, self.EVENT_HEADER), (self.ml_predictions_log_path, self.ML_PREDICTIONS_HEADER)]:
+            if not (retomar and os.path.exists(path)):
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    csv.writer(f).writerow(header)
+
+        if self.bufferizado:
+            for store in self.sensor_stores.values():
+                store.abrir()
+            self.buffer_sensores = {}
+            for path in [self.event_log_path, self.ml_predictions_log_path]:
+                f = open(path, 'a', newline='', encoding='utf-8')
+                self.arquivos_abertos[path] = (f, csv.writer(f))
+                self.buffers[path] = []
+            self.ultimo_flush = time.monotonic()
         
         print("Logger: Estrutura de diretórios e logs iniciais criados com sucesso.")
 
+    def _escrever(self, path, linhas):
+        """Grava as linhas no log indicado: direto no arquivo ou, no modo bufferizado, no buffer em memória."""
+        if path not in self.buffers:
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(linhas)
+            return
+        self.buffers[path].extend(linhas)
+        self._contar_no_buffer(len(linhas))
+
+    def _escrever_sensores(self, modelo, bloco):
+        """Grava um bloco (timestamp, machine_ids, fases, valores) no log de sensores de `modelo`."""
+        store = self._armazenamento(modelo)
+        if self.buffer_sensores is None:
+            store.gravar([bloco])
+            return
+        self.buffer_sensores.setdefault(modelo, []).append(bloco)
+        self._contar_no_buffer(len(bloco[1]))
+
+    def _contar_no_buffer(self, n_linhas):
+        self.linhas_no_buffer += n_linhas
+        if (self.linhas_no_buffer >= self.max_linhas_buffer
+                or time.monotonic() - self.ultimo_flush >= self.max_segundos_buffer):
+            self.flush()
+
+    def flush(self):
+        """Descarrega os buffers nos arquivos abertos. Sem efeito fora do modo bufferizado."""
+        if self.buffer_sensores:
+            for modelo, blocos in self.buffer_sensores.items():
+                if blocos:
+                    self.sensor_stores[modelo].gravar(blocos)
+                    blocos.clear()
+        for path, linhas in self.buffers.items():
+            if linhas:
+                f, writer = self.arquivos_abertos[path]
+                writer.writerows(linhas)
+                f.flush()
+                linhas.clear()
+        self.linhas_no_buffer = 0
+        self.ultimo_flush = time.monotonic()
+
+    def fechar(self):
+        """Grava o que estiver pendente e fecha os logs ativos mantidos abertos."""
+        self.flush()
+        for store in self.sensor_stores.values():
+            store.fechar()
+        for f, _ in self.arquivos_abertos.values():
+            f.close()
+        self.arquivos_abertos = {}
+        self.buffers = {}
+        self.buffer_sensores = None
+
     def log_sensor_tick(self, machine):
-        """Registra o estado atual dos sensores e da máquina em uma nova linha do log."""
-        with open(self.sensor_log_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().isoformat(),
-                machine.id,
-                machine.health_phase,
-                round(machine.fator_desgaste, 2),
-                round(machine.sensores["temp_oleo"].valor_atual, 2),
-                round(machine.sensores["vibracao_motor"].valor_atual, 2),
-                round(machine.sensores["pressao_hidraulica"].valor_atual, 2),
-                round(machine.sensores["temp_oleo"].volatilidade, 2),
-                round(machine.sensores["vibracao_motor"].volatilidade, 2),
-                round(machine.sensores["pressao_hidraulica"].volatilidade, 2),
-            ])
+        """Registra o estado atual dos sensores e da máquina em uma nova linha do log do seu modelo."""
+        self._escrever_sensores(machine.modelo, (datetime.now(), [machine.id], [machine.health_phase],
+                                                 [machine.valores_log()]))
+
+    def log_sensor_ticks(self, frota, indices):
+        """Registra de uma só vez uma linha por máquina de uma `FrotaVetorizada`."""
+        self._escrever_sensores(frota.modelo, (datetime.now(), [frota.ids[i] for i in indices],
+                                               frota.health_phase[indices], frota.valores_log(indices)))
 
     def log_event(self, machine_id, event_type, description):
         """Registra um evento discreto (ex: início de reparo, falha)."""
-        with open(self.event_log_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().isoformat(),
-                machine_id,
-                event_type,
-                description
-            ])
+        linha = [
+            datetime.now().isoformat(),
+            machine_id,
+            event_type,
+            description
+        ]
+        self._escrever(self.event_log_path, [linha])
+        if self.eventos_retidos is not None:
+            self.eventos_retidos.append(linha)
+
+    def reter_eventos(self):
+        """Passa a guardar em memória uma cópia de cada evento registrado, até `coletar_eventos`."""
+        self.eventos_retidos = []
+
+    def coletar_eventos(self):
+        """Devolve os eventos retidos desde a última coleta e esvazia a lista."""
+        if self.eventos_retidos is None:
+            return []
+        eventos = self.eventos_retidos
+        self.eventos_retidos = []
+        return eventos
             
     def log_ml_prediction(self, machine_id, true_phase, predicted_phase):
         """Registra o resultado de uma previsão do modelo de ML."""
-        with open(self.ml_predictions_log_path, 'a', newline='', encoding='utf-8') as f:
+        is_correct = (true_phase == predicted_phase)
+        self._escrever(self.ml_predictions_log_path, [[
+            datetime.now().isoformat(),
+            machine_id,
+            true_phase,
+            predicted_phase,
+            is_correct
+        ]])
+
+    def log_ml_predictions(self, machine_ids, true_phases, predicted_phases):
+        """Registra o resultado de várias previsões do modelo de ML com uma única escrita no log."""
+        timestamp = datetime.now().isoformat()
+        true_phases = np.asarray(true_phases).tolist()
+        predicted_phases = np.asarray(predicted_phases).tolist()
+        self._escrever(self.ml_predictions_log_path, [
+            [timestamp, machine_id, true_phase, predicted_phase, true_phase == predicted_phase]
+            for machine_id, true_phase, predicted_phase in zip(machine_ids, true_phases, predicted_phases)
+        ])
+
+    def _registrar_causa(self, machine_id, problema):
+        """Acrescenta a causa da falha de uma máquina arquivada ao `ARQUIVO_CAUSAS_FALHA` da pasta de relatórios."""
+        caminho = os.path.join(self.failure_dir, ARQUIVO_CAUSAS_FALHA)
+        novo = not os.path.exists(caminho)
+        with open(caminho, 'a', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            is_correct = (true_phase == predicted_phase)
-            writer.writerow([
-                datetime.now().isoformat(),
-                machine_id,
-                true_phase,
-                predicted_phase,
-                is_correct
-            ])
-
-    def archive_machine_history(self, machine_id, has_failed=True):
+            if novo:
+                writer.writerow(['machine_id', 'problema'])
+            writer.writerow([machine_id, problema])
+
+    def archive_machine_history(self, machine_id, has_failed=True, problema=None):
         """
         Coleta todo o histórico de uma máquina do log ativo e o salva
         em um arquivo de relatório no diretório de arquivamento apropriado.
+        O código do `problema` que causou a falha vai para o `ARQUIVO_CAUSAS_FALHA` da pasta.
         """
         try:
-            # Usar pandas para ler e filtrar o CSV é muito eficiente
-            df_sensors = pd.read_csv(self.sensor_log_path)
-            df_machine_history = df_sensors[df_sensors['machine_id'] == machine_id]
-
-            if df_machine_history.empty:
-                print(f"Logger Warning: Nenhum dado encontrado para a máquina {machine_id} no log ativo.")
-                return
+            # Garante que as linhas ainda em buffer estejam no disco antes da leitura
+            self.flush()
 
             destination_dir = self.failure_dir if has_failed else self.success_dir
             report_path = os.path.join(destination_dir, f"report_{machine_id}.csv")
+
+            # Caminho rápido: copia apenas os trechos da máquina registrados no índice
+            if any(store.exportar_maquina(machine_id, report_path) for store in self.sensor_stores.values()):
+                print(f"Logger: Histórico da máquina {machine_id} arquivado em {report_path}")
+                if has_failed and problema:
+                    self._registrar_causa(machine_id, problema)
+                return
+
+            # Sem entrada no índice (ex: log escrito por outra execução): varre os logs inteiros
+            df_machine_history = None
+            for store in self.sensor_stores.values():
+                df_sensors = ler_log_sensores(self.active_dir, formato=store.formato, nome=store.nome)
+                df_machine_history = df_sensors[df_sensors['machine_id'] == machine_id]
+                if not df_machine_history.empty:
+                    break
+
+            if df_machine_history is None or df_machine_history.empty:
+                print(f"Logger Warning: Nenhum dado encontrado para a máquina {machine_id} no log ativo.")
+                return
             
             # Salva o histórico da máquina no seu próprio arquivo de relatório
             df_machine_history.to_csv(report_path, index=False)
             
             print(f"Logger: Histórico da máquina {machine_id} arquivado em {report_path}")
+            if has_failed and problema:
+                self._registrar_causa(machine_id, problema)
 
         except FileNotFoundError:
             print(f"Logger Error: Arquivo de log ativo não encontrado para arquivamento.")
@@ -1,29 +1,42 @@
 import random
 from config import *
+from machine_specs import especificacao, COLUNA_FATOR_DESGASTE
+from random_streams import uniforme, fluxo_avulso, MASCARA_64, ESCALA_53, NASCIMENTO, RUIDO, TESTE_SAUDE, REPARO
 
 class Sensor:
-    def __init__(self, sensor_id, nome, unidade, faixa_normal):
+    def __init__(self, sensor_id, nome, unidade, faixa_normal, valor_atual=None, volatilidade=1.0):
         self.sensor_id = sensor_id
         self.nome = nome
         self.unidade = unidade
         self.faixa_normal = faixa_normal
-        self.volatilidade = 1.0
-        self.valor_atual = random.uniform(self.faixa_normal[0], self.faixa_normal[1])
+        self.volatilidade = volatilidade
+        if valor_atual is None:
+            valor_atual = random.uniform(self.faixa_normal[0], self.faixa_normal[1])
+        self.valor_atual = valor_atual
 
 class Maquina:
-    def __init__(self, machine_id, modelo):
+    def __init__(self, machine_id, modelo, fluxo=None):
+        """
+        `fluxo` é o par (chave, gama) do fluxo aleatório próprio da máquina (ver `random_streams.py`);
+        sem ele, o par é sorteado do `random` global.
+        """
         self.id = machine_id
         self.modelo = modelo
         self.config = CATALOGO_MAQUINAS[modelo]
+        self.spec = especificacao(modelo)
+        self.chave, self.gama = fluxo if fluxo is not None else fluxo_avulso(random)
 
-        if random.random() < 0.3:
-            self.fator_desgaste = random.uniform(FATOR_DESGASTE_INICIAL_MIN_NOVA, FATOR_DESGASTE_INICIAL_MAX_NOVA)
+        if self._sortear(0, NASCIMENTO, 0) < 0.3:
+            self.fator_desgaste = self._uniforme(FATOR_DESGASTE_INICIAL_MIN_NOVA, FATOR_DESGASTE_INICIAL_MAX_NOVA, 0, NASCIMENTO, 1)
         else:
-            self.fator_desgaste = random.uniform(FATOR_DESGASTE_INICIAL_MIN_USADA, FATOR_DESGASTE_INICIAL_MAX_USADA)
+            self.fator_desgaste = self._uniforme(FATOR_DESGASTE_INICIAL_MIN_USADA, FATOR_DESGASTE_INICIAL_MAX_USADA, 0, NASCIMENTO, 1)
 
         self.sensores = {
-            s_cfg["sensor_id"]: Sensor(**s_cfg) for s_cfg in self.config["sensores_config"]
+            s_cfg["sensor_id"]: Sensor(**s_cfg, valor_atual=self._uniforme(*s_cfg["faixa_normal"], 0, NASCIMENTO, 2 + j))
+            for j, s_cfg in enumerate(self.config["sensores_config"])
         }
+        # Mesma ordem das colunas da especificação (centros de faixa e gatilhos)
+        self.lista_sensores = list(self.sensores.values())
         
         self.health_phase = FASES_SAUDE["Normal"]
         self.horas_operadas = 0
@@ -32,11 +45,44 @@ class Maquina:
         self.problema_ativo = None
         self.tempo_reparo_restante = 0
 
+    def _sortear(self, hora, finalidade, posicao):
+        """Número em [0, 1) do fluxo da máquina; o contador é o mesmo de `random_streams.contador`."""
+        return uniforme(self.chave, self.gama, (hora << 8) | (finalidade << 5) | posicao)
+
+    def _uniforme(self, minimo, maximo, hora, finalidade, posicao):
+        return minimo + (maximo - minimo) * self._sortear(hora, finalidade, posicao)
+
+    @classmethod
+    def de_estado(cls, machine_id, modelo, fator_desgaste, valores, volatilidades, health_phase,
+                  horas_operadas, ticks_para_proximo_teste, problema_ativo, tempo_reparo_restante, chave, gama):
+        """
+        Recria uma máquina a partir de um estado salvo (ver `snapshot.py`) sem sortear nada.
+        `valores` e `volatilidades` seguem a ordem dos sensores do catálogo e `problema_ativo`
+        é a posição do problema em `problemas_possiveis` (-1 se nenhum).
+        """
+        maquina = cls.__new__(cls)
+        maquina.id = machine_id
+        maquina.chave, maquina.gama = chave, gama
+        maquina.modelo = modelo
+        maquina.config = CATALOGO_MAQUINAS[modelo]
+        maquina.spec = especificacao(modelo)
+        maquina.fator_desgaste = fator_desgaste
+        maquina.sensores = {
+            s_cfg["sensor_id"]: Sensor(**s_cfg, valor_atual=valor, volatilidade=volatilidade)
+            for s_cfg, valor, volatilidade in zip(maquina.config["sensores_config"], valores, volatilidades)
+        }
+        maquina.lista_sensores = list(maquina.sensores.values())
+        maquina.health_phase = health_phase
+        maquina.horas_operadas = horas_operadas
+        maquina.ticks_para_proximo_teste = ticks_para_proximo_teste
+        maquina.problema_ativo = maquina.spec.problemas[problema_ativo] if problema_ativo >= 0 else None
+        maquina.tempo_reparo_restante = tempo_reparo_restante
+        return maquina
+
     def realizar_teste_de_saude(self):
         chance_de_evento = self.fator_desgaste / CHANCE_DE_EVENTO_DIVISOR
-        if random.random() < chance_de_evento:
-            sensor_aleatorio_id = random.choice(list(self.sensores.keys()))
-            sensor_afetado = self.sensores[sensor_aleatorio_id]
+        if self._sortear(self.horas_operadas, TESTE_SAUDE, 0) < chance_de_evento:
+            sensor_afetado = self.lista_sensores[int(self._sortear(self.horas_operadas, TESTE_SAUDE, 1) * len(self.lista_sensores))]
             sensor_afetado.volatilidade *= AUMENTO_VOLATILIDADE_SENSOR
 
     def atualizar_fase_saude(self):
@@ -57,9 +103,14 @@ class Maquina:
         self.horas_operadas += 1
         self.fator_desgaste += AUMENTO_DESGASTE_POR_HORA
         
-        for sensor in self.sensores.values():
-            ruido = (random.random() - 0.5) * sensor.volatilidade
-            centro_faixa = sum(sensor.faixa_normal) / 2
+        # `random_streams.uniforme` expandido no laço (é o trecho mais quente do motor por objetos)
+        z = (self.chave + ((self.horas_operadas << 8) | (RUIDO << 5)) * self.gama) & MASCARA_64
+        for sensor, centro_faixa in zip(self.lista_sensores, self.spec.centros):
+            x = z ^ (z >> 30)
+            x = (x * 0xBF58476D1CE4E5B9) & MASCARA_64
+            x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASCARA_64
+            ruido = (((x ^ (x >> 31)) >> 11) * ESCALA_53 - 0.5) * sensor.volatilidade
+            z = (z + self.gama) & MASCARA_64
             tendencia_degragacao = (sensor.valor_atual - centro_faixa) * 0.001
             sensor.valor_atual += ruido + tendencia_degragacao
 
@@ -70,20 +121,31 @@ class Maquina:
             
         self.atualizar_fase_saude()
 
-        for id_problema in self.config["problemas_possiveis"]:
-            problema = CATALOGO_PROBLEMAS[id_problema]
-            gatilho = problema["gatilho_falha"]
-            
-            valor_a_checar = 0
-            if gatilho["sensor_id"] == "fator_desgaste":
+        # Gatilhos pré-compilados (machine_specs.py): coluna, operador e limite já resolvidos
+        for indice_problema, coluna, comparar, limite in self.spec.gatilhos:
+            if coluna == COLUNA_FATOR_DESGASTE:
                 valor_a_checar = self.fator_desgaste
             else:
-                valor_a_checar = self.sensores[gatilho["sensor_id"]].valor_atual
+                valor_a_checar = self.lista_sensores[coluna].valor_atual
 
-            if gatilho["condicao"] == ">" and valor_a_checar > gatilho["valor"]:
-                self.iniciar_falha(id_problema)
+            if comparar(valor_a_checar, limite):
+                self.iniciar_falha(self.spec.problemas[indice_problema])
                 break
     
+    def valores_log(self):
+        """Desgaste, valores e volatilidades dos sensores, na ordem de `spec.colunas_valores`."""
+        return ([self.fator_desgaste] + [s.valor_atual for s in self.lista_sensores]
+                + [s.volatilidade for s in self.lista_sensores])
+
+    def registro(self):
+        """Estado atual no formato de colunas do histórico do simulador."""
+        registro = {'machine_id': self.id, 'horas_operadas': self.horas_operadas, 'health_phase': self.health_phase,
+                    'fator_desgaste': self.fator_desgaste}
+        for sensor, coluna_volatilidade in zip(self.lista_sensores, self.spec.colunas_volatilidade):
+            registro[sensor.sensor_id] = sensor.valor_atual
+            registro[coluna_volatilidade] = sensor.volatilidade
+        return registro
+
     def iniciar_falha(self, id_problema):
         self.health_phase = FASES_SAUDE["Falha"]
         self.problema_ativo = id_problema
@@ -91,11 +153,12 @@ class Maquina:
         self.tempo_reparo_restante = solucao["tempo_base_reparo_h"]
 
     def concluir_reparo(self):
-        self.fator_desgaste += random.uniform(AUMENTO_DESGASTE_POS_REPARO_MIN, AUMENTO_DESGASTE_POS_REPARO_MAX)
+        hora = self.horas_operadas
+        self.fator_desgaste += self._uniforme(AUMENTO_DESGASTE_POS_REPARO_MIN, AUMENTO_DESGASTE_POS_REPARO_MAX, hora, REPARO, 0)
         
-        for sensor in self.sensores.values():
+        for j, sensor in enumerate(self.lista_sensores):
             sensor.volatilidade = 1.0
-            sensor.valor_atual = random.uniform(sensor.faixa_normal[0], sensor.faixa_normal[1])
+            sensor.valor_atual = self._uniforme(sensor.faixa_normal[0], sensor.faixa_normal[1], hora, REPARO, 1 + j)
             
         self.health_phase = FASES_SAUDE["Normal"]
         self.problema_ativo = None
@@ -0,0 +1,138 @@
+import operator
+from types import MappingProxyType
+from typing import NamedTuple
+import numpy as np
+from config import *
+
+# Condições aceitas em "gatilho_falha"; funcionam tanto com escalares quanto com arrays NumPy
+OPERADORES = MappingProxyType({
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+})
+
+# Coluna usada pelos gatilhos sobre o fator de desgaste (as demais são as colunas dos sensores)
+COLUNA_FATOR_DESGASTE = -1
+
+class GatilhoFalha(NamedTuple):
+    indice_problema: int   # posição do problema em `problemas_possiveis`
+    coluna: int            # coluna do sensor, ou COLUNA_FATOR_DESGASTE
+    comparar: object       # função de OPERADORES
+    limite: float
+
+class EspecificacaoModelo(NamedTuple):
+    """
+    Tudo o que a simulação de um modelo de máquina precisa do catálogo, resolvido uma única vez:
+    sensores e faixas (com os centros já calculados), gatilhos de falha com índices de coluna e
+    operadores, e os tempos de reparo de cada problema. Os arrays são somente leitura.
+    """
+    modelo: str
+    codigo: str
+    sensor_ids: tuple
+    colunas_volatilidade: tuple     # nome da coluna de volatilidade de cada sensor
+    colunas_valores: tuple          # colunas numéricas do log de sensores: desgaste, valores e volatilidades
+    faixa_min: np.ndarray
+    faixa_max: np.ndarray
+    centro_faixa: np.ndarray
+    centros: tuple                  # centro_faixa como floats do Python, para o motor por objetos
+    problemas: tuple
+    nomes_problemas: tuple
+    tempos_reparo: np.ndarray
+    gatilhos: tuple                 # GatilhoFalha na ordem do catálogo (o primeiro que disparar vale)
+    gatilho_colunas: np.ndarray     # coluna de cada gatilho no estado montado em `problemas_disparados`
+    gatilho_limites: np.ndarray
+    grupos_operadores: tuple        # (função, posições dos gatilhos que a usam)
+
+    def coluna_sensor(self, sensor_id):
+        return self.sensor_ids.index(sensor_id)
+
+    def problemas_disparados(self, fator_desgaste, valores):
+        """
+        Avalia todos os gatilhos de uma vez para um lote de máquinas. `fator_desgaste` tem forma (n,)
+        e `valores` (n, n_sensores). Retorna o índice do primeiro problema disparado ou -1.
+        """
+        if not self.gatilhos:
+            return np.full(len(fator_desgaste), -1, dtype=np.int64)
+        # Coluna 0: fator de desgaste; colunas 1..S: sensores (por isso o +1 em gatilho_colunas)
+        estado = np.column_stack([fator_desgaste, valores])
+        checados = estado[:, self.gatilho_colunas]
+        if len(self.grupos_operadores) == 1:
+            comparar, _ = self.grupos_operadores[0]
+            disparou = comparar(checados, self.gatilho_limites)
+        else:
+            disparou = np.empty(checados.shape, dtype=bool)
+            for comparar, posicoes in self.grupos_operadores:
+                disparou[:, posicoes] = comparar(checados[:, posicoes], self.gatilho_limites[posicoes])
+        return np.where(disparou.any(axis=1), np.argmax(disparou, axis=1), -1)
+
+def _somente_leitura(array):
+    array.flags.writeable = False
+    return array
+
+def compilar_modelo(modelo):
+    """Resolve as entradas de CATALOGO_MAQUINAS e CATALOGO_PROBLEMAS de um modelo em uma `EspecificacaoModelo`."""
+    config_modelo = CATALOGO_MAQUINAS[modelo]
+    sensores_config = config_modelo["sensores_config"]
+    sensor_ids = tuple(s_cfg["sensor_id"] for s_cfg in sensores_config)
+    nomes_volatilidade = config_modelo.get("colunas_volatilidade", {})
+    colunas_volatilidade = tuple(nomes_volatilidade.get(s, f"volatilidade_{s}") for s in sensor_ids)
+    faixas = np.array([s_cfg["faixa_normal"] for s_cfg in sensores_config], dtype=np.float64)
+
+    problemas = tuple(config_modelo["problemas_possiveis"])
+    gatilhos = []
+    for indice_problema, id_problema in enumerate(problemas):
+        gatilho = CATALOGO_PROBLEMAS[id_problema]["gatilho_falha"]
+        if gatilho["condicao"] not in OPERADORES:
+            raise ValueError(f"Condição de gatilho desconhecida em '{id_problema}': '{gatilho['condicao']}'.")
+        if gatilho["sensor_id"] == "fator_desgaste":
+            coluna = COLUNA_FATOR_DESGASTE
+        elif gatilho["sensor_id"] in sensor_ids:
+            coluna = sensor_ids.index(gatilho["sensor_id"])
+        else:
+            raise ValueError(f"O gatilho de '{id_problema}' usa o sensor '{gatilho['sensor_id']}', que '{modelo}' não tem.")
+        gatilhos.append(GatilhoFalha(indice_problema, coluna, OPERADORES[gatilho["condicao"]], float(gatilho["valor"])))
+
+    centros = tuple(sum(s_cfg["faixa_normal"]) / 2 for s_cfg in sensores_config)
+    grupos = {}
+    for posicao, gatilho in enumerate(gatilhos):
+        grupos.setdefault(gatilho.comparar, []).append(posicao)
+
+    return EspecificacaoModelo(
+        modelo=modelo,
+        codigo=config_modelo.get("codigo", modelo),
+        sensor_ids=sensor_ids,
+        colunas_volatilidade=colunas_volatilidade,
+        colunas_valores=("fator_desgaste",) + sensor_ids + colunas_volatilidade,
+        faixa_min=_somente_leitura(faixas[:, 0].copy()),
+        faixa_max=_somente_leitura(faixas[:, 1].copy()),
+        # Mesma conta de `sum(faixa_normal) / 2`, para não mudar nenhum bit da simulação
+        centro_faixa=_somente_leitura(np.array(centros)),
+        centros=centros,
+        problemas=problemas,
+        nomes_problemas=tuple(CATALOGO_PROBLEMAS[p]["nome_problema"] for p in problemas),
+        tempos_reparo=_somente_leitura(np.array([
+            CATALOGO_SOLUCOES[CATALOGO_PROBLEMAS[p]["solucao_otima"]]["tempo_base_reparo_h"] for p in problemas
+        ], dtype=np.int64)),
+        gatilhos=tuple(gatilhos),
+        gatilho_colunas=_somente_leitura(np.array([g.coluna + 1 for g in gatilhos], dtype=np.intp)),
+        gatilho_limites=_somente_leitura(np.array([g.limite for g in gatilhos], dtype=np.float64)),
+        grupos_operadores=tuple((comparar, _somente_leitura(np.array(posicoes, dtype=np.intp)))
+                                for comparar, posicoes in grupos.items()),
+    )
+
+# Compilado uma única vez, na importação
+ESPECIFICACOES = MappingProxyType({modelo: compilar_modelo(modelo) for modelo in CATALOGO_MAQUINAS})
+
+def especificacao(modelo):
+    return ESPECIFICACOES[modelo]
+
+def especificacao_do_cabecalho(colunas):
+    """Especificação do modelo de um log ou relatório de sensores, reconhecido pelas colunas do cabeçalho."""
+    colunas = set(colunas)
+    for spec in ESPECIFICACOES.values():
+        if set(spec.sensor_ids) <= colunas:
+            return spec
+    raise ValueError("Cabeçalho sem as colunas de sensores de nenhum modelo do catálogo.")
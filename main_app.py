@@ -1,25 +1,47 @@
+import time
+INICIO_PROCESSO = time.perf_counter()
+
+import math
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
 from datetime import datetime
-from simulator import Simulator
+# Nenhum destes módulos importa pandas, sklearn ou joblib no carregamento: eles só são
+# importados quando usados (o modelo é carregado em segundo plano), então a janela abre rápido.
+from simulator import Simulator, FASES_MONITOR
 from logger import DataLogger
 from ml_model import MLModel
+from config import PAINEL_QUADROS_POR_SEGUNDO, MONITOR_JANELA_CICLOS, APRENDIZADO_ONLINE_ATIVO
+TEMPO_IMPORTACAO = time.perf_counter() - INICIO_PROCESSO
+
+def formatar_percentual(valor):
+    return "N/A" if math.isnan(valor) else f"{valor:.2f}%"  # NaN: fase sem amostras
+
+ESTADOS_MODELO = {"nao_carregado": "Não carregado", "carregando": "Carregando...", "pronto": "Pronto", "falhou": "Falhou"}
 
 class Application(tk.Frame):
     def __init__(self, master=None):
         super().__init__(master)
         self.master = master
         self.master.title("Simulador de Manutenção Preditiva v1.0")
-        self.master.geometry("650x450")
+        self.master.geometry("700x950")
         
         self.logger = DataLogger()
         self.ml_model = MLModel(model_path="predictive_model.joblib")
         self.simulator = Simulator(self.logger, self.ml_model)
+        # A simulação publica um resumo imutável por ciclo; o painel só lê o último publicado
+        self.simulator.publicar_resumos = True
+        self.ultimo_resumo = None
+        self.live_charts = None
 
         self.pack(fill="both", expand=True)
         self.create_widgets()
 
+        self.ml_model.carregar_em_segundo_plano()
+        self.update_model_status()
+        self.master.after_idle(self.report_startup_time)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def create_widgets(self):
         controls_frame = ttk.LabelFrame(self, text="Controles", padding="10")
         controls_frame.pack(side="top", fill="x", padx=10, pady=5)
@@ -33,6 +55,11 @@ class Application(tk.Frame):
         self.start_button.pack(side="left", padx=5)
         self.stop_button = ttk.Button(controls_frame, text="Parar Simulação", command=self.stop_simulation, state="disabled")
         self.stop_button.pack(side="left", padx=5)
+
+        # Atualiza o modelo de ML em segundo plano com os dados da própria simulação (online_learning.py)
+        self.online_var = tk.BooleanVar(value=APRENDIZADO_ONLINE_ATIVO)
+        self.online_check = ttk.Checkbutton(controls_frame, text="Aprendizado online", variable=self.online_var)
+        self.online_check.pack(side="left", padx=5)
         
         main_frame = ttk.Frame(self)
         main_frame.pack(side="top", fill="both", expand=True, padx=10)
@@ -43,13 +70,24 @@ class Application(tk.Frame):
         performance_frame = ttk.LabelFrame(main_frame, text="Desempenho do ML (Ao Vivo)", padding="10")
         performance_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
         
+        timing_frame = ttk.LabelFrame(main_frame, text="Tempo por Fase do Ciclo", padding="10")
+        timing_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+
+        # Os gráficos (e o matplotlib) só são criados ao iniciar a primeira simulação, para a janela abrir rápido
+        self.charts_frame = ttk.LabelFrame(main_frame, text="Vazão e Acurácia (Ao Vivo)", padding="5")
+        self.charts_frame.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+        self.charts_placeholder = ttk.Label(self.charts_frame, text="Os gráficos aparecem ao iniciar a simulação.")
+        self.charts_placeholder.pack(pady=20)
+
         main_frame.columnconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(2, weight=1)
 
         self.status_vars = {
             "Ciclo Atual": tk.StringVar(value="0"),
             "Máquinas Ativas": tk.StringVar(value="0"),
-            "Total de Falhas": tk.StringVar(value="0")
+            "Total de Falhas": tk.StringVar(value="0"),
+            "Modelo de ML": tk.StringVar(value=ESTADOS_MODELO["carregando"])
         }
         for i, (text, var) in enumerate(self.status_vars.items()):
             ttk.Label(status_frame, text=f"{text}:").grid(row=i, column=0, sticky="w", pady=2)
@@ -60,26 +98,77 @@ class Application(tk.Frame):
             "Erros": tk.StringVar(value="0"),
             "Alarmes Falsos": tk.StringVar(value="0"),
             "Riscos Perdidos": tk.StringVar(value="0"),
-            "Acurácia ao Vivo": tk.StringVar(value="N/A")
+            "Acurácia ao Vivo": tk.StringVar(value="N/A"),
+            f"Acurácia ({MONITOR_JANELA_CICLOS} ciclos)": tk.StringVar(value="N/A")
         }
         for i, (text, var) in enumerate(self.perf_vars.items()):
             ttk.Label(performance_frame, text=f"{text}:").grid(row=i, column=0, sticky="w", pady=2)
-            ttk.Label(performance_frame, textvariable=var).grid(row=i, column=1, sticky="e", pady=2)
+            ttk.Label(performance_frame, textvariable=var).grid(row=i, column=1, columnspan=2, sticky="e", pady=2)
+
+        # Precisão e recall de cada fase nos últimos MONITOR_JANELA_CICLOS ciclos
+        linha = len(self.perf_vars)
+        for j, titulo in enumerate(["Fase", "Precisão", "Recall"]):
+            ttk.Label(performance_frame, text=titulo).grid(row=linha, column=j, sticky="w" if j == 0 else "e", pady=(6, 2))
+        self.phase_metric_vars = {}
+        for i, fase in enumerate(FASES_MONITOR, start=linha + 1):
+            ttk.Label(performance_frame, text=f"{fase.replace('_', ' ')}:").grid(row=i, column=0, sticky="w")
+            self.phase_metric_vars[fase] = [tk.StringVar(value="N/A") for _ in range(2)]
+            for j, var in enumerate(self.phase_metric_vars[fase], start=1):
+                ttk.Label(performance_frame, textvariable=var).grid(row=i, column=j, sticky="e", padx=(10, 0))
+
+        # Uma linha por fase: último ciclo (ms), média por ciclo (ms) e fração do tempo total
+        for j, titulo in enumerate(["Fase", "Último ciclo", "Média", "% do total"]):
+            ttk.Label(timing_frame, text=titulo).grid(row=0, column=j, sticky="w" if j == 0 else "e", padx=5)
+        self.timing_vars = {}
+        for i, fase in enumerate(self.simulator.instrumentacao.FASES, start=1):
+            ttk.Label(timing_frame, text=f"{fase}:").grid(row=i, column=0, sticky="w", padx=5)
+            self.timing_vars[fase] = [tk.StringVar(value="-") for _ in range(3)]
+            for j, var in enumerate(self.timing_vars[fase], start=1):
+                ttk.Label(timing_frame, textvariable=var).grid(row=i, column=j, sticky="e", padx=5)
+        self.timing_contadores_var = tk.StringVar(value="Instrumentação desativada (INSTRUMENTACAO_ATIVA em config.py).")
+        ttk.Label(timing_frame, textvariable=self.timing_contadores_var).grid(
+            row=len(self.timing_vars) + 1, column=0, columnspan=4, sticky="w", padx=5, pady=(5, 0))
+        for j in range(4):
+            timing_frame.columnconfigure(j, weight=1)
 
         log_frame = ttk.LabelFrame(self, text="Log de Eventos", padding="10")
         log_frame.pack(side="bottom", fill="both", expand=True, padx=10, pady=(5,10))
         self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=5, state="disabled")
         self.log_text.pack(fill="both", expand=True)
 
+    def create_live_charts(self):
+        from live_charts import GraficosAoVivo
+        self.charts_placeholder.destroy()
+        self.live_charts = GraficosAoVivo(self.charts_frame)
+
     def log_to_ui(self, message):
         self.log_text.config(state="normal")
         self.log_text.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n")
         self.log_text.see(tk.END)
         self.log_text.config(state="disabled")
 
-    def start_simulation(self):
-        if not self.ml_model.load():
+    def report_startup_time(self):
+        total = time.perf_counter() - INICIO_PROCESSO
+        self.log_to_ui(f"Janela pronta em {total * 1000:.0f} ms (importações: {TEMPO_IMPORTACAO * 1000:.0f} ms).")
+
+    def update_model_status(self):
+        estado = self.ml_model.estado
+        self.status_vars["Modelo de ML"].set(ESTADOS_MODELO[estado])
+        if estado == "carregando":
+            self.master.after(200, self.update_model_status)
+        elif estado == "pronto":
+            self.log_to_ui("Modelo de ML carregado.")
+        elif estado == "falhou":
             self.log_to_ui("ERRO: Falha ao carregar modelo. Execute 'train_model.py' primeiro.")
+
+    def start_simulation(self):
+        if self.ml_model.estado == "carregando":
+            self.log_to_ui("Aguarde: o modelo de ML ainda está sendo carregado.")
+            return
+        if self.ml_model.estado != "pronto":
+            self.log_to_ui("Tentando carregar o modelo de ML novamente...")
+            self.ml_model.carregar_em_segundo_plano()
+            self.update_model_status()
             return
 
         self.logger.setup_directories_and_logs()
@@ -94,6 +183,16 @@ class Application(tk.Frame):
         self.stop_button.config(state="normal")
         self.cycles_entry.config(state="disabled")
         self.log_to_ui("Iniciando simulação...")
+        if self.online_var.get() and not self.simulator.aprendizes:
+            self.simulator.ativar_aprendizado_online()
+            self.log_to_ui("Aprendizado online ativado: o modelo será atualizado durante a simulação.")
+            self.online_check.config(state="disabled")
+
+        if self.live_charts is None:
+            self.create_live_charts()
+        else:
+            self.live_charts.limpar()
+        self.ultimo_resumo = None
 
         self.simulation_thread = threading.Thread(
             target=self.simulator.run_simulation_loop,
@@ -110,26 +209,72 @@ class Application(tk.Frame):
             self.simulator.is_running = False
             self.stop_button.config(state="disabled")
 
+    def on_close(self):
+        """Fecha a janela: sinaliza a parada da simulação e encerra os workers do aprendizado online."""
+        self.simulator.is_running = False
+        self.simulator.encerrar_aprendizado_online()
+        self.master.destroy()
+
     def update_ui_loop(self):
-        if self.simulator.is_running:
-            self.status_vars["Ciclo Atual"].set(str(self.simulator.ciclo_atual))
-            self.status_vars["Máquinas Ativas"].set(str(len(self.simulator.parque_maquinas)))
-            self.status_vars["Total de Falhas"].set(str(self.simulator.total_falhas))
-            
-            stats = self.simulator.performance_monitor.get_stats()
-            self.perf_vars["Acertos"].set(str(stats["acertos"]))
-            self.perf_vars["Erros"].set(str(stats["erros"]))
-            self.perf_vars["Alarmes Falsos"].set(str(stats["alarmes_falsos"]))
-            self.perf_vars["Riscos Perdidos"].set(str(stats["riscos_perdidos"]))
-            self.perf_vars["Acurácia ao Vivo"].set(stats["acuracia_vivo"])
-            
-            self.master.after(1000, self.update_ui_loop)
+        """
+        Quadro do painel, no máximo PAINEL_QUADROS_POR_SEGUNDO vezes por segundo. Lê apenas o último
+        `ResumoCiclo` publicado pela simulação (uma referência trocada atomicamente), sem travas e
+        sem tocar no parque; ciclos publicados entre dois quadros entram juntos no mesmo ponto dos gráficos.
+        """
+        # Verificada antes da leitura, para o resumo do último ciclo ser mostrado antes de encerrar
+        simulando = self.simulation_thread.is_alive()
+        resumo = self.simulator.resumo_publicado
+        if resumo is not None and resumo is not self.ultimo_resumo:
+            self.ultimo_resumo = resumo
+            self.show_summary(resumo)
+            if self.live_charts.adicionar(resumo):
+                self.live_charts.atualizar()
+
+        if simulando:
+            self.master.after(1000 // PAINEL_QUADROS_POR_SEGUNDO, self.update_ui_loop)
         else:
-            if hasattr(self, 'simulation_thread') and not self.simulation_thread.is_alive():
-                self.log_to_ui("Simulação finalizada.")
-                self.start_button.config(state="normal")
-                self.stop_button.config(state="disabled")
-                self.cycles_entry.config(state="normal")
+            self.log_to_ui("Simulação finalizada.")
+            # Uma nova simulação recria os workers se a opção continuar marcada
+            self.simulator.encerrar_aprendizado_online()
+            self.online_check.config(state="normal")
+            self.start_button.config(state="normal")
+            self.stop_button.config(state="disabled")
+            self.cycles_entry.config(state="normal")
+
+    def show_summary(self, resumo):
+        self.status_vars["Ciclo Atual"].set(str(resumo.ciclo))
+        self.status_vars["Máquinas Ativas"].set(str(resumo.num_maquinas))
+        self.status_vars["Total de Falhas"].set(str(resumo.total_falhas))
+        if self.simulator.aprendizes:
+            atualizacoes = sum(aprendiz.atualizacoes for aprendiz in self.simulator.aprendizes.values())
+            self.status_vars["Modelo de ML"].set(f"{ESTADOS_MODELO['pronto']} ({atualizacoes} atualizações online)")
+
+        stats = resumo.get_stats()
+        self.perf_vars["Acertos"].set(str(stats["acertos"]))
+        self.perf_vars["Erros"].set(str(stats["erros"]))
+        self.perf_vars["Alarmes Falsos"].set(str(stats["alarmes_falsos"]))
+        self.perf_vars["Riscos Perdidos"].set(str(stats["riscos_perdidos"]))
+        self.perf_vars["Acurácia ao Vivo"].set(stats["acuracia_vivo"])
+        janela = resumo.metricas["janela"]
+        self.perf_vars[f"Acurácia ({MONITOR_JANELA_CICLOS} ciclos)"].set(formatar_percentual(janela["acuracia"]))
+        for fase, (precisao, recall) in self.phase_metric_vars.items():
+            precisao.set(formatar_percentual(janela["precisao"][fase]))
+            recall.set(formatar_percentual(janela["recall"][fase]))
+        self.update_timing_panel(resumo.tempos)
+
+    def update_timing_panel(self, timing):
+        if timing is None or timing["ciclos"] == 0:
+            return
+        for fase, valores in timing["fases"].items():
+            ultimo, media, percentual = self.timing_vars[fase]
+            ultimo.set(f"{valores['ultimo_ciclo_ms']:.1f} ms")
+            media.set(f"{valores['media_ms']:.1f} ms")
+            percentual.set(f"{valores['percentual']:.1f}%")
+        contadores = timing["contadores_ultimo_ciclo"]
+        self.timing_contadores_var.set(
+            f"Ciclo: {timing['ultimo_ciclo_ms']:.1f} ms | Ticks: {contadores['ticks']} | "
+            f"Linhas de log: {contadores['linhas_sensores'] + contadores['linhas_ml']} | "
+            f"Previsões: {contadores['previsoes']} | Eventos: {contadores['eventos']}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,46 +1,167 @@
 import os
-import joblib
-import pandas as pd
+import threading
+import numpy as np
+from config import CATALOGO_MAQUINAS, MODELO_PADRAO
+from features import esquema_features
+from compiled_forest import FlorestaCompilada, caminho_compilado
+
+# Acima deste número de linhas o `predict` do sklearn (Cython, multi-thread) é mais rápido
+# que a floresta compilada; o .joblib é carregado sob demanda na primeira vez que for preciso.
+LIMITE_LINHAS_COMPILADO = 500
+
+def carregar_modelos_ml(modelos, caminhos=None, n_jobs=None):
+    """
+    Carrega um `MLModel` para cada modelo de máquina em `modelos`. `caminhos` (modelo -> arquivo)
+    substitui o arquivo do catálogo. Modelos que não carregarem ficam com `estado` "falhou" e
+    preveem -1, como um `MLModel` único sem arquivo.
+    """
+    caminhos = caminhos or {}
+    modelos_ml = {}
+    for modelo in modelos:
+        ml_model = MLModel(model_path=caminhos.get(modelo), n_jobs=n_jobs, modelo=modelo)
+        ml_model.load()
+        modelos_ml[modelo] = ml_model
+    return modelos_ml
 
 class MLModel:
-    def __init__(self, model_path="predictive_model.joblib"):
-        self.model_path = model_path
+    """
+    Modelo de ML de um modelo de máquina (`modelo`). Sem `model_path`, usa o arquivo
+    indicado em "arquivo_modelo_ml" no catálogo.
+    """
+    def __init__(self, model_path=None, n_jobs=None, modelo=MODELO_PADRAO):
+        self.modelo = modelo
+        self.model_path = model_path or CATALOGO_MAQUINAS[modelo]["arquivo_modelo_ml"]
+        # Threads do sklearn nos lotes grandes (None mantém o valor salvo no modelo)
+        self.n_jobs = n_jobs
         self.model = None
-        self.features = [
-            'horas_operadas',
-            'fator_desgaste', 'temp_oleo', 'vibracao_motor', 'pressao_hidraulica',
-            'volatilidade_temp', 'volatilidade_vibracao', 'volatilidade_pressao',
-            'temp_oleo_mean_6h', 'temp_oleo_std_6h', 'vibracao_motor_mean_6h',
-            'vibracao_motor_std_6h', 'vibracao_motor_max_6h', 'pressao_hidraulica_mean_6h',
-            'pressao_hidraulica_std_6h', 'temp_oleo_mean_12h', 'temp_oleo_std_12h',
-            'vibracao_motor_mean_12h', 'vibracao_motor_std_12h', 'vibracao_motor_max_12h',
-            'pressao_hidraulica_mean_12h', 'pressao_hidraulica_std_12h',
-            'temp_oleo_mean_24h', 'temp_oleo_std_24h', 'vibracao_motor_mean_24h',
-            'vibracao_motor_std_24h', 'vibracao_motor_max_24h',
-            'pressao_hidraulica_mean_24h', 'pressao_hidraulica_std_24h'
-        ]
+        self.modelo_sklearn = None
+        self.sklearn_indisponivel = False
+        # "nao_carregado", "carregando", "pronto" ou "falhou" (ver `carregar_em_segundo_plano`)
+        self.estado = "nao_carregado"
+        # Mesma ordem de colunas gerada por `features.calcular_features_lote` no treino
+        self.esquema = esquema_features(modelo)
+        self.features = list(self.esquema.nomes_features)
 
     def load(self):
-        if not os.path.exists(self.model_path):
+        """
+        Carrega o modelo. Se houver uma floresta compilada (`.floresta.npz`) tão nova quanto o
+        `.joblib`, ela é usada diretamente, sem unpickling; senão o `.joblib` é carregado,
+        compilado e a versão compilada é gravada ao lado para as próximas cargas.
+        """
+        self.estado = "carregando"
+        carregou = self._carregar()
+        self.estado = "pronto" if carregou else "falhou"
+        return carregou
+
+    def carregar_em_segundo_plano(self):
+        """
+        Chama `load` em uma thread daemon e retorna a thread. O andamento fica em `self.estado`,
+        que pode ser consultado periodicamente (por exemplo, pelo loop de eventos do Tk).
+        """
+        self.estado = "carregando"
+        thread = threading.Thread(target=self.load, daemon=True)
+        thread.start()
+        return thread
+
+    def _carregar(self):
+        caminho_floresta = caminho_compilado(self.model_path)
+        tem_joblib = os.path.exists(self.model_path)
+        if os.path.exists(caminho_floresta) and (not tem_joblib or os.path.getmtime(caminho_floresta) >= os.path.getmtime(self.model_path)):
+            try:
+                self.definir_modelo(FlorestaCompilada.carregar(caminho_floresta))
+                print(f"Modelo de ML compilado carregado com sucesso de '{caminho_floresta}'.")
+                return True
+            except Exception as e:
+                print(f"Aviso: não foi possível usar o modelo compilado '{caminho_floresta}' ({e}). Carregando o .joblib.")
+
+        if not tem_joblib:
             print(f"Erro Crítico: Arquivo do modelo '{self.model_path}' não encontrado.")
             print("Por favor, execute o script 'train_model.py' primeiro.")
             return False
         try:
-            self.model = joblib.load(self.model_path)
+            # Importado aqui: o joblib (e o sklearn, ao desserializar) pesam na inicialização do app
+            import joblib
+            self.definir_modelo(joblib.load(self.model_path))
             print(f"Modelo de ML carregado com sucesso de '{self.model_path}'.")
-            return True
         except Exception as e:
             print(f"Erro ao carregar o modelo de '{self.model_path}'. Erro: {e}")
             return False
 
+        if isinstance(self.model, FlorestaCompilada):
+            try:
+                self.model.salvar(caminho_floresta)
+            except OSError as e:
+                print(f"Aviso: não foi possível gravar o modelo compilado em '{caminho_floresta}'. Erro: {e}")
+        return True
+
+    def definir_modelo(self, model):
+        """
+        Usa `model` para as previsões. Um `RandomForestClassifier` é compilado em uma
+        `FlorestaCompilada`; a ordem das features passa a ser a que o modelo foi treinado.
+        """
+        self.modelo_sklearn = None
+        if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+            self.modelo_sklearn = model
+            model = FlorestaCompilada.compilar(model)
+        nomes = getattr(model, 'nomes_features', None) or getattr(model, 'feature_names_in_', None)
+        if nomes is not None:
+            desconhecidas = set(nomes) - set(self.esquema.nomes_features)
+            if desconhecidas:
+                raise ValueError(f"O modelo usa features que o simulador não calcula para '{self.modelo}': {sorted(desconhecidas)}")
+            self.features = list(nomes)
+        self.model = model
+
+    def trocar_modelo(self, model):
+        """
+        Troca o modelo em uso por `model` (um `RandomForestClassifier` com as mesmas features) sem
+        interromper as previsões: a compilação é feita antes, e cada `predict_lote` usa o modelo
+        inteiro de antes ou o de depois da atribuição de `self.model`, nunca uma mistura.
+        """
+        compilado = FlorestaCompilada.compilar(model)
+        self.modelo_sklearn = model
+        self.model = compilado
+
+    def _carregar_modelo_sklearn(self):
+        """Modelo original do sklearn para lotes grandes, carregado do .joblib só quando necessário."""
+        if self.modelo_sklearn is None and not self.sklearn_indisponivel:
+            try:
+                import joblib
+                self.modelo_sklearn = joblib.load(self.model_path)
+                if self.n_jobs is not None:
+                    self.modelo_sklearn.set_params(n_jobs=self.n_jobs)
+            except Exception as e:
+                print(f"Aviso: lotes grandes continuarão na floresta compilada; falha ao carregar '{self.model_path}'. Erro: {e}")
+                self.sklearn_indisponivel = True
+        return self.modelo_sklearn
+
     def predict(self, feature_dict):
         if self.model is None:
             return -1
         try:
-            input_df = pd.DataFrame([feature_dict])
-            input_df = input_df[self.features]
-            prediction = self.model.predict(input_df)
-            return prediction[0]
-        except Exception as e:
+            linha = [[feature_dict[f] for f in self.features]]
+        except KeyError as e:
             print(f"Erro durante a previsão do ML. Dados de entrada podem estar incompletos. Erro: {e}")
-            return -1
\ No newline at end of file
+            return -1
+        return self.predict_lote(linha)[0]
+
+    def predict_lote(self, X):
+        """
+        Prevê a fase de saúde de várias máquinas em uma única chamada ao modelo.
+        `X` é uma matriz 2-D (uma linha por máquina) com as colunas na ordem de `self.features`.
+        Retorna um array de inteiros; em caso de erro todas as posições recebem -1.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.model is None or len(X) == 0:
+            return np.full(len(X), -1, dtype=np.int64)
+        try:
+            modelo = self.model
+            if isinstance(modelo, FlorestaCompilada):
+                if len(X) <= LIMITE_LINHAS_COMPILADO or self._carregar_modelo_sklearn() is None:
+                    return np.asarray(modelo.predict(X), dtype=np.int64)
+                modelo = self.modelo_sklearn
+            import pandas as pd
+            input_df = pd.DataFrame(X, columns=self.features)
+            return np.asarray(modelo.predict(input_df), dtype=np.int64)
+        except Exception as e:
+            print(f"Erro durante a previsão em lote do ML. Matriz de entrada pode estar incompleta. Erro: {e}")
+            return np.full(len(X), -1, dtype=np.int64)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+import numpy as np
+
+from config import *
+
+class BufferTreino:
+    """
+    Últimas `capacidade` linhas rotuladas (features na ordem do modelo e a fase real), em um buffer
+    circular de tamanho fixo. `adicionar` é chamado pela thread da simulação e `copiar` pelo worker
+    de treino; o lock só protege as cópias de memória, então a simulação nunca espera um treino.
+    """
+    def __init__(self, capacidade, n_features):
+        self.capacidade = capacidade
+        # float32: as árvores do sklearn convertem as features para float32 de qualquer forma
+        self.X = np.empty((capacidade, n_features), dtype=np.float32)
+        self.y = np.empty(capacidade, dtype=np.int8)
+        self.posicao = 0
+        self.tamanho = 0
+        self.novas = 0   # linhas recebidas desde a última cópia
+        self.lock = threading.Lock()
+
+    def adicionar(self, X, y):
+        X = np.asarray(X)[-self.capacidade:]
+        y = np.asarray(y)[-self.capacidade:]
+        n = len(y)
+        with self.lock:
+            inicio = self.posicao
+            primeira = min(n, self.capacidade - inicio)
+            self.X[inicio:inicio + primeira] = X[:primeira]
+            self.y[inicio:inicio + primeira] = y[:primeira]
+            self.X[:n - primeira] = X[primeira:]
+            self.y[:n - primeira] = y[primeira:]
+            self.posicao = (inicio + n) % self.capacidade
+            self.tamanho = min(self.capacidade, self.tamanho + n)
+            self.novas += n
+
+    def copiar(self, classes):
+        """
+        Cópia das linhas guardadas (em qualquer ordem) cuja fase está em `classes`, zerando a contagem
+        de linhas novas. Retorna None, sem zerar a contagem, se alguma das `classes` ainda não aparece.
+        """
+        with self.lock:
+            y = self.y[:self.tamanho]
+            manter = np.isin(y, classes)
+            if len(np.unique(y[manter])) < len(classes):
+                return None
+            self.novas = 0
+            return self.X[:self.tamanho][manter], y[manter]
+
+
+class AprendizOnline:
+    """
+    Atualiza o modelo de um `MLModel` com os dados da própria simulação.
+
+    O simulador entrega a cada ciclo as features e as fases reais das máquinas avaliadas
+    (`registrar`). A cada `linhas_por_atualizacao` linhas novas, uma thread de fundo treina
+    `arvores_por_atualizacao` árvores novas sobre o buffer (warm start do RandomForest em uma cópia
+    do modelo atual), descarta as mais antigas acima de `max_arvores` e troca o modelo do `MLModel`
+    com `trocar_modelo`, sem pausar o laço da simulação. O sklearn só é importado no worker.
+    """
+    def __init__(self, ml_model, capacidade=APRENDIZADO_BUFFER_LINHAS,
+                 linhas_por_atualizacao=APRENDIZADO_LINHAS_POR_ATUALIZACAO,
+                 arvores_por_atualizacao=APRENDIZADO_ARVORES_POR_ATUALIZACAO, max_arvores=APRENDIZADO_MAX_ARVORES):
+        self.ml_model = ml_model
+        self.capacidade = capacidade
+        # Criado no primeiro `registrar`, com o número de colunas das features que o modelo carregado usa
+        self.buffer = None
+        self.linhas_por_atualizacao = linhas_por_atualizacao
+        self.arvores_por_atualizacao = arvores_por_atualizacao
+        self.max_arvores = max_arvores
+        self.atualizacoes = 0
+        self.ultimo_treino_s = 0.0
+        self.aguardando_classes = False  # Evita repetir o aviso de atualização adiada a cada ciclo
+        self.sinal = threading.Event()
+        self.ativo = True
+        self.thread = threading.Thread(target=self._executar, daemon=True, name=f"aprendiz-{ml_model.modelo}")
+        self.thread.start()
+
+    def registrar(self, X, fases_reais):
+        """Chamado pela simulação com a matriz de features (colunas de `ml_model.features`) e as fases reais."""
+        if len(X) == 0:
+            return
+        if self.buffer is None:
+            self.buffer = BufferTreino(self.capacidade, X.shape[1])
+        self.buffer.adicionar(X, fases_reais)
+        if self.buffer.novas >= self.linhas_por_atualizacao:
+            self.sinal.set()
+
+    def encerrar(self):
+        """Para o worker; um treino em andamento termina (e ainda troca o modelo) antes da thread sair."""
+        self.ativo = False
+        self.sinal.set()
+
+    def _executar(self):
+        while True:
+            self.sinal.wait()
+            self.sinal.clear()
+            if not self.ativo:
+                return
+            try:
+                self.atualizar()
+            except Exception as e:
+                print(f"Aprendizado online ({self.ml_model.modelo}): atualização descartada. Erro: {e}")
+
+    def atualizar(self):
+        """Treina as árvores novas sobre o buffer atual e troca o modelo. Retorna False se não foi possível."""
+        base = self.ml_model.modelo_sklearn or self.ml_model._carregar_modelo_sklearn()
+        if base is None:
+            print(f"Aprendizado online ({self.ml_model.modelo}): sem modelo do sklearn para continuar o treino.")
+            return False
+        # As árvores antigas e as novas precisam das mesmas classes: linhas de fases que o modelo não
+        # conhece são descartadas, e o treino espera até o buffer ter todas as fases do modelo
+        copia = self.buffer.copiar(base.classes_)
+        if copia is None:
+            if not self.aguardando_classes:
+                print(f"Aprendizado online ({self.ml_model.modelo}): atualização adiada, o buffer ainda não tem "
+                      f"linhas de todas as fases do modelo ({base.classes_.tolist()}).")
+                self.aguardando_classes = True
+            return False
+        self.aguardando_classes = False
+        X, y = copia
+
+        import pandas as pd
+        inicio = time.perf_counter()
+        novo = copy.copy(base)
+        novo.estimators_ = list(base.estimators_)
+        n_jobs = base.n_jobs if self.ml_model.n_jobs is None else self.ml_model.n_jobs
+        # Uma thread só: o treino fica em segundo plano e não disputa os núcleos com a simulação
+        novo.set_params(warm_start=True, n_jobs=1, n_estimators=len(novo.estimators_) + self.arvores_por_atualizacao,
+                        random_state=int(np.random.SeedSequence([self.atualizacoes]).generate_state(1)[0]))
+        novo.fit(pd.DataFrame(X, columns=self.ml_model.features), y)
+        if len(novo.estimators_) > self.max_arvores:
+            novo.estimators_ = novo.estimators_[-self.max_arvores:]
+        novo.set_params(warm_start=False, n_jobs=n_jobs, n_estimators=len(novo.estimators_))
+
+        self.ml_model.trocar_modelo(novo)
+        self.atualizacoes += 1
+        self.ultimo_treino_s = time.perf_counter() - inicio
+        print(f"Aprendizado online ({self.ml_model.modelo}): modelo atualizado com {len(y)} linhas em "
+              f"{self.ultimo_treino_s:.1f} s ({len(novo.estimators_)} árvores, atualização {self.atualizacoes}).")
+        return True
@@ -0,0 +1,81 @@
+import zlib
+import numpy as np
+
+# Fluxos aleatórios por máquina, baseados em contador (no estilo do SplitMix64): o n-ésimo número
+# de uma máquina é uma função pura de (chave, gama, n), sem estado compartilhado. Assim a trajetória
+# de cada máquina não depende da ordem em que o parque é percorrido, e os motores por objetos e
+# vetorizado, com ou sem fragmentos, produzem exatamente os mesmos valores para a mesma semente.
+#
+# O contador de cada sorteio é montado a partir da hora de operação da máquina, da finalidade do
+# sorteio e da posição dele naquela hora: (hora << 8) | (finalidade << 5) | posicao.
+
+MASCARA_64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MULT_1 = 0xBF58476D1CE4E5B9
+_MULT_2 = 0x94D049BB133111EB
+ESCALA_53 = 2.0 ** -53
+
+# Finalidades dos sorteios (bits 5-7 do contador); até 32 sorteios por finalidade e hora
+NASCIMENTO = 0
+RUIDO = 1
+TESTE_SAUDE = 2
+REPARO = 3
+
+# Geração da vaga ocupa os 24 bits baixos da identidade da máquina
+BITS_GERACAO = 24
+
+def contador(hora, finalidade, posicao=0):
+    return (hora << 8) | (finalidade << 5) | posicao
+
+def _misturar(z):
+    z = ((z ^ (z >> 30)) * _MULT_1) & MASCARA_64
+    z = ((z ^ (z >> 27)) * _MULT_2) & MASCARA_64
+    return z ^ (z >> 31)
+
+def uniforme(chave, gama, n):
+    """Número em [0, 1) na posição `n` do fluxo (chave, gama); mesmos bits de `uniformes`."""
+    return (_misturar((chave + n * gama) & MASCARA_64) >> 11) * ESCALA_53
+
+def _misturar_array(z):
+    """Mesma mistura de `_misturar`, no próprio array `z` (uint64) para não alocar temporários a cada passo."""
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(_MULT_1)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(_MULT_2)
+    z ^= z >> np.uint64(31)
+    return z
+
+def uniformes(chaves, gamas, contadores):
+    """Versão vetorizada de `uniforme` (os arrays são combinados por broadcasting; aritmética módulo 2**64)."""
+    z = np.array(contadores, dtype=np.uint64, ndmin=1) * np.asarray(gamas, dtype=np.uint64)
+    z += np.asarray(chaves, dtype=np.uint64)
+    _misturar_array(z)
+    z >>= np.uint64(11)
+    u = z.astype(np.float64)
+    u *= ESCALA_53
+    return u
+
+def contadores(horas, finalidade, posicoes=0):
+    """Versão vetorizada de `contador` para um array de horas (uint64)."""
+    return (np.asarray(horas, dtype=np.uint64) << np.uint64(8)) | np.uint64((finalidade << 5)) | np.asarray(posicoes, dtype=np.uint64)
+
+def base_do_modelo(seed, modelo_codigo):
+    """(chave, gama) do qual derivam os fluxos de todas as máquinas de um modelo na execução `seed`."""
+    chave, gama = np.random.SeedSequence([seed, zlib.crc32(modelo_codigo.encode('utf-8'))]).generate_state(2, np.uint64)
+    return int(chave), int(gama) | 1
+
+def fluxos_das_vagas(base, vagas, geracoes):
+    """
+    (chaves, gamas) das máquinas que ocupam as `vagas` (posição global da máquina entre as do seu
+    modelo) na `geracoes`-ésima substituição. A identidade não depende do ID nem do fragmento,
+    então a mesma máquina recebe o mesmo fluxo em qualquer divisão do parque.
+    """
+    chave_base, gama_base = base
+    identidades = (np.asarray(vagas, dtype=np.uint64) << np.uint64(BITS_GERACAO)) | np.asarray(geracoes, dtype=np.uint64)
+    chaves = _misturar_array(identidades * np.uint64(gama_base) + np.uint64(chave_base))
+    gamas = _misturar_array(chaves ^ np.uint64(GOLDEN_GAMMA)) | np.uint64(1)
+    return chaves, gamas
+
+def fluxo_avulso(gerador):
+    """(chave, gama) sorteados de `gerador` (um `random.Random` ou o módulo `random`), para máquinas fora de um parque."""
+    return gerador.getrandbits(64), gerador.getrandbits(64) | 1
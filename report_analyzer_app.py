@@ -1,19 +1,165 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import glob
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
 
 try:
-    from config import CATALOGO_MAQUINAS, FASES_SAUDE
+    from config import CATALOGO_MAQUINAS, CATALOGO_PROBLEMAS, FASES_SAUDE, MODELO_PADRAO, ANALISADOR_CACHE_RELATORIOS, ANALISADOR_PONTOS_GRAFICO
+    from machine_specs import ESPECIFICACOES, especificacao_do_cabecalho
+    from failure_store import ArmazemFalhas, FASES_RESUMO, PROBLEMA_DESCONHECIDO
 except ImportError:
     print("ERRO: Não foi possível encontrar o arquivo 'config.py'.")
     print("Certifique-se de que todos os arquivos do projeto estão na mesma pasta.")
     CATALOGO_MAQUINAS = {}
+    CATALOGO_PROBLEMAS = {}
     FASES_SAUDE = {"Normal": 0, "Alerta": 1, "Risco_Iminente": 2, "Falha": 3}
+    MODELO_PADRAO = None
+    ANALISADOR_CACHE_RELATORIOS = 32
+    ANALISADOR_PONTOS_GRAFICO = 2000
+    ESPECIFICACOES = {}
+    ArmazemFalhas = None
+    FASES_RESUMO = ("Normal", "Alerta", "Risco_Iminente")
+    PROBLEMA_DESCONHECIDO = "DESCONHECIDO"
+
+
+def trechos_de_fases(fases):
+    """
+    Codificação por trechos (run-length) da sequência de fases: retorna os arrays (inicios, fins, valores)
+    de cada trecho contínuo, com `fins` inclusivo. Uma única passada vetorizada para todas as fases.
+    """
+    fases = np.asarray(fases)
+    if len(fases) == 0:
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, fases[:0]
+    mudancas = np.flatnonzero(fases[1:] != fases[:-1]) + 1
+    inicios = np.concatenate(([0], mudancas))
+    fins = np.concatenate((mudancas - 1, [len(fases) - 1]))
+    return inicios, fins, fases[inicios]
+
+def reduzir_lttb(y, pontos):
+    """
+    Índices dos pontos mantidos pelo Largest-Triangle-Three-Buckets (x = posição da amostra):
+    preserva picos e vales da série com `pontos` amostras. Séries menores são mantidas inteiras.
+    """
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    # Baldes internos [limites[k], limites[k+1]); o primeiro e o último ponto são sempre mantidos
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    acumulado = np.concatenate(([0.0], np.cumsum(y)))
+    tamanhos = np.diff(limites)
+    media_y = np.append((acumulado[limites[1:]] - acumulado[limites[:-1]]) / tamanhos, y[-1])
+    media_x = np.append((limites[:-1] + limites[1:] - 1) / 2.0, n - 1.0)
+
+    indices = np.empty(pontos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for k in range(pontos - 2):
+        inicio, fim = limites[k], limites[k + 1]
+        xa, ya = x[anterior], y[anterior]
+        area = np.abs((xa - media_x[k + 1]) * (y[inicio:fim] - ya) - (xa - x[inicio:fim]) * (media_y[k + 1] - ya))
+        anterior = inicio + int(np.argmax(area))
+        indices[k + 1] = anterior
+    return indices
+
+
+class Relatorio(NamedTuple):
+    """Um relatório de falha já preparado para o gráfico (ver `ler_relatorio`)."""
+    caminho: str
+    machine_id: str
+    modelo: str
+    horas: int
+    series: dict            # coluna -> (posições, valores), já reduzidas para o gráfico
+    eventos: np.ndarray     # posições dos eventos de degradação
+    trechos: tuple          # (inicios, fins, fases) de `trechos_de_fases`
+    duracoes: dict          # fase -> horas totais na fase
+
+def ler_relatorio(caminho, pontos_grafico=ANALISADOR_PONTOS_GRAFICO):
+    """
+    Lê apenas as colunas usadas no gráfico, com tipos compactos (float32/int8), e já calcula os
+    trechos de cada fase, os eventos de degradação e as séries reduzidas por LTTB.
+    """
+    with open(caminho, encoding='utf-8') as f:
+        colunas = f.readline().strip().split(',')
+    spec = especificacao_do_cabecalho(colunas)
+    # Os dois primeiros sensores do modelo são plotados; os eventos são os saltos de volatilidade do
+    # segundo (a vibração, nos modelos do catálogo)
+    sensores = spec.sensor_ids[:2]
+    coluna_eventos = spec.colunas_volatilidade[1]
+    tipos = {coluna: np.float32 for coluna in (*sensores, 'fator_desgaste', coluna_eventos)}
+    tipos['health_phase'] = np.int8
+    df = pd.read_csv(caminho, usecols=['machine_id', *tipos], dtype=dict(tipos, machine_id='category'))
+
+    series = {}
+    for coluna in (*sensores, 'fator_desgaste'):
+        valores = df[coluna].to_numpy()
+        posicoes = reduzir_lttb(valores, pontos_grafico)
+        series[coluna] = (posicoes, valores[posicoes])
+    fases = df['health_phase'].to_numpy()
+    volatilidade = df[coluna_eventos].to_numpy()
+    eventos = np.flatnonzero(np.diff(volatilidade) > 0.1) + 1
+    valores_fase, contagens = np.unique(fases, return_counts=True)
+    return Relatorio(caminho, str(df['machine_id'].iloc[0]) if len(df) else "", spec.modelo, len(df), series, eventos,
+                     trechos_de_fases(fases), dict(zip(valores_fase.tolist(), contagens.tolist())))
+
+
+class CacheRelatorios:
+    """
+    Relatórios já lidos, em um LRU limitado a `capacidade` itens. `pre_carregar` lê um relatório
+    em uma thread de fundo; `obter` devolve do cache, espera a leitura em andamento ou lê na hora.
+    """
+    def __init__(self, capacidade=ANALISADOR_CACHE_RELATORIOS, pontos_grafico=ANALISADOR_PONTOS_GRAFICO):
+        self.capacidade = capacidade
+        self.pontos_grafico = pontos_grafico
+        self.itens = OrderedDict()
+        self.pendentes = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch-relatorios")
+
+    def _ler(self, caminho):
+        relatorio = ler_relatorio(caminho, self.pontos_grafico)
+        with self.lock:
+            self.pendentes.pop(caminho, None)
+            self.itens[caminho] = relatorio
+            self.itens.move_to_end(caminho)
+            while len(self.itens) > self.capacidade:
+                self.itens.popitem(last=False)
+        return relatorio
+
+    def obter(self, caminho):
+        with self.lock:
+            relatorio = self.itens.get(caminho)
+            if relatorio is not None:
+                self.itens.move_to_end(caminho)
+                return relatorio
+            pendente = self.pendentes.get(caminho)
+        if pendente is not None:
+            return pendente.result()
+        return self._ler(caminho)
+
+    def pre_carregar(self, caminho):
+        with self.lock:
+            if caminho in self.itens or caminho in self.pendentes:
+                return
+            self.pendentes[caminho] = self.executor.submit(self._ler, caminho)
+
+    def limpar(self):
+        with self.lock:
+            self.itens.clear()
+
+    def encerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
 class ReportAnalyzerApp(tk.Frame):
@@ -26,10 +172,17 @@ class ReportAnalyzerApp(tk.Frame):
         self.master = master
         self.master.title("Analisador de Relatórios de Falha")
         self.master.geometry("1000x800")
-        
+
         self.report_files = []
         self.current_file_index = -1
-        
+        self.cache = CacheRelatorios()
+        # Armazém de falhas da pasta selecionada; a ingestão roda em segundo plano
+        self.armazem = None
+        self.armazem_futuro = None
+        self.armazem_pendente = False  # Atualização pedida enquanto outra estava em andamento
+        self.executor_armazem = ThreadPoolExecutor(max_workers=1, thread_name_prefix="armazem-falhas")
+        self.fleet_window = None
+
         self.pack(fill="both", expand=True)
         self.create_widgets()
 
@@ -37,156 +190,307 @@ class ReportAnalyzerApp(tk.Frame):
         # --- Frame de Controles Superior ---
         top_frame = ttk.Frame(self)
         top_frame.pack(side="top", fill="x", padx=10, pady=10)
-        
+
         self.select_folder_button = ttk.Button(top_frame, text="Selecionar Pasta de Relatórios", command=self.select_folder)
         self.select_folder_button.pack(side="left")
-        
+
         self.current_file_label = ttk.Label(top_frame, text="Nenhum arquivo carregado", font=("Arial", 10, "italic"))
         self.current_file_label.pack(side="left", padx=20)
-        
+
         self.next_file_button = ttk.Button(top_frame, text="Próximo Arquivo  >>", command=self.load_next_file, state="disabled")
         self.next_file_button.pack(side="right")
-        
+
+        self.fleet_button = ttk.Button(top_frame, text="Visão da Frota", command=self.open_fleet_view, state="disabled")
+        self.fleet_button.pack(side="right", padx=10)
+
         # --- Frame Principal para o Gráfico ---
         self.plot_frame = ttk.Frame(self)
         self.plot_frame.pack(side="top", fill="both", expand=True, padx=10, pady=10)
 
-        # Configuração inicial do canvas do Matplotlib
+        # Configuração inicial do canvas do Matplotlib. O layout é calculado uma única vez aqui,
+        # e não a cada relatório: é a etapa mais cara de um redesenho.
         self.fig, self.ax = plt.subplots(3, 1, figsize=(10, 7), sharex=True)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.plot_frame)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        self.fig.tight_layout(pad=3.0)
+        self.create_plot_artists()
+        self.fig.tight_layout(pad=3.0, rect=[0, 0, 1, 0.96])
+
+    def create_plot_artists(self):
+        """
+        Cria as linhas e a formatação dos eixos uma única vez. A cada relatório só os dados das
+        linhas e os artistas do próprio relatório (faixas, eventos e anotações) são trocados:
+        limpar os eixos recriaria todos os ticks, a etapa mais cara de um redesenho.
+        """
+        self.lines = [
+            self.ax[0].plot([], [], color='orangered', zorder=10)[0],
+            self.ax[1].plot([], [], color='purple', zorder=10)[0],
+            self.ax[2].plot([], [], label='Fator de Desgaste', color='black', linestyle='--')[0],
+        ]
+        self.report_artists = []
+        self.ax[2].set_title("Degradação Interna da Máquina")
+        self.ax[2].set_ylabel("Fator de Desgaste")
+        self.ax[2].set_xlabel("Tempo de Operação (Horas)")
+        for axis in self.ax:
+            axis.grid(True, linestyle='--', alpha=0.6)
 
     def select_folder(self):
         """Abre uma caixa de diálogo para o usuário selecionar uma pasta."""
         folder_path = filedialog.askdirectory(initialdir="logs/archived_data/failure_reports", title="Selecione a pasta 'failure_reports'")
         if not folder_path:
             return
-            
+
         # Encontra todos os arquivos CSV na pasta selecionada
         self.report_files = sorted(glob.glob(os.path.join(folder_path, "report_*.csv")))
-        
+        self.cache.limpar()
+
         if not self.report_files:
             self.current_file_label.config(text=f"Nenhum arquivo .csv encontrado em '{os.path.basename(folder_path)}'")
             self.next_file_button.config(state="disabled")
             return
-            
+
         self.current_file_index = -1
         self.next_file_button.config(state="normal")
         self.load_next_file()
 
+        if ArmazemFalhas is not None:
+            self.armazem = ArmazemFalhas(folder_path)
+            self.update_store()
+
+    def update_store(self):
+        """
+        Lê em segundo plano os relatórios novos da pasta para o armazém de falhas. Se uma leitura
+        já estiver em andamento (ex: de outra pasta), esta é feita assim que aquela terminar.
+        """
+        if self.armazem is None:
+            return
+        if self.armazem_futuro is not None and not self.armazem_futuro.done():
+            self.armazem_pendente = True
+            return
+        self.armazem_pendente = False
+        armazem = self.armazem
+        self.fleet_button.config(state="disabled", text="Indexando relatórios...")
+        self.armazem_futuro = self.executor_armazem.submit(armazem.atualizar)
+        self.after(200, self.check_store, armazem, self.armazem_futuro)
+
+    def check_store(self, armazem, futuro):
+        """Acompanha a ingestão de `armazem` pelo laço do Tk (a thread de fundo não toca nos widgets)."""
+        if not futuro.done():
+            self.after(200, self.check_store, armazem, futuro)
+            return
+        try:
+            futuro.result()
+        except Exception as e:
+            print(f"Erro ao atualizar o armazém de falhas: {e}")
+        if self.armazem_pendente:
+            self.update_store()
+            return
+        # Outra pasta foi escolhida durante a leitura: o resultado deste armazém não é mais exibido
+        if armazem is not self.armazem:
+            return
+        self.fleet_button.config(state="normal", text=f"Visão da Frota ({len(armazem.resumo)})")
+        if self.fleet_window is not None and self.fleet_window.winfo_exists():
+            self.fleet_window.refresh()
+
+    def open_fleet_view(self):
+        """Abre (ou traz para frente) a janela com a visão agregada do parque."""
+        if self.fleet_window is not None and self.fleet_window.winfo_exists():
+            self.fleet_window.lift()
+        else:
+            self.fleet_window = FleetView(self)
+        # Relatórios que chegaram depois da última leitura entram no armazém e a janela se atualiza
+        self.update_store()
+
     def load_next_file(self):
         """Carrega e exibe o próximo arquivo da lista de relatórios."""
         if not self.report_files:
             return
-            
+
         self.current_file_index = (self.current_file_index + 1) % len(self.report_files)
         filepath = self.report_files[self.current_file_index]
-        
+
         filename = os.path.basename(filepath)
         self.current_file_label.config(text=f"Analisando: {filename}", font=("Arial", 10, "bold"))
-        
+
         try:
-            df = pd.read_csv(filepath)
-            self.plot_report(df)
+            self.plot_report(self.cache.obter(filepath))
         except Exception as e:
             print(f"Erro ao ler ou plotar o arquivo {filename}: {e}")
             self.current_file_label.config(text=f"Erro ao carregar {filename}", font=("Arial", 10, "italic"))
+        finally:
+            # Enquanto o usuário analisa este relatório, o próximo já é lido em segundo plano
+            self.cache.pre_carregar(self.report_files[(self.current_file_index + 1) % len(self.report_files)])
 
 
-    def get_phase_spans(self, df, phase_num):
-        """Encontra os blocos de início e fim para uma determinada fase."""
-        spans = []
-        in_span = False
-        start_index = 0
-        for index, row in df.iterrows():
-            is_in_phase = (row['health_phase'] == phase_num)
-            if is_in_phase and not in_span:
-                start_index = index
-                in_span = True
-            elif not is_in_phase and in_span:
-                spans.append((start_index, index -1))
-                in_span = False
-        if in_span: # Garante que o último bloco seja adicionado
-            spans.append((start_index, df.index[-1]))
-        return spans
-
-    def plot_report(self, df):
+    def plot_report(self, relatorio):
         """
-        Gera os gráficos aprimorados com os dados do relatório da máquina,
+        Gera os gráficos aprimorados com os dados do relatório da máquina (um `Relatorio`),
         incluindo marcadores de evento e anotações de duração.
         """
-        for axis in self.ax:
-            axis.clear()
-            
+        for artist in self.report_artists:
+            artist.remove()
+        self.report_artists = []
+
         phase_names = {v: k for k, v in FASES_SAUDE.items()}
-        df['tempo'] = df.index
+        spec = ESPECIFICACOES[relatorio.modelo]
+        sensores_config = {s["sensor_id"]: s for s in CATALOGO_MAQUINAS[relatorio.modelo]["sensores_config"]}
 
-        # --- Gráfico 1: Temperatura do Óleo ---
-        sensor_id = "temp_oleo"
-        config_sensor = next((s for s in CATALOGO_MAQUINAS["Prensa Hidráulica PH-300T"]["sensores_config"] if s["sensor_id"] == sensor_id), None)
-        if config_sensor:
-            normal_range = config_sensor["faixa_normal"]
-            self.ax[0].axhspan(normal_range[0], normal_range[1], color='green', alpha=0.2, label='Faixa Normal')
-        self.ax[0].plot(df['tempo'], df[sensor_id], label=sensor_id, color='orangered', zorder=10)
-        self.ax[0].set_title("Temperatura do Óleo (°C)")
-        self.ax[0].grid(True, linestyle='--', alpha=0.6)
-
-        # --- Gráfico 2: Vibração do Motor ---
-        sensor_id = "vibracao_motor"
-        config_sensor = next((s for s in CATALOGO_MAQUINAS["Prensa Hidráulica PH-300T"]["sensores_config"] if s["sensor_id"] == sensor_id), None)
-        if config_sensor:
+        # --- Gráficos 1 e 2: os dois primeiros sensores do modelo ---
+        for axis, line, sensor_id in zip(self.ax[:2], self.lines[:2], spec.sensor_ids[:2]):
+            config_sensor = sensores_config[sensor_id]
             normal_range = config_sensor["faixa_normal"]
-            self.ax[1].axhspan(normal_range[0], normal_range[1], color='green', alpha=0.2, label='Faixa Normal')
-        self.ax[1].plot(df['tempo'], df[sensor_id], label=sensor_id, color='purple', zorder=10)
-        self.ax[1].set_title("Vibração do Motor (mm/s)")
-        self.ax[1].grid(True, linestyle='--', alpha=0.6)
-        
+            self.report_artists.append(axis.axhspan(normal_range[0], normal_range[1], color='green', alpha=0.2, label='Faixa Normal'))
+            line.set_data(*relatorio.series[sensor_id])
+            line.set_label(sensor_id)
+            axis.set_title(f"{config_sensor['nome']} ({config_sensor['unidade']})")
+
         # --- Gráfico 3: Degradação Interna ---
-        self.ax[2].plot(df['tempo'], df['fator_desgaste'], label='Fator de Desgaste', color='black', linestyle='--')
-        self.ax[2].set_title("Degradação Interna da Máquina")
-        self.ax[2].set_ylabel("Fator de Desgaste")
-        self.ax[2].set_xlabel("Tempo de Operação (Horas)")
-        self.ax[2].grid(True, linestyle='--', alpha=0.6)
-        
-        # --- APRIMORAMENTO 1: Marcadores de Evento ---
-        eventos_degradacao = df[df['volatilidade_vibracao'].diff() > 0.1]
-        is_first_event = True
-        for index in eventos_degradacao.index:
-            label = "Evento de Degradação" if is_first_event else ""
+        self.lines[2].set_data(*relatorio.series['fator_desgaste'])
+        for axis in self.ax:
+            axis.relim()
+            axis.autoscale_view()
+
+        # --- APRIMORAMENTO 1: Marcadores de Evento (uma coleção de linhas por eixo) ---
+        if len(relatorio.eventos):
             for axis in self.ax:
-                axis.axvline(x=index, color='red', linestyle='--', linewidth=1.5, label=label, zorder=15)
-            is_first_event = False
+                self.report_artists.append(axis.vlines(relatorio.eventos, 0, 1, transform=axis.get_xaxis_transform(), colors='red',
+                                                       linestyles='--', linewidth=1.5, label="Evento de Degradação", zorder=15))
 
-        # --- APRIMORAMENTO 2: Coloração de Fundo e Duração ---
+        # --- APRIMORAMENTO 2: Coloração de Fundo e Duração (uma coleção de faixas por fase e eixo) ---
         phase_colors = {0: 'lightgreen', 1: 'gold', 2: 'salmon'}
-        phase_durations = df['health_phase'].value_counts().to_dict()
+        inicios, fins, fases = relatorio.trechos
+        y_min, y_max = self.ax[0].get_ylim()
+        text_y_pos = y_min + (y_max - y_min) * 0.95
 
         for phase_num, phase_name in phase_names.items():
-            if phase_num in phase_colors:
-                for start, end in self.get_phase_spans(df, phase_num):
-                    for axis in self.ax:
-                        axis.axvspan(start, end, color=phase_colors[phase_num], alpha=0.3, ec=None, zorder=1)
-                    
-                    duration = phase_durations.get(phase_num, 0)
-                    text_x = start + (end - start) / 2
-                    text_y_pos = self.ax[0].get_ylim()[0] + (self.ax[0].get_ylim()[1] - self.ax[0].get_ylim()[0]) * 0.95
-                    self.ax[0].text(text_x, text_y_pos, f"{phase_name}\n{duration} horas", 
-                                    ha='center', va='top', fontsize=9, weight='bold',
-                                    bbox=dict(boxstyle="round,pad=0.3", fc='white', ec='black', lw=1, alpha=0.7))
+            if phase_num not in phase_colors:
+                continue
+            selecionados = fases == phase_num
+            if not selecionados.any():
+                continue
+            faixas = list(zip(inicios[selecionados].tolist(), (fins[selecionados] - inicios[selecionados]).tolist()))
+            for axis in self.ax:
+                self.report_artists.append(axis.broken_barh(faixas, (0, 1), transform=axis.get_xaxis_transform(),
+                                                            color=phase_colors[phase_num], alpha=0.3, ec=None, zorder=1))
+
+            duration = relatorio.duracoes.get(phase_num, 0)
+            for start, largura in faixas:
+                self.report_artists.append(self.ax[0].text(
+                    start + largura / 2, text_y_pos, f"{phase_name}\n{duration} horas",
+                    ha='center', va='top', fontsize=9, weight='bold',
+                    bbox=dict(boxstyle="round,pad=0.3", fc='white', ec='black', lw=1, alpha=0.7)))
 
         # --- Finalização e Legendas ---
-        self.fig.suptitle(f"Análise de Ciclo de Vida: Máquina {df['machine_id'].iloc[0]}", fontsize=16, weight='bold')
+        self.fig.suptitle(f"Análise de Ciclo de Vida: Máquina {relatorio.machine_id}", fontsize=16, weight='bold')
         for axis in self.ax:
             handles, labels = axis.get_legend_handles_labels()
             by_label = dict(zip(labels, handles))
             axis.legend(by_label.values(), by_label.keys(), loc='upper left')
-            
-        self.fig.tight_layout(pad=3.0, rect=[0, 0, 1, 0.96])
-        self.canvas.draw()
+
+        # Desenha no próximo ciclo ocioso do Tk: cliques seguidos em "Próximo" geram um só redesenho
+        self.canvas.draw_idle()
+
+class FleetView(tk.Toplevel):
+    """
+    Visão agregada de todos os relatórios da pasta, consultada no armazém de falhas (sem reler os CSVs):
+    tabela por problema, horas médias em cada fase antes da falha e a distribuição do tempo em uma fase.
+    """
+    def __init__(self, app):
+        super().__init__(app.master)
+        self.app = app
+        self.title("Visão da Frota")
+        self.geometry("1000x750")
+
+        controls = ttk.Frame(self)
+        controls.pack(side="top", fill="x", padx=10, pady=10)
+        ttk.Label(controls, text="Fase do histograma:").pack(side="left")
+        self.phase_var = tk.StringVar(value="Alerta")
+        phase_box = ttk.Combobox(controls, textvariable=self.phase_var, values=list(FASES_RESUMO), state="readonly", width=16)
+        phase_box.pack(side="left", padx=5)
+        phase_box.bind("<<ComboboxSelected>>", lambda _: self.plot_distribution())
+        ttk.Button(controls, text="Atualizar", command=app.update_store).pack(side="right")
+
+        colunas = ("problema", "falhas", "horas", *(f"horas_{fase}" for fase in FASES_RESUMO), "eventos")
+        titulos = ("Problema", "Falhas", "Vida Média (h)", *(f"{fase.replace('_', ' ')} (h)" for fase in FASES_RESUMO), "Eventos")
+        self.table = ttk.Treeview(self, columns=colunas, show="headings", height=7)
+        for coluna, titulo in zip(colunas, titulos):
+            self.table.heading(coluna, text=titulo)
+            self.table.column(coluna, width=110, anchor="center")
+        self.table.column("problema", width=260, anchor="w")
+        self.table.pack(side="top", fill="x", padx=10)
+        self.table.bind("<<TreeviewSelect>>", lambda _: self.plot_distribution())
+
+        self.fig, self.ax = plt.subplots(1, 2, figsize=(10, 4.5))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def close(self):
+        plt.close(self.fig)
+        self.destroy()
+
+    def selected_problem(self):
+        selecao = self.table.selection()
+        return selecao[0] if selecao else None
+
+    def refresh(self):
+        """Refaz a tabela e os gráficos com o conteúdo atual do armazém."""
+        armazem = self.app.armazem
+        if armazem is None:
+            return
+        tabela = armazem.agregado()
+        selecionado = self.selected_problem()
+        self.table.delete(*self.table.get_children())
+        for problema, linha in tabela.iterrows():
+            nome = CATALOGO_PROBLEMAS.get(problema, {}).get("nome_problema", "")
+            if problema == PROBLEMA_DESCONHECIDO:
+                nome = "Causa não registrada"
+            self.table.insert("", "end", iid=problema, values=(
+                f"{problema} - {nome}" if nome else problema, int(linha['falhas']), f"{linha['horas']:.1f}",
+                *(f"{linha[f'horas_{fase}']:.1f}" for fase in FASES_RESUMO), f"{linha['eventos']:.1f}"))
+        if selecionado in tabela.index:
+            self.table.selection_set(selecionado)
+
+        # --- Horas médias em cada fase antes da falha, por problema ---
+        axis = self.ax[0]
+        axis.clear()
+        phase_colors = {"Normal": 'lightgreen', "Alerta": 'gold', "Risco_Iminente": 'salmon'}
+        acumulado = np.zeros(len(tabela))
+        for fase in FASES_RESUMO:
+            horas = tabela[f"horas_{fase}"].to_numpy()
+            axis.barh(tabela.index, horas, left=acumulado, color=phase_colors[fase], edgecolor='black', label=fase.replace('_', ' '))
+            acumulado += horas
+        axis.invert_yaxis()
+        axis.set_title("Horas Médias em Cada Fase até a Falha")
+        axis.set_xlabel("Horas")
+        axis.legend(loc='lower right')
+        axis.grid(True, axis='x', linestyle='--', alpha=0.6)
+        self.plot_distribution()
+
+    def plot_distribution(self):
+        """Histograma das horas na fase escolhida, para o problema selecionado (ou para todos)."""
+        armazem = self.app.armazem
+        problema = self.selected_problem()
+        fase = self.phase_var.get()
+        horas = armazem.tempo_na_fase(fase, problema=problema).to_numpy()
+
+        axis = self.ax[1]
+        axis.clear()
+        if len(horas):
+            axis.hist(horas, bins=30, color='steelblue', edgecolor='black')
+            axis.axvline(horas.mean(), color='red', linestyle='--', label=f"Média: {horas.mean():.1f} h")
+            axis.legend(loc='upper right')
+        axis.set_title(f"Horas em {fase.replace('_', ' ')} ({problema or 'todos os problemas'})")
+        axis.set_xlabel("Horas")
+        axis.set_ylabel("Máquinas")
+        axis.grid(True, linestyle='--', alpha=0.6)
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
 
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = ReportAnalyzerApp(master=root)
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    app.cache.encerrar()
+    app.executor_armazem.shutdown(wait=False, cancel_futures=True)
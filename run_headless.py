@@ -0,0 +1,189 @@
+"""
+Executa o simulador sem interface gráfica (para testes de longa duração e servidores)
+e, ao final, imprime as taxas de processamento e o tempo de cada fase da execução.
+
+Exemplo:
+    python run_headless.py --ciclos 500 --tamanho-parque 1000 --motor vetorizado --backend-log colunar
+    python run_headless.py --ciclos 100 --tamanho-parque 100000 --motor vetorizado --fragmentos 8
+    python run_headless.py --ciclos 100 --tamanho-parque 1000 --composicao PH-300T=3,TC-500=1
+    python run_headless.py --ciclos 100 --motor vetorizado --salvar-snapshot estado.snap
+    python run_headless.py --ciclos 50 --retomar estado.snap --salvar-snapshot estado.snap
+"""
+import argparse
+import math
+import random
+import time
+
+from config import *
+from logger import DataLogger
+from ml_model import carregar_modelos_ml
+from simulator import Simulator
+from snapshot import EstadoSimulacao, restaurar, salvar_snapshot
+from sharded_simulator import SimuladorFragmentado
+
+def interpretar_composicao(texto):
+    """Converte "CODIGO=peso,CODIGO=peso" em um dicionário modelo -> peso."""
+    por_codigo = {cfg.get("codigo", modelo): modelo for modelo, cfg in CATALOGO_MAQUINAS.items()}
+    composicao = {}
+    for item in texto.split(","):
+        codigo, _, peso = item.partition("=")
+        if codigo.strip() not in por_codigo:
+            raise argparse.ArgumentTypeError(f"Código de modelo desconhecido: '{codigo.strip()}' (opções: {', '.join(por_codigo)}).")
+        try:
+            composicao[por_codigo[codigo.strip()]] = float(peso) if peso else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Peso inválido para '{codigo.strip()}': '{peso}'.")
+    return composicao
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulador de Manutenção Preditiva sem interface gráfica.")
+    parser.add_argument("--ciclos", type=int, default=100, help="Ciclos de simulação (0 = até Ctrl+C).")
+    parser.add_argument("--tamanho-parque", type=int, default=TAMANHO_DO_PARQUE, help="Número de máquinas no parque.")
+    parser.add_argument("--modelo", default=None,
+                        help="Caminho do modelo de ML treinado do modelo padrão (os demais usam o arquivo do catálogo).")
+    parser.add_argument("--composicao", type=interpretar_composicao, default=COMPOSICAO_DO_PARQUE,
+                        help="Modelos de máquina do parque e seus pesos pelo código do catálogo, ex: PH-300T=3,TC-500=1.")
+    parser.add_argument("--backend-log", choices=["colunar", "csv"], default=LOG_BACKEND_SENSORES,
+                        help="Backend do log de sensores.")
+    parser.add_argument("--motor", choices=["objetos", "vetorizado"], default=MOTOR_SIMULACAO,
+                        help="Motor de simulação das máquinas.")
+    parser.add_argument("--instrumentacao", action=argparse.BooleanOptionalAction, default=INSTRUMENTACAO_ATIVA,
+                        help="Mede o tempo de cada fase do ciclo de simulação.")
+    parser.add_argument("--fragmentos", type=int, default=1,
+                        help="Processos em que o parque é dividido (1 = simulação em um só processo).")
+    parser.add_argument("--seed", type=int, default=None, help="Semente da execução.")
+    parser.add_argument("--aprendizado-online", action=argparse.BooleanOptionalAction, default=APRENDIZADO_ONLINE_ATIVO,
+                        help="Atualiza os modelos de ML em segundo plano com os dados da simulação.")
+    parser.add_argument("--base-dir", default="logs", help="Diretório base dos logs.")
+    parser.add_argument("--salvar-snapshot", metavar="ARQUIVO", default=None,
+                        help="Salva o estado da simulação em ARQUIVO ao final da execução.")
+    parser.add_argument("--retomar", metavar="ARQUIVO", default=None,
+                        help="Continua a simulação salva em ARQUIVO (--ciclos passa a ser o número de ciclos adicionais; "
+                             "motor, parque e semente vêm do snapshot).")
+    return parser.parse_args()
+
+def imprimir_relatorio(simulator, fases):
+    tempo_simulacao = fases.get("Simulação", 0.0)
+    def por_segundo(valor):
+        return valor / tempo_simulacao if tempo_simulacao > 0 else 0.0
+
+    previsoes = simulator.performance_monitor.total_predictions
+    print("\n--- RELATÓRIO DE DESEMPENHO ---")
+    print(f"Máquinas:              {simulator.num_maquinas()}")
+    print(f"Ciclos executados:     {simulator.ciclo_atual}")
+    print(f"Ticks simulados:       {simulator.total_ticks}")
+    print(f"Previsões de ML:       {previsoes}")
+    print(f"Falhas:                {simulator.total_falhas}")
+    print(f"Ticks/s:               {por_segundo(simulator.total_ticks):,.0f}")
+    print(f"Ciclos/s:              {por_segundo(simulator.ciclo_atual):,.2f}")
+    print(f"Previsões/s:           {por_segundo(previsoes):,.0f}")
+    print("\nTempo por fase (s):")
+    for fase, segundos in fases.items():
+        print(f"  {fase:<20} {segundos:10.3f}")
+    timing = simulator.get_timing_stats()
+    if timing["ativa"] and timing["ciclos"] > 0:
+        if isinstance(simulator, SimuladorFragmentado):
+            print(f"\nTempo por fase do ciclo (soma dos {simulator.num_fragmentos} fragmentos):")
+        else:
+            print("\nTempo por fase do ciclo:")
+        print(f"  {'Fase':<20} {'Total (s)':>10} {'Média (ms)':>12} {'%':>7}")
+        for fase, valores in timing["fases"].items():
+            print(f"  {fase:<20} {valores['total_s']:10.3f} {valores['media_ms']:12.2f} {valores['percentual']:6.1f}%")
+        print("Contadores:", timing["contadores_total"])
+    print("\nDesempenho do ML:", simulator.performance_monitor.get_stats())
+    for modelo, aprendiz in getattr(simulator, "aprendizes", {}).items():
+        print(f"Aprendizado online ({modelo}): {aprendiz.atualizacoes} atualizações do modelo, "
+              f"{aprendiz.buffer.tamanho if aprendiz.buffer else 0} linhas no buffer.")
+    imprimir_metricas_por_fase(simulator.performance_monitor.get_metricas())
+
+def imprimir_metricas_por_fase(metricas):
+    def pct(valor):
+        return "   N/A" if math.isnan(valor) else f"{valor:5.1f}%"
+    fases = metricas["fases"]
+    print("\nMatriz de confusão (linhas: fase real; colunas: fase prevista):")
+    print(f"  {'':<16}" + "".join(f"{fase:>16}" for fase in fases))
+    for fase, linha in zip(fases, metricas["confusao"]):
+        print(f"  {fase:<16}" + "".join(f"{valor:>16}" for valor in linha))
+    origens = (("total", "total"), ("janela", f"últimos {metricas['janela_ciclos']} ciclos"), ("ewma", "média exp."))
+    print("\nPrecisão / recall por fase (" + ", ".join(titulo for _, titulo in origens) + "):")
+    for fase in fases:
+        colunas = "   ".join(f"{pct(metricas[origem]['precisao'][fase])} / {pct(metricas[origem]['recall'][fase])}"
+                              for origem, _ in origens)
+        print(f"  {fase:<16} {colunas}")
+    print("  Acurácia:        " + "   ".join(f"{pct(metricas[origem]['acuracia']):>15}" for origem, _ in origens))
+
+def executar_simulacao(simulator, ciclos, fases, continuar=False):
+    inicio = time.perf_counter()
+    try:
+        if continuar:
+            simulator.run_simulation_loop(ciclos, continuar=True)
+        else:
+            # O `SimuladorFragmentado` não retoma snapshots, então não recebe `continuar`
+            simulator.run_simulation_loop(ciclos)
+    except KeyboardInterrupt:
+        print("\nInterrompido pelo usuário.")
+        simulator.is_running = False
+    fases["Simulação"] = time.perf_counter() - inicio
+
+def main():
+    args = parse_args()
+    fases = {}
+
+    if args.fragmentos > 1:
+        if args.retomar or args.salvar_snapshot:
+            print("Snapshots ainda não são suportados com --fragmentos > 1.")
+            return
+        if args.aprendizado_online:
+            print("Aprendizado online ainda não é suportado com --fragmentos > 1; os modelos ficam fixos.")
+        # Cada fragmento carrega o modelo e prepara os próprios logs no seu processo
+        simulator = SimuladorFragmentado(args.modelo, num_fragmentos=args.fragmentos, tamanho_parque=args.tamanho_parque,
+                                         motor=args.motor, base_dir=args.base_dir, backend_sensores=args.backend_log,
+                                         instrumentacao=args.instrumentacao, seed=args.seed, composicao=args.composicao)
+        executar_simulacao(simulator, args.ciclos, fases)
+        imprimir_relatorio(simulator, fases)
+        return
+
+    estado = None
+    if args.retomar:
+        inicio = time.perf_counter()
+        estado = EstadoSimulacao.carregar(args.retomar)
+        args.composicao = dict(estado.meta["composicao"])
+        fases["Carga do snapshot"] = time.perf_counter() - inicio
+        print(f"Retomando '{args.retomar}' a partir do ciclo {estado.ciclo}.")
+    elif args.seed is not None:
+        random.seed(args.seed)
+    inicio = time.perf_counter()
+    modelos_ml = carregar_modelos_ml(args.composicao, caminhos={MODELO_PADRAO: args.modelo} if args.modelo else None)
+    for modelo, ml_model in modelos_ml.items():
+        if ml_model.estado != "pronto":
+            print(f"Continuando sem modelo para '{modelo}': as previsões serão registradas como -1.")
+    fases["Carga do modelo"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    logger = DataLogger(base_dir=args.base_dir, backend_sensores=args.backend_log)
+    logger.setup_directories_and_logs(retomar=estado is not None)
+    if estado is not None:
+        simulator = restaurar(estado, logger, modelos_ml)
+        simulator.instrumentacao.ativa = args.instrumentacao
+    else:
+        simulator = Simulator(logger, modelos_ml, motor=args.motor, tamanho_parque=args.tamanho_parque,
+                              instrumentacao=args.instrumentacao, seed=args.seed, composicao=args.composicao)
+    if args.aprendizado_online:
+        simulator.ativar_aprendizado_online()
+    fases["Preparação dos logs"] = time.perf_counter() - inicio
+
+    if estado is not None:
+        executar_simulacao(simulator, estado.ciclo + args.ciclos if args.ciclos else 0, fases, continuar=True)
+    else:
+        executar_simulacao(simulator, args.ciclos, fases)
+
+    if args.salvar_snapshot:
+        inicio = time.perf_counter()
+        salvar_snapshot(simulator, args.salvar_snapshot)
+        fases["Gravação do snapshot"] = time.perf_counter() - inicio
+        print(f"Estado do ciclo {simulator.ciclo_atual} salvo em '{args.salvar_snapshot}'.")
+    imprimir_relatorio(simulator, fases)
+    simulator.encerrar_aprendizado_online()
+
+if __name__ == "__main__":
+    main()
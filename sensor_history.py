@@ -0,0 +1,149 @@
+import numpy as np
+from config import MODELO_PADRAO
+from features import JANELAS, esquema_features, centros_faixa, estatisticas_janela
+
+class HistoricoSensores:
+    """
+    Histórico em memória das últimas 24 horas de cada máquina, usado para montar as features do ML.
+
+    Cada máquina ocupa um "slot" com um buffer circular de tamanho fixo. Junto com os valores
+    brutos são mantidas somas acumuladas (e somas de quadrados) dos sensores, de modo que a média
+    e o desvio padrão de qualquer janela saem de duas subtrações, sem percorrer o histórico.
+    A memória é limitada por máquina e a montagem das features é constante por máquina.
+    As fórmulas são as de `features.py`, então o resultado é idêntico ao do treino.
+    Cada histórico guarda as colunas do esquema de features de um único modelo de máquina.
+    """
+    # Arrays com uma linha por slot
+    ARRAYS = ("ultimo_registro", "valores", "soma_antes", "soma_q_antes", "soma", "soma_q", "contagem")
+
+    def __init__(self, modelo=MODELO_PADRAO, tamanho_janela=max(JANELAS), capacidade_inicial=16):
+        self.modelo = modelo
+        self.esquema = esquema_features(modelo)
+        self.tamanho_janela = tamanho_janela
+        self.centro_faixa = centros_faixa(modelo)
+
+        self.slots = {}
+        self._alocar(capacidade_inicial)
+        self.slots_livres = list(range(capacidade_inicial - 1, -1, -1))
+
+    def _alocar(self, capacidade):
+        n_sensores = len(self.esquema.sensores_janela)
+        self.capacidade = capacidade
+        self.ultimo_registro = np.zeros((capacidade, len(self.esquema.colunas_ultimo_registro)))
+        self.valores = np.zeros((capacidade, self.tamanho_janela, n_sensores))
+        self.soma_antes = np.zeros((capacidade, self.tamanho_janela, n_sensores))
+        self.soma_q_antes = np.zeros((capacidade, self.tamanho_janela, n_sensores))
+        self.soma = np.zeros((capacidade, n_sensores))
+        self.soma_q = np.zeros((capacidade, n_sensores))
+        self.contagem = np.zeros(capacidade, dtype=np.int64)
+
+    def _crescer(self):
+        antigos = [getattr(self, nome) for nome in self.ARRAYS]
+        n = self.capacidade
+        self._alocar(max(2 * n, 1))
+        for nome, antigo in zip(self.ARRAYS, antigos):
+            getattr(self, nome)[:n] = antigo
+        self.slots_livres.extend(range(self.capacidade - 1, n - 1, -1))
+
+    def _slot(self, machine_id):
+        slot = self.slots.get(machine_id)
+        if slot is None:
+            if not self.slots_livres:
+                self._crescer()
+            slot = self.slots_livres.pop()
+            self.slots[machine_id] = slot
+            self.contagem[slot] = 0
+            self.soma[slot] = 0.0
+            self.soma_q[slot] = 0.0
+        return slot
+
+    def liberar(self, machine_id):
+        """Descarta o histórico de uma máquina que saiu do parque e devolve o slot para reuso."""
+        slot = self.slots.pop(machine_id, None)
+        if slot is not None:
+            self.slots_livres.append(slot)
+
+    def exportar_estado(self):
+        """
+        IDs das máquinas com histórico e os seus arrays (ver `ARRAYS`), compactados: a linha i é
+        a da i-ésima máquina, sem os slots livres. Usado por `snapshot.py`.
+        """
+        machine_ids = list(self.slots)
+        slots = np.fromiter(self.slots.values(), dtype=np.int64, count=len(machine_ids))
+        return machine_ids, {nome: getattr(self, nome)[slots] for nome in self.ARRAYS}
+
+    def carregar_estado(self, machine_ids, arrays):
+        """Substitui o histórico pelo estado de `exportar_estado` (a máquina i fica no slot i)."""
+        n = len(machine_ids)
+        self._alocar(max(n, 1))
+        for nome in self.ARRAYS:
+            getattr(self, nome)[:n] = arrays[nome]
+        self.slots = dict(zip(machine_ids, range(n)))
+        self.slots_livres = list(range(self.capacidade - 1, n - 1, -1))
+
+    def registrar(self, machine_ids, registros):
+        """
+        Acrescenta ticks ao histórico. `registros` é um dicionário de colunas (uma posição por linha).
+        Uma mesma máquina pode aparecer várias vezes, desde que suas linhas estejam em ordem cronológica.
+        """
+        if len(machine_ids) == 0:
+            return
+        slots = np.array([self._slot(machine_id) for machine_id in machine_ids], dtype=np.int64)
+        ultimo = np.column_stack([np.asarray(registros[col], dtype=np.float64) for col in self.esquema.colunas_ultimo_registro])
+        valores = np.column_stack([np.asarray(registros[col], dtype=np.float64) for col in self.esquema.sensores_janela])
+
+        # Posição de cada linha entre as linhas da mesma máquina: cada "rodada" tem no máximo um tick por máquina
+        ordem = np.argsort(slots, kind='stable')
+        slots_ordenados = slots[ordem]
+        linhas = np.arange(len(slots))
+        inicio_grupo = np.r_[True, slots_ordenados[1:] != slots_ordenados[:-1]]
+        rodada = np.empty_like(linhas)
+        rodada[ordem] = linhas - np.maximum.accumulate(np.where(inicio_grupo, linhas, 0))
+
+        n_rodadas = rodada.max() + 1
+        if n_rodadas == 1:
+            self._empurrar(slots, ultimo, valores)
+            return
+        for r in range(n_rodadas):
+            sel = np.flatnonzero(rodada == r)
+            self._empurrar(slots[sel], ultimo[sel], valores[sel])
+
+    def _empurrar(self, slots, ultimo, valores):
+        posicao = self.contagem[slots] % self.tamanho_janela
+        centrado = valores - self.centro_faixa
+        self.valores[slots, posicao] = valores
+        self.soma_antes[slots, posicao] = self.soma[slots]
+        self.soma_q_antes[slots, posicao] = self.soma_q[slots]
+        self.soma[slots] += centrado
+        self.soma_q[slots] += centrado * centrado
+        self.contagem[slots] += 1
+        self.ultimo_registro[slots] = ultimo
+
+    def montar_features(self, machine_ids, nomes_features):
+        """
+        Monta a matriz de features (colunas na ordem de `nomes_features`) das máquinas com pelo menos
+        `tamanho_janela` horas de histórico. Retorna a máscara de máquinas elegíveis e a matriz.
+        """
+        slots = np.array([self.slots.get(machine_id, -1) for machine_id in machine_ids], dtype=np.int64)
+        conhecidas = slots >= 0
+        elegiveis = np.zeros(len(slots), dtype=bool)
+        elegiveis[conhecidas] = self.contagem[slots[conhecidas]] >= self.tamanho_janela
+        slots = slots[elegiveis]
+        if len(slots) == 0:
+            return elegiveis, np.empty((0, len(nomes_features)))
+
+        colunas = {col: self.ultimo_registro[slots, j] for j, col in enumerate(self.esquema.colunas_ultimo_registro)}
+        contagem = self.contagem[slots]
+        for janela in JANELAS:
+            inicio = (contagem - janela) % self.tamanho_janela
+            soma = self.soma[slots] - self.soma_antes[slots, inicio]
+            soma_q = self.soma_q[slots] - self.soma_q_antes[slots, inicio]
+            media, desvio = estatisticas_janela(soma, soma_q, janela, self.centro_faixa)
+            posicoes = (contagem[:, None] - janela + np.arange(janela)) % self.tamanho_janela
+            maximo = self.valores[slots[:, None], posicoes].max(axis=1)
+            for j, sensor_id in enumerate(self.esquema.sensores_janela):
+                colunas[f'{sensor_id}_mean_{janela}h'] = media[:, j]
+                colunas[f'{sensor_id}_std_{janela}h'] = desvio[:, j]
+                colunas[f'{sensor_id}_max_{janela}h'] = maximo[:, j]
+
+        return elegiveis, np.column_stack([colunas[nome] for nome in nomes_features])
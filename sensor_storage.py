@@ -0,0 +1,323 @@
+import os
+import io
+import csv
+import json
+import numpy as np
+
+from config import MODELO_PADRAO
+from machine_specs import especificacao
+
+def cabecalho_sensores(colunas_valores):
+    return ['timestamp', 'machine_id', 'health_phase'] + list(colunas_valores)
+
+# Colunas numéricas do log de sensores do modelo padrão, na ordem do cabeçalho do CSV
+COLUNAS_VALORES = list(especificacao(MODELO_PADRAO).colunas_valores)
+SENSOR_HEADER = cabecalho_sensores(COLUNAS_VALORES)
+
+def nome_log_sensores(modelo):
+    """
+    Nome base do log de sensores de um modelo de máquina (`<nome>.csv` ou o diretório `<nome>/`).
+    O modelo padrão mantém o nome `sensor_log`; os demais recebem o código do modelo como sufixo.
+    """
+    if modelo == MODELO_PADRAO:
+        return "sensor_log"
+    return f"sensor_log_{especificacao(modelo).codigo}"
+
+def _juntar_blocos(blocos, n_colunas):
+    """
+    Concatena blocos (timestamp, machine_ids, fases, valores) em colunas.
+    `valores` é uma matriz (n, n_colunas) de float64.
+    """
+    timestamps = np.concatenate([np.full(len(ids), np.datetime64(ts, 'us')) for ts, ids, _, _ in blocos])
+    machine_ids = [machine_id for _, ids, _, _ in blocos for machine_id in ids]
+    fases = np.concatenate([np.asarray(fases, dtype=np.int8).reshape(-1) for _, _, fases, _ in blocos])
+    valores = np.concatenate([np.asarray(valores, dtype=np.float64).reshape(-1, n_colunas) for _, _, _, valores in blocos])
+    return timestamps, machine_ids, fases, valores
+
+def _linhas_csv(timestamps, machine_ids, fases, valores):
+    """Formata as linhas como no log CSV original: timestamp ISO e valores arredondados em 2 casas."""
+    textos_ts = np.datetime_as_string(timestamps, unit='us').tolist()
+    valores = np.round(valores, 2).tolist()
+    return [[ts, machine_id, fase, *linha] for ts, machine_id, fase, linha in zip(textos_ts, machine_ids, fases.tolist(), valores)]
+
+def _indexar(indice, chave, inicio, tamanho):
+    """Acrescenta o trecho [inicio, inicio + tamanho) ao índice da máquina, fundindo trechos contíguos."""
+    faixas = indice.setdefault(chave, [])
+    if faixas and faixas[-1][0] + faixas[-1][1] == inicio:
+        faixas[-1] = (faixas[-1][0], faixas[-1][1] + tamanho)
+    else:
+        faixas.append((inicio, tamanho))
+
+
+class ArmazenamentoSensoresCSV:
+    """
+    Backend de texto: o log de sensores é um único `sensor_log.csv`. As linhas são escritas
+    agrupadas por máquina e o trecho de bytes de cada máquina fica em um índice em memória.
+    """
+    formato = "csv"
+
+    def __init__(self, active_dir, colunas_valores=COLUNAS_VALORES, nome="sensor_log"):
+        self.nome = nome
+        self.path = os.path.join(active_dir, f"{nome}.csv")
+        self.colunas_valores = list(colunas_valores)
+        self.header = cabecalho_sensores(self.colunas_valores)
+        self.arquivo = None
+        self.indice = {}
+        self.tamanho = 0
+
+    def existe(self):
+        return os.path.exists(self.path)
+
+    def iniciar(self):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(self.header)
+        self.indice = {}
+        self.tamanho = os.path.getsize(self.path)
+
+    def retomar(self):
+        """Continua um log existente (ex: simulação retomada de um snapshot); sem ele, equivale a `iniciar`."""
+        if not self.existe():
+            self.iniciar()
+            return
+        # Reconstrói o índice lendo o log uma vez (só o machine_id de cada linha é interpretado)
+        self.indice = {}
+        with open(self.path, 'rb') as f:
+            offset = len(f.readline())
+            for linha in f:
+                _indexar(self.indice, linha.split(b',', 2)[1].decode('utf-8'), offset, len(linha))
+                offset += len(linha)
+        self.tamanho = offset
+
+    def abrir(self):
+        # Modo binário para que os offsets do índice sejam exatos
+        self.arquivo = open(self.path, 'ab')
+
+    def fechar(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+    def gravar(self, blocos):
+        timestamps, machine_ids, fases, valores = _juntar_blocos(blocos, len(self.colunas_valores))
+        grupos = {}
+        for linha in _linhas_csv(timestamps, machine_ids, fases, valores):
+            grupos.setdefault(linha[1], []).append(linha)
+
+        texto = io.StringIO()
+        writer = csv.writer(texto)
+        partes = []
+        offset = self.tamanho
+        for machine_id, linhas_maquina in grupos.items():
+            texto.seek(0)
+            texto.truncate()
+            writer.writerows(linhas_maquina)
+            dados = texto.getvalue().encode('utf-8')
+            _indexar(self.indice, machine_id, offset, len(dados))
+            partes.append(dados)
+            offset += len(dados)
+
+        if self.arquivo is not None:
+            self.arquivo.write(b''.join(partes))
+            self.arquivo.flush()
+        else:
+            with open(self.path, 'ab') as f:
+                f.write(b''.join(partes))
+        self.tamanho = offset
+
+    def exportar_maquina(self, machine_id, report_path):
+        """Copia para `report_path` apenas os trechos da máquina. Retorna False se ela não estiver no índice."""
+        faixas = self.indice.pop(machine_id, None)
+        if not faixas:
+            return False
+        with open(self.path, 'rb') as origem, open(report_path, 'wb') as destino:
+            cabecalho = io.StringIO()
+            csv.writer(cabecalho).writerow(self.header)
+            destino.write(cabecalho.getvalue().encode('utf-8'))
+            for offset, tamanho in faixas:
+                origem.seek(offset)
+                destino.write(origem.read(tamanho))
+        return True
+
+
+class ArmazenamentoSensoresColunar:
+    """
+    Backend binário colunar: cada coluna do log de sensores é um arquivo de tipo fixo
+    (`sensor_log/<coluna>.bin`) que pode ser lido com `np.memmap`, sem parsing de texto.
+    `machine_id` é guardado como categoria: códigos int32 + a lista de categorias em `machine_ids.txt`.
+    O índice por máquina guarda trechos de linhas, então o arquivamento lê só as linhas da máquina.
+    """
+    formato = "colunar"
+
+    def __init__(self, active_dir, colunas_valores=COLUNAS_VALORES, nome="sensor_log"):
+        self.nome = nome
+        self.dir = os.path.join(active_dir, nome)
+        self.colunas_valores = list(colunas_valores)
+        self.header = cabecalho_sensores(self.colunas_valores)
+        self.tipos = {'timestamp': 'datetime64[us]', 'machine_id': 'int32', 'health_phase': 'int8',
+                      **{col: 'float64' for col in self.colunas_valores}}
+        self.arquivos = {}
+        self.categorias = {}
+        self.indice = {}
+        self.linhas = 0
+        self.linhas_retomadas = 0
+
+    def _path(self, coluna):
+        return os.path.join(self.dir, f"{coluna}.bin")
+
+    def existe(self):
+        return os.path.exists(os.path.join(self.dir, "schema.json"))
+
+    def iniciar(self):
+        os.makedirs(self.dir, exist_ok=True)
+        for coluna in self.tipos:
+            open(self._path(coluna), 'wb').close()
+        open(os.path.join(self.dir, "machine_ids.txt"), 'w', encoding='utf-8').close()
+        with open(os.path.join(self.dir, "schema.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.tipos, f, indent=2)
+        self.categorias = {}
+        self.indice = {}
+        self.linhas = 0
+        self.linhas_retomadas = 0
+
+    def retomar(self):
+        """Continua um log existente (ex: simulação retomada de um snapshot); sem ele, equivale a `iniciar`."""
+        if not self.existe():
+            self.iniciar()
+            return
+        self.categorias = {machine_id: codigo for codigo, machine_id in enumerate(ler_categorias(self.dir))}
+        self.indice = {}
+        self.linhas = os.path.getsize(self._path('machine_id')) // np.dtype(self.tipos['machine_id']).itemsize
+        # As linhas gravadas antes da retomada não estão no índice: são procuradas pelo código da máquina
+        self.linhas_retomadas = self.linhas
+
+    def abrir(self):
+        self.arquivos = {coluna: open(self._path(coluna), 'ab') for coluna in self.tipos}
+
+    def fechar(self):
+        for f in self.arquivos.values():
+            f.close()
+        self.arquivos = {}
+
+    def _codificar(self, machine_ids):
+        novas = []
+        codigos = np.empty(len(machine_ids), dtype=np.int32)
+        for i, machine_id in enumerate(machine_ids):
+            codigo = self.categorias.get(machine_id)
+            if codigo is None:
+                codigo = self.categorias[machine_id] = len(self.categorias)
+                novas.append(machine_id)
+            codigos[i] = codigo
+        if novas:
+            with open(os.path.join(self.dir, "machine_ids.txt"), 'a', encoding='utf-8') as f:
+                f.write("".join(f"{machine_id}\n" for machine_id in novas))
+        return codigos
+
+    def gravar(self, blocos):
+        timestamps, machine_ids, fases, valores = _juntar_blocos(blocos, len(self.colunas_valores))
+        codigos = self._codificar(machine_ids)
+
+        # Agrupa por máquina (ordem estável) para que cada máquina ocupe um trecho contíguo por gravação
+        ordem = np.argsort(codigos, kind='stable')
+        codigos = codigos[ordem]
+        colunas = {'timestamp': timestamps[ordem], 'machine_id': codigos, 'health_phase': fases[ordem]}
+        valores = valores[ordem]
+        for j, coluna in enumerate(self.colunas_valores):
+            colunas[coluna] = valores[:, j]
+
+        inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+        tamanhos = np.diff(np.r_[inicios, len(codigos)])
+        nomes = [machine_ids[ordem[i]] for i in inicios]
+        for machine_id, inicio, tamanho in zip(nomes, inicios.tolist(), tamanhos.tolist()):
+            _indexar(self.indice, machine_id, self.linhas + inicio, tamanho)
+
+        for coluna, tipo in self.tipos.items():
+            dados = np.ascontiguousarray(colunas[coluna], dtype=tipo).tobytes()
+            if coluna in self.arquivos:
+                self.arquivos[coluna].write(dados)
+                self.arquivos[coluna].flush()
+            else:
+                with open(self._path(coluna), 'ab') as f:
+                    f.write(dados)
+        self.linhas += len(codigos)
+
+    def exportar_maquina(self, machine_id, report_path):
+        """Exporta as linhas da máquina como CSV (mesmo formato do log de texto)."""
+        faixas = self.indice.pop(machine_id, [])
+        partes = [np.arange(inicio, inicio + tamanho) for inicio, tamanho in faixas]
+        if self.linhas_retomadas and machine_id in self.categorias:
+            codigos = ler_colunas(self.dir, ['machine_id'])['machine_id'][:self.linhas_retomadas]
+            partes.insert(0, np.flatnonzero(codigos == self.categorias[machine_id]))
+        linhas = np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+        if len(linhas) == 0:
+            return False
+        colunas = ler_colunas(self.dir, ['timestamp', 'health_phase'] + self.colunas_valores)
+        valores = np.column_stack([colunas[col][linhas] for col in self.colunas_valores])
+        with open(report_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            writer.writerows(_linhas_csv(colunas['timestamp'][linhas], [machine_id] * len(linhas),
+                                         colunas['health_phase'][linhas], valores))
+        return True
+
+
+def ler_colunas(sensor_dir, colunas):
+    """
+    Mapeia em memória apenas as colunas pedidas do log colunar. Retorna um dicionário
+    coluna -> np.memmap; `machine_id` vem como códigos (ver `ler_categorias`).
+    """
+    with open(os.path.join(sensor_dir, "schema.json"), encoding='utf-8') as f:
+        tipos = json.load(f)
+    resultado = {}
+    for coluna in colunas:
+        path = os.path.join(sensor_dir, f"{coluna}.bin")
+        if os.path.getsize(path) == 0:
+            resultado[coluna] = np.empty(0, dtype=tipos[coluna])
+        else:
+            resultado[coluna] = np.memmap(path, dtype=tipos[coluna], mode='r')
+    return resultado
+
+def ler_categorias(sensor_dir):
+    with open(os.path.join(sensor_dir, "machine_ids.txt"), encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def ler_log_sensores(active_dir, colunas=None, formato=None, nome="sensor_log"):
+    """
+    Carrega o log de sensores ativo `nome` como DataFrame, lendo só as `colunas` pedidas
+    (todas, se omitidas). Sem `formato`, usa o backend colunar se existir; senão lê o
+    `<nome>.csv`. `machine_id` vira categoria.
+    """
+    import pandas as pd
+    sensor_dir = os.path.join(active_dir, nome)
+    if formato is None:
+        formato = "colunar" if os.path.exists(os.path.join(sensor_dir, "schema.json")) else "csv"
+    if formato == "colunar":
+        if colunas is None:
+            with open(os.path.join(sensor_dir, "schema.json"), encoding='utf-8') as f:
+                colunas = list(json.load(f))
+        dados = ler_colunas(sensor_dir, colunas)
+        if 'machine_id' in dados:
+            dados['machine_id'] = pd.Categorical.from_codes(np.asarray(dados['machine_id']), ler_categorias(sensor_dir))
+        return pd.DataFrame({col: dados[col] for col in colunas})
+    df = pd.read_csv(os.path.join(active_dir, f"{nome}.csv"), usecols=colunas,
+                     dtype={'machine_id': 'category', 'health_phase': 'int8'})
+    return df[list(colunas)] if colunas is not None else df
+
+def exportar_csv(active_dir, destino, nome="sensor_log"):
+    """Exporta o log colunar `nome` completo para um CSV no formato do log de texto."""
+    sensor_dir = os.path.join(active_dir, nome)
+    with open(os.path.join(sensor_dir, "schema.json"), encoding='utf-8') as f:
+        cabecalho = list(json.load(f))
+    colunas_valores = cabecalho[3:]
+    colunas = ler_colunas(sensor_dir, cabecalho)
+    categorias = np.array(ler_categorias(sensor_dir), dtype=object)
+    valores = np.column_stack([colunas[col] for col in colunas_valores]) if len(colunas['timestamp']) else np.empty((0, len(colunas_valores)))
+    with open(destino, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(cabecalho)
+        writer.writerows(_linhas_csv(colunas['timestamp'], categorias[np.asarray(colunas['machine_id'])].tolist(),
+                                     np.asarray(colunas['health_phase']), valores))
+
+ARMAZENAMENTOS = {
+    "csv": ArmazenamentoSensoresCSV,
+    "colunar": ArmazenamentoSensoresColunar,
+}
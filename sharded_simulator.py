@@ -0,0 +1,219 @@
+import os
+import csv
+import random
+import traceback
+import multiprocessing as mp
+import numpy as np
+
+from config import *
+from logger import DataLogger
+from ml_model import carregar_modelos_ml
+from simulator import Simulator, PerformanceMonitor, distribuir_parque
+
+def semente_do_fragmento(seed, indice):
+    """Semente própria de cada fragmento, derivada da semente da execução e do índice do fragmento."""
+    return int(np.random.SeedSequence([seed, indice]).generate_state(1)[0])
+
+def dividir_parque(tamanho_parque, num_fragmentos):
+    """Tamanhos quase iguais (diferença máxima de 1) que somam `tamanho_parque`."""
+    base, resto = divmod(tamanho_parque, num_fragmentos)
+    return [base + (1 if i < resto else 0) for i in range(num_fragmentos)]
+
+def combinar_estatisticas_tempo(lista_stats):
+    """
+    Junta os `get_timing_stats` dos fragmentos. Os tempos são somados, ou seja, são tempo de CPU
+    somado dos processos e não tempo de parede, já que os fragmentos rodam em paralelo.
+    """
+    if not lista_stats:
+        return {"ativa": False, "ciclos": 0}
+    ciclos = max(stats["ciclos"] for stats in lista_stats)
+    fases = {}
+    for fase in lista_stats[0]["fases"]:
+        total_s = sum(stats["fases"][fase]["total_s"] for stats in lista_stats)
+        ultimo_ms = sum(stats["fases"][fase]["ultimo_ciclo_ms"] for stats in lista_stats)
+        fases[fase] = {"ultimo_ciclo_ms": ultimo_ms, "total_s": total_s,
+                       "media_ms": total_s * 1000 / ciclos if ciclos else 0.0}
+    soma_total = sum(valores["total_s"] for valores in fases.values())
+    for valores in fases.values():
+        valores["percentual"] = valores["total_s"] * 100 / soma_total if soma_total > 0 else 0.0
+    def somar(chave):
+        return {contador: sum(stats[chave][contador] for stats in lista_stats) for contador in lista_stats[0][chave]}
+    return {"ativa": all(stats["ativa"] for stats in lista_stats), "ciclos": ciclos,
+            "ultimo_ciclo_ms": sum(stats["ultimo_ciclo_ms"] for stats in lista_stats),
+            "total_s": soma_total, "fases": fases,
+            "contadores_ultimo_ciclo": somar("contadores_ultimo_ciclo"), "contadores_total": somar("contadores_total")}
+
+def executar_fragmento(conexao, indice, parametros):
+    """
+    Processo de um fragmento: é dono das suas máquinas, do seu histórico e dos seus logs
+    (em `<base_dir>/fragmento_NN`). Executa um ciclo a cada comando "ciclo" do coordenador
+    e responde com o resumo do ciclo; encerra com "parar".
+    """
+    logger = None
+    try:
+        random.seed(parametros["semente"])
+        logger = DataLogger(base_dir=os.path.join(parametros["base_dir"], f"fragmento_{indice:02d}"),
+                            backend_sensores=parametros["backend_sensores"])
+        logger.setup_directories_and_logs()
+        logger.reter_eventos()
+        composicao = parametros["composicao"]
+        # Um processo por fragmento já ocupa os núcleos: o sklearn não abre threads próprias
+        modelos_ml = carregar_modelos_ml(composicao, caminhos=parametros["caminhos_modelos"], n_jobs=1)
+        prefixos = {modelo: f"{CATALOGO_MAQUINAS[modelo]['prefixo_id']}-F{indice:02d}" for modelo in composicao}
+        simulator = Simulator(logger, modelos_ml, motor=parametros["motor"], tamanho_parque=parametros["tamanho_parque"],
+                              instrumentacao=parametros["instrumentacao"], prefixo_id=prefixos,
+                              seed=parametros["seed"], composicao=composicao, primeira_vaga=parametros["primeira_vaga"])
+        simulator.iniciar_execucao()
+        conexao.send(("pronto", simulator.num_maquinas()))
+
+        while conexao.recv() == "ciclo":
+            simulator.executar_ciclo()
+            conexao.send(("ciclo", {
+                "total_falhas": simulator.total_falhas,
+                "total_ticks": simulator.total_ticks,
+                "num_maquinas": simulator.num_maquinas(),
+                "performance_monitor": simulator.performance_monitor,
+                "eventos": logger.coletar_eventos(),
+                "timing": simulator.get_timing_stats(),
+            }))
+    except Exception:
+        conexao.send(("erro", traceback.format_exc()))
+    finally:
+        if logger is not None:
+            logger.fechar()
+        conexao.close()
+
+
+class SimuladorFragmentado:
+    """
+    Divide o parque em `num_fragmentos` processos, cada um com o seu próprio `Simulator`.
+
+    O coordenador avança todos os fragmentos juntos, um ciclo por vez: manda o comando de
+    ciclo para todos, espera todas as respostas e então junta os contadores do
+    `PerformanceMonitor`, os totais de falhas e ticks e os eventos do ciclo (gravados em
+    `<base_dir>/event_log_frota.csv`). Expõe os mesmos atributos que o `Simulator` usa
+    nos relatórios (`ciclo_atual`, `total_falhas`, `performance_monitor`, ...).
+
+    Cada modelo de máquina da `composicao` é repartido entre os fragmentos, de modo que o parque
+    inteiro tem exatamente as quantidades de `distribuir_parque`. `model_path` é o arquivo do
+    modelo de ML do modelo padrão, um dicionário modelo -> arquivo ou None (arquivos do catálogo).
+    """
+    def __init__(self, model_path=None, num_fragmentos=None, tamanho_parque=TAMANHO_DO_PARQUE, motor="vetorizado",
+                 base_dir="logs", backend_sensores=LOG_BACKEND_SENSORES, instrumentacao=INSTRUMENTACAO_ATIVA, seed=None,
+                 composicao=None):
+        self.num_fragmentos = num_fragmentos or os.cpu_count() or 1
+        self.tamanho_parque = tamanho_parque
+        self.composicao = dict(composicao or COMPOSICAO_DO_PARQUE)
+        self.base_dir = base_dir
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        caminhos_modelos = model_path if isinstance(model_path, dict) else ({MODELO_PADRAO: model_path} if model_path else {})
+        self.parametros_base = {"caminhos_modelos": caminhos_modelos, "motor": motor, "base_dir": base_dir,
+                                "backend_sensores": backend_sensores, "instrumentacao": instrumentacao}
+        self.event_log_path = os.path.join(base_dir, "event_log_frota.csv")
+        self.processos = []
+        self.conexoes = []
+        self._zerar()
+
+    def _zerar(self):
+        self.ciclo_atual = 0
+        self.total_falhas = 0
+        self.total_ticks = 0
+        self.maquinas_por_fragmento = []
+        self.performance_monitor = PerformanceMonitor()
+        self.eventos_ultimo_ciclo = []
+        self.timing_fragmentos = []
+        self.is_running = False
+
+    def num_maquinas(self):
+        return sum(self.maquinas_por_fragmento)
+
+    def get_timing_stats(self):
+        return combinar_estatisticas_tempo(self.timing_fragmentos)
+
+    def _receber(self, conexao):
+        tipo, dados = conexao.recv()
+        if tipo == "erro":
+            self.encerrar()
+            raise RuntimeError(f"Falha em um fragmento da simulação:\n{dados}")
+        return dados
+
+    def iniciar(self):
+        """Cria os processos dos fragmentos e espera todos terem o parque inicializado."""
+        self._zerar()
+        os.makedirs(self.base_dir, exist_ok=True)
+        with open(self.event_log_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(['timestamp', 'machine_id', 'event_type', 'description'])
+
+        composicoes = [{} for _ in range(self.num_fragmentos)]
+        primeiras_vagas = [{} for _ in range(self.num_fragmentos)]
+        for modelo, quantidade in distribuir_parque(self.tamanho_parque, self.composicao):
+            vaga = 0
+            for indice, parte in enumerate(dividir_parque(quantidade, self.num_fragmentos)):
+                if parte:
+                    composicoes[indice][modelo] = parte
+                    primeiras_vagas[indice][modelo] = vaga
+                vaga += parte
+        for indice, composicao in enumerate(composicoes):
+            # Um fragmento sem máquinas (parque menor que o número de fragmentos) fica com a composição geral.
+            # Os fluxos aleatórios das máquinas usam a semente da execução e a vaga no parque inteiro,
+            # então o parque fragmentado gera as mesmas trajetórias de um só processo.
+            parametros = dict(self.parametros_base, tamanho_parque=sum(composicao.values()),
+                              composicao=composicao or self.composicao, seed=self.seed,
+                              primeira_vaga=primeiras_vagas[indice], semente=semente_do_fragmento(self.seed, indice))
+            conexao, conexao_filho = mp.Pipe()
+            processo = mp.Process(target=executar_fragmento, args=(conexao_filho, indice, parametros), daemon=True)
+            processo.start()
+            conexao_filho.close()
+            self.processos.append(processo)
+            self.conexoes.append(conexao)
+        self.maquinas_por_fragmento = [self._receber(conexao) for conexao in self.conexoes]
+        self.is_running = True
+        print(f"SimuladorFragmentado: {self.num_maquinas()} máquinas em {self.num_fragmentos} fragmentos.")
+
+    def executar_ciclo(self):
+        """Avança todos os fragmentos um ciclo (em paralelo) e junta os resultados."""
+        for conexao in self.conexoes:
+            conexao.send("ciclo")
+        resumos = [self._receber(conexao) for conexao in self.conexoes]
+
+        self.ciclo_atual += 1
+        self.total_falhas = sum(resumo["total_falhas"] for resumo in resumos)
+        self.total_ticks = sum(resumo["total_ticks"] for resumo in resumos)
+        self.maquinas_por_fragmento = [resumo["num_maquinas"] for resumo in resumos]
+        self.performance_monitor = PerformanceMonitor()
+        for resumo in resumos:
+            self.performance_monitor.combinar(resumo["performance_monitor"])
+        self.timing_fragmentos = [resumo["timing"] for resumo in resumos]
+
+        self.eventos_ultimo_ciclo = sorted((evento for resumo in resumos for evento in resumo["eventos"]),
+                                           key=lambda evento: evento[0])
+        if self.eventos_ultimo_ciclo:
+            with open(self.event_log_path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(self.eventos_ultimo_ciclo)
+
+    def encerrar(self):
+        """Manda os fragmentos pararem (gravando os logs pendentes) e espera os processos."""
+        for conexao in self.conexoes:
+            try:
+                conexao.send("parar")
+            except (BrokenPipeError, OSError):
+                pass
+        for processo in self.processos:
+            processo.join(timeout=30)
+            if processo.is_alive():
+                processo.terminate()
+        for conexao in self.conexoes:
+            conexao.close()
+        self.processos = []
+        self.conexoes = []
+        self.is_running = False
+
+    def run_simulation_loop(self, total_cycles):
+        self.iniciar()
+        is_infinite = (total_cycles == 0)
+        try:
+            while self.is_running:
+                if not is_infinite and self.ciclo_atual >= total_cycles: self.is_running = False; break
+                self.executar_ciclo()
+        finally:
+            self.encerrar()
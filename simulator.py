@@ -1,146 +1,584 @@
-import pandas as pd
+import time
+import random
+from typing import NamedTuple
+import numpy as np
 from config import *
 from machine import Maquina
+from machine_specs import especificacao
+from random_streams import base_do_modelo, fluxos_das_vagas
+from fleet_engine import FrotaVetorizada
+from sensor_history import HistoricoSensores
+from event_scheduler import AgendaEventos
+from online_learning import AprendizOnline
+
+def distribuir_parque(tamanho_parque, composicao):
+    """
+    Quantidade de máquinas de cada modelo. `composicao` mapeia modelo -> peso (proporção ou
+    contagem); o total é repartido pelo método dos maiores restos e soma exatamente `tamanho_parque`.
+    Retorna [(modelo, quantidade)] na ordem de `composicao`, sem os modelos que ficaram sem máquinas.
+    """
+    desconhecidos = [modelo for modelo in composicao if modelo not in CATALOGO_MAQUINAS]
+    if desconhecidos:
+        raise ValueError(f"Modelos de máquina fora do catálogo: {desconhecidos}")
+    pesos = np.array(list(composicao.values()), dtype=np.float64)
+    if len(pesos) == 0 or (pesos < 0).any() or pesos.sum() <= 0:
+        raise ValueError(f"Composição do parque inválida: {composicao}")
+    cotas = tamanho_parque * pesos / pesos.sum()
+    quantidades = np.floor(cotas).astype(np.int64)
+    faltam = tamanho_parque - int(quantidades.sum())
+    quantidades[np.argsort(-(cotas - quantidades), kind='stable')[:faltam]] += 1
+    return [(modelo, int(quantidade)) for modelo, quantidade in zip(composicao, quantidades) if quantidade > 0]
+
+# Fases avaliadas pelo monitor (as previsões só são feitas para máquinas em operação)
+FASES_MONITOR = tuple(nome for nome, valor in sorted(FASES_SAUDE.items(), key=lambda item: item[1]) if valor != FASES_SAUDE["Falha"])
 
 class PerformanceMonitor:
     """
     Uma classe simples para rastrear as estatísticas de desempenho do modelo de ML em tempo real.
+
+    Além dos quatro contadores acumulados, mantém em memória constante a matriz de confusão
+    (fase real x fase prevista, nas FASES_MONITOR) acumulada, a soma das matrizes dos últimos
+    `janela_ciclos` ciclos (um buffer circular com a matriz de cada ciclo) e uma matriz com
+    decaimento exponencial (meia-vida de `meia_vida_ciclos` ciclos), de onde saem a acurácia e
+    a precisão/recall por fase de `get_metricas`. O simulador chama `fechar_ciclo` ao fim de cada ciclo.
     """
-    def __init__(self):
+    def __init__(self, janela_ciclos=MONITOR_JANELA_CICLOS, meia_vida_ciclos=MONITOR_MEIA_VIDA_CICLOS):
         self.total_predictions = 0; self.correct_predictions = 0; self.false_alarms = 0; self.missed_risks = 0
+        self.janela_ciclos = janela_ciclos; self.meia_vida_ciclos = meia_vida_ciclos
+        self.decaimento = 0.5 ** (1.0 / meia_vida_ciclos)
+        n = len(FASES_MONITOR)
+        self.confusao = np.zeros((n, n), dtype=np.int64)
+        self.confusao_ciclo = np.zeros((n, n), dtype=np.int64)
+        self.janela = np.zeros((janela_ciclos, n, n), dtype=np.int64)
+        self.confusao_janela = np.zeros((n, n), dtype=np.int64)
+        self.posicao_janela = 0
+        self.confusao_ewma = np.zeros((n, n))
     def reset(self):
-        self.__init__()
+        self.__init__(self.janela_ciclos, self.meia_vida_ciclos)
     def update(self, true_phase, predicted_phase):
         if predicted_phase == -1: return
         self.total_predictions += 1
+        self.confusao[true_phase, predicted_phase] += 1; self.confusao_ciclo[true_phase, predicted_phase] += 1
         if true_phase == predicted_phase: self.correct_predictions += 1
         else:
             if predicted_phase > true_phase: self.false_alarms += 1
             elif predicted_phase < true_phase: self.missed_risks += 1
+    def update_lote(self, true_phases, predicted_phases):
+        """
+        Versão vetorizada de `update` para os arrays de fases reais e previstas de um ciclo inteiro:
+        um único `bincount` monta a matriz do lote, e os contadores saem dela.
+        """
+        true_phases = np.asarray(true_phases, dtype=np.int64); predicted_phases = np.asarray(predicted_phases, dtype=np.int64)
+        validas = predicted_phases != -1
+        n = len(FASES_MONITOR)
+        contagem = np.bincount(true_phases[validas] * n + predicted_phases[validas], minlength=n * n).reshape(n, n)
+        self.confusao += contagem; self.confusao_ciclo += contagem
+        self.total_predictions += int(contagem.sum())
+        self.correct_predictions += int(np.trace(contagem))
+        self.false_alarms += int(np.triu(contagem, 1).sum())
+        self.missed_risks += int(np.tril(contagem, -1).sum())
+    def fechar_ciclo(self):
+        """Encerra o ciclo: a matriz dele entra na janela (no lugar da do ciclo mais antigo) e na média exponencial."""
+        ciclo = self.confusao_ciclo
+        self.confusao_janela += ciclo - self.janela[self.posicao_janela]
+        self.janela[self.posicao_janela] = ciclo
+        self.posicao_janela = (self.posicao_janela + 1) % self.janela_ciclos
+        self.confusao_ewma *= self.decaimento; self.confusao_ewma += ciclo
+        self.confusao_ciclo = np.zeros_like(ciclo)
+    def combinar(self, outro):
+        """
+        Soma os contadores e as matrizes de outro monitor a este (ex: monitores de fragmentos do parque).
+        Os fragmentos fecham os ciclos juntos, então as janelas estão alinhadas na mesma posição.
+        """
+        self.total_predictions += outro.total_predictions; self.correct_predictions += outro.correct_predictions
+        self.false_alarms += outro.false_alarms; self.missed_risks += outro.missed_risks
+        self.confusao += outro.confusao; self.confusao_ciclo += outro.confusao_ciclo
+        self.janela += outro.janela; self.confusao_janela += outro.confusao_janela
+        self.posicao_janela = outro.posicao_janela
+        self.confusao_ewma += outro.confusao_ewma
     def get_stats(self):
         accuracy = (self.correct_predictions / self.total_predictions) * 100 if self.total_predictions > 0 else 100
         return {"acertos": self.correct_predictions, "erros": self.total_predictions - self.correct_predictions, "alarmes_falsos": self.false_alarms, "riscos_perdidos": self.missed_risks, "acuracia_vivo": f"{accuracy:.2f}%"}
 
+    @staticmethod
+    def _metricas_da_matriz(matriz):
+        """Acurácia e precisão/recall por fase (em %) de uma matriz de confusão; NaN onde não há amostras."""
+        acertos = np.diag(matriz).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            acuracia = acertos.sum() * 100 / matriz.sum()
+            precisao = acertos * 100 / matriz.sum(axis=0)
+            recall = acertos * 100 / matriz.sum(axis=1)
+        return {"acuracia": float(acuracia),
+                "precisao": dict(zip(FASES_MONITOR, precisao.tolist())), "recall": dict(zip(FASES_MONITOR, recall.tolist()))}
+
+    def get_metricas(self):
+        """
+        Matriz de confusão acumulada (linhas: fase real; colunas: fase prevista) e as métricas do
+        total, dos últimos `janela_ciclos` ciclos ("janela") e da média exponencial ("ewma").
+        """
+        return {"fases": FASES_MONITOR, "confusao": self.confusao.tolist(), "janela_ciclos": self.janela_ciclos,
+                "total": self._metricas_da_matriz(self.confusao),
+                "janela": self._metricas_da_matriz(self.confusao_janela),
+                "ewma": self._metricas_da_matriz(self.confusao_ewma)}
+
+class ResumoCiclo(NamedTuple):
+    """
+    Estatísticas do parque ao fim de um ciclo, montadas pela thread da simulação. A tupla nunca é
+    alterada depois de criada e é publicada por troca de referência (`Simulator.resumo_publicado`),
+    então a interface lê o último ciclo sem travas e sem tocar no parque, no monitor ou na instrumentação.
+    """
+    ciclo: int
+    instante: float         # time.perf_counter() ao fim do ciclo
+    num_maquinas: int
+    total_falhas: int
+    total_ticks: int
+    total_previsoes: int
+    acertos: int
+    alarmes_falsos: int
+    riscos_perdidos: int
+    tempos: dict            # `InstrumentacaoCiclo.get_stats()` (um dicionário novo a cada ciclo) ou None
+    metricas: dict          # `PerformanceMonitor.get_metricas()`
+
+    def get_stats(self):
+        """Mesmo formato de `PerformanceMonitor.get_stats`."""
+        accuracy = (self.acertos / self.total_previsoes) * 100 if self.total_previsoes > 0 else 100
+        return {"acertos": self.acertos, "erros": self.total_previsoes - self.acertos, "alarmes_falsos": self.alarmes_falsos,
+                "riscos_perdidos": self.riscos_perdidos, "acuracia_vivo": f"{accuracy:.2f}%"}
+
+class InstrumentacaoCiclo:
+    """
+    Mede o tempo de parede de cada fase de `Simulator.executar_ciclo` (no último ciclo e acumulado)
+    e conta ticks, linhas de log e previsões.
+
+    O tempo é medido por segmentos: `marcar(fase, t)` atribui à fase o tempo decorrido desde a
+    marca anterior `t` e devolve a nova marca, então a soma das fases é o tempo do ciclo.
+    Desativada, `agora`, `marcar` e `contar` retornam logo, sem ler o relógio.
+    """
+    FASES = ("arquivamento", "ticks", "logs_sensores", "historico", "eventos",
+             "features", "modelo", "logs_ml", "substituicao", "flush")
+    CONTADORES = ("ticks", "linhas_sensores", "linhas_ml", "eventos", "previsoes")
+
+    def __init__(self, ativa=False):
+        self.ativa = ativa
+        self.reset()
+    def reset(self):
+        self.ciclos = 0
+        self.tempo_total = dict.fromkeys(self.FASES, 0.0); self.tempo_ciclo = dict.fromkeys(self.FASES, 0.0)
+        self.contagem_total = dict.fromkeys(self.CONTADORES, 0); self.contagem_ciclo = dict.fromkeys(self.CONTADORES, 0)
+    def agora(self):
+        return time.perf_counter() if self.ativa else 0.0
+    def marcar(self, fase, inicio):
+        if not self.ativa: return 0.0
+        agora = time.perf_counter()
+        self.tempo_ciclo[fase] += agora - inicio
+        return agora
+    def contar(self, contador, quantidade=1):
+        if self.ativa: self.contagem_ciclo[contador] += quantidade
+    def iniciar_ciclo(self):
+        if not self.ativa: return
+        self.tempo_ciclo = dict.fromkeys(self.FASES, 0.0); self.contagem_ciclo = dict.fromkeys(self.CONTADORES, 0)
+    def finalizar_ciclo(self):
+        if not self.ativa: return
+        self.ciclos += 1
+        for fase, segundos in self.tempo_ciclo.items(): self.tempo_total[fase] += segundos
+        for contador, quantidade in self.contagem_ciclo.items(): self.contagem_total[contador] += quantidade
+    def get_stats(self):
+        """Tempos em ms do último ciclo, totais em s, média por ciclo e fração do tempo total de cada fase."""
+        tempo_ciclo = dict(self.tempo_ciclo); tempo_total = dict(self.tempo_total)
+        soma_total = sum(tempo_total.values())
+        fases = {fase: {"ultimo_ciclo_ms": tempo_ciclo[fase] * 1000, "total_s": tempo_total[fase],
+                        "media_ms": tempo_total[fase] * 1000 / self.ciclos if self.ciclos else 0.0,
+                        "percentual": tempo_total[fase] * 100 / soma_total if soma_total > 0 else 0.0}
+                 for fase in self.FASES}
+        return {"ativa": self.ativa, "ciclos": self.ciclos, "ultimo_ciclo_ms": sum(tempo_ciclo.values()) * 1000,
+                "total_s": soma_total, "fases": fases,
+                "contadores_ultimo_ciclo": dict(self.contagem_ciclo), "contadores_total": dict(self.contagem_total)}
+
+class GrupoModelo:
+    """
+    Máquinas de um mesmo modelo. Ocupam as posições [inicio, fim) do parque e são avançadas,
+    registradas e avaliadas como um lote homogêneo: têm o seu próprio histórico (com o esquema
+    de features do modelo), o seu modelo de ML e, no motor vetorizado, a sua `FrotaVetorizada`.
+
+    Cada posição do grupo é uma vaga do modelo no parque inteiro (`primeira_vaga` em diante) e
+    `geracoes` conta as substituições de cada vaga; juntas, identificam o fluxo aleatório de
+    cada máquina independentemente do ID e do fragmento (ver `random_streams.py`).
+
+    `operando` são as posições locais (em ordem) das máquinas fora de reparo, as únicas que os
+    laços do ciclo percorrem: a máquina sai quando falha e volta quando é substituída.
+    """
+    def __init__(self, modelo, inicio, tamanho, ml_model=None, primeira_vaga=0):
+        self.modelo = modelo
+        self.inicio = inicio
+        self.fim = inicio + tamanho
+        self.ml_model = ml_model
+        self.historico = HistoricoSensores(modelo=modelo)
+        self.frota = None
+        self.primeira_vaga = primeira_vaga
+        self.geracoes = np.zeros(tamanho, dtype=np.int64)
+        self.base_fluxos = None
+        self.operando = np.arange(tamanho, dtype=np.intp)
+
+    def definir_operando(self, em_reparo):
+        """Recalcula `operando` a partir das posições do parque em reparo (ex: ao restaurar um snapshot)."""
+        locais = [i - self.inicio for i in em_reparo if self.inicio <= i < self.fim]
+        self.operando = np.setdiff1d(np.arange(self.fim - self.inicio, dtype=np.intp), np.array(locais, dtype=np.intp))
+
+    def fluxos(self, locais):
+        """(chaves, gamas) dos fluxos das máquinas atuais nas posições `locais` do grupo."""
+        locais = np.asarray(locais, dtype=np.int64)
+        return fluxos_das_vagas(self.base_fluxos, self.primeira_vaga + locais, self.geracoes[locais])
+
 class Simulator:
     """
     Orquestra a simulação completa, gerenciando o parque de máquinas,
     os ciclos de operação, as previsões de ML e os logs.
+
+    O parâmetro `motor` escolhe como as máquinas são simuladas:
+    "objetos" (uma instância de `Maquina` por máquina) ou "vetorizado"
+    (uma `FrotaVetorizada` por modelo de máquina).
+
+    O parque pode misturar modelos do catálogo (`composicao`, modelo -> peso). As máquinas
+    são agrupadas por modelo (`GrupoModelo`) e cada grupo é simulado, registrado e avaliado
+    como um lote. `ml_model` é um `MLModel` (usado para o seu `modelo`) ou um dicionário
+    modelo -> `MLModel`; grupos sem modelo de ML não recebem previsões. `prefixo_id` é um
+    texto comum a todos os IDs, um dicionário modelo -> texto ou None ("prefixo_id" do catálogo).
+
+    Cada máquina sorteia do seu próprio fluxo aleatório, derivado da semente da execução (`seed`,
+    ou uma sorteada a cada execução se None) e da vaga que ocupa; por isso os dois motores e as
+    execuções fragmentadas geram as mesmas trajetórias. `primeira_vaga` (modelo -> número) é a
+    vaga da primeira máquina de cada modelo deste simulador quando ele é um fragmento do parque.
+
+    Com `aprendizado_online`, os modelos de ML são atualizados em segundo plano com as features e
+    as fases reais das máquinas avaliadas (ver `online_learning.py`); as trajetórias das máquinas
+    não mudam, só as previsões.
     """
-    def __init__(self, logger, ml_model):
+    def __init__(self, logger, ml_model, motor=MOTOR_SIMULACAO, tamanho_parque=TAMANHO_DO_PARQUE,
+                 instrumentacao=INSTRUMENTACAO_ATIVA, prefixo_id=None, seed=None, composicao=None, primeira_vaga=None,
+                 aprendizado_online=APRENDIZADO_ONLINE_ATIVO):
+        if motor not in ("objetos", "vetorizado"):
+            raise ValueError(f"Motor de simulação desconhecido: '{motor}'.")
         self.logger = logger
         self.ml_model = ml_model
+        if isinstance(ml_model, dict):
+            self.modelos_ml = dict(ml_model)
+        else:
+            self.modelos_ml = {ml_model.modelo: ml_model} if ml_model is not None else {}
+        self.motor = motor
+        self.tamanho_parque = tamanho_parque
+        self.composicao = dict(composicao or COMPOSICAO_DO_PARQUE)
+        distribuir_parque(tamanho_parque, self.composicao)  # valida a composição já na criação
+        self.prefixo_id = prefixo_id
+        self.seed = seed
+        self.semente_execucao = seed
+        self.primeira_vaga = dict(primeira_vaga or {})
         self.performance_monitor = PerformanceMonitor()
+        self.instrumentacao = InstrumentacaoCiclo(ativa=instrumentacao)
         self.parque_maquinas = []
+        self.grupos = []
         self.contador_maquinas_total = 0
         self.ciclo_atual = 0
         self.total_falhas = 0
+        self.total_ticks = 0
         self.is_running = False
-        self.historico_sensores = pd.DataFrame()
+        # Com `publicar_resumos`, cada ciclo termina publicando um `ResumoCiclo` em `resumo_publicado`
+        self.publicar_resumos = False
+        self.resumo_publicado = None
+        # Conclusões de reparo agendadas por hora simulada; a chave é a posição da máquina no parque
+        self.agenda = AgendaEventos()
+        # Modelo de máquina -> `AprendizOnline` que recebe as linhas rotuladas de cada ciclo
+        self.aprendizes = {}
+        if aprendizado_online:
+            self.ativar_aprendizado_online()
+
+    def ativar_aprendizado_online(self):
+        """Passa a alimentar um `AprendizOnline` por modelo de ML com as features e fases reais de cada ciclo."""
+        for modelo, ml_model in self.modelos_ml.items():
+            if ml_model is not None and modelo not in self.aprendizes:
+                self.aprendizes[modelo] = AprendizOnline(ml_model)
 
-    def _criar_nova_maquina(self):
+    def encerrar_aprendizado_online(self):
+        """Para os workers do aprendizado online; os modelos ficam com a última atualização concluída."""
+        for aprendiz in self.aprendizes.values():
+            aprendiz.encerrar()
+        self.aprendizes = {}
+
+    def _novo_id_maquina(self, modelo):
+        if isinstance(self.prefixo_id, dict):
+            prefixo = self.prefixo_id[modelo]
+        else:
+            prefixo = self.prefixo_id or CATALOGO_MAQUINAS[modelo]["prefixo_id"]
         self.contador_maquinas_total += 1
-        machine_id = f"PH-{self.contador_maquinas_total:03d}"
-        return Maquina(machine_id=machine_id, modelo="Prensa Hidráulica PH-300T")
+        return f"{prefixo}-{self.contador_maquinas_total:03d}"
+
+    def _criar_nova_maquina(self, grupo, local):
+        chave, gama = grupo.fluxos([local])
+        return Maquina(machine_id=self._novo_id_maquina(grupo.modelo), modelo=grupo.modelo, fluxo=(int(chave[0]), int(gama[0])))
+
+    def num_maquinas(self):
+        """Quantidade de máquinas no parque, independente do motor em uso."""
+        return self.grupos[-1].fim if self.grupos else 0
+
+    def _grupo_da_posicao(self, posicao):
+        for grupo in self.grupos:
+            if posicao < grupo.fim:
+                return grupo
+        raise IndexError(f"Posição {posicao} fora do parque.")
+
+    def _id_na_posicao(self, posicao):
+        if self.motor == "vetorizado":
+            grupo = self._grupo_da_posicao(posicao)
+            return grupo.frota.ids[posicao - grupo.inicio]
+        return self.parque_maquinas[posicao].id
+
+    def _problema_na_posicao(self, posicao):
+        """Código do problema da máquina em reparo na posição (guardado até ela ser substituída), ou None."""
+        if self.motor == "vetorizado":
+            grupo = self._grupo_da_posicao(posicao)
+            indice = grupo.frota.problema_ativo[posicao - grupo.inicio]
+            return grupo.frota.problemas[indice] if indice >= 0 else None
+        return self.parque_maquinas[posicao].problema_ativo
 
     def inicializar_parque(self):
-        """Preenche o parque de máquinas com um conjunto inicial de máquinas."""
-        self.parque_maquinas = [self._criar_nova_maquina() for _ in range(TAMANHO_DO_PARQUE)]
-        print(f"Simulator: Parque de {len(self.parque_maquinas)} máquinas inicializado.")
-        self.logger.log_event("SIMULATOR", "START", f"Parque de {len(self.parque_maquinas)} máquinas criado.")
-
-    def _executar_previsao_ml(self, maquina: Maquina):
-        if self.historico_sensores.empty or 'machine_id' not in self.historico_sensores.columns:
-            return
-        
-        hist_maquina = self.historico_sensores[self.historico_sensores['machine_id'] == maquina.id].tail(24)
-        
-        if len(hist_maquina) < 24:
-            return
-
-        features_dict = {}
-        last_row = hist_maquina.iloc[-1]
-        features_dict.update(last_row.to_dict())
-
-        windows = [6, 12, 24]
-        for window in windows:
-            subset = hist_maquina.tail(window)
-            features_dict[f'temp_oleo_mean_{window}h'] = subset['temp_oleo'].mean()
-            features_dict[f'vibracao_motor_mean_{window}h'] = subset['vibracao_motor'].mean()
-            features_dict[f'pressao_hidraulica_mean_{window}h'] = subset['pressao_hidraulica'].mean()
-            features_dict[f'temp_oleo_std_{window}h'] = subset['temp_oleo'].std()
-            features_dict[f'vibracao_motor_std_{window}h'] = subset['vibracao_motor'].std()
-            features_dict[f'pressao_hidraulica_std_{window}h'] = subset['pressao_hidraulica'].std()
-            features_dict[f'vibracao_motor_max_{window}h'] = subset['vibracao_motor'].max()
-
-        for k, v in features_dict.items():
-            if pd.isna(v): features_dict[k] = 0
-
-        fase_prevista = self.ml_model.predict(features_dict)
-        fase_real = maquina.health_phase
+        """Preenche o parque de máquinas com um conjunto inicial de máquinas, agrupadas por modelo."""
+        self.semente_execucao = self.seed if self.seed is not None else random.randrange(2**32)
+        self.parque_maquinas = []
+        self.grupos = []
+        inicio = 0
+        for modelo, quantidade in distribuir_parque(self.tamanho_parque, self.composicao):
+            grupo = GrupoModelo(modelo, inicio, quantidade, self.modelos_ml.get(modelo), self.primeira_vaga.get(modelo, 0))
+            grupo.base_fluxos = base_do_modelo(self.semente_execucao, especificacao(modelo).codigo)
+            if grupo.ml_model is None:
+                print(f"Simulator: sem modelo de ML para '{modelo}'; essas máquinas não terão previsões.")
+            if self.motor == "vetorizado":
+                grupo.frota = FrotaVetorizada(modelo=modelo)
+                grupo.frota.adicionar_maquinas([self._novo_id_maquina(modelo) for _ in range(quantidade)],
+                                               fluxos=grupo.fluxos(np.arange(quantidade)))
+            else:
+                self.parque_maquinas.extend(self._criar_nova_maquina(grupo, local) for local in range(quantidade))
+            self.grupos.append(grupo)
+            inicio = grupo.fim
+        composicao = ", ".join(f"{g.fim - g.inicio} {g.modelo}" for g in self.grupos)
+        print(f"Simulator: Parque de {self.num_maquinas()} máquinas inicializado ({composicao}).")
+        self.logger.log_event("SIMULATOR", "START", f"Parque de {self.num_maquinas()} máquinas criado.")
+
+    def get_timing_stats(self):
+        """Tempos por fase e contadores do ciclo (ver `InstrumentacaoCiclo.get_stats`)."""
+        return self.instrumentacao.get_stats()
+
+    def _executar_previsao_ml(self, grupo, machine_ids, fases_reais, t):
+        """Monta uma única matriz de features para as máquinas elegíveis do grupo e faz uma só previsão."""
+        instr = self.instrumentacao
+        if grupo.ml_model is None:
+            return instr.marcar("features", t)
+        elegiveis, X = grupo.historico.montar_features(machine_ids, grupo.ml_model.features)
+        if len(X) == 0:
+            return instr.marcar("features", t)
+
+        ids_elegiveis = [machine_id for machine_id, ok in zip(machine_ids, elegiveis) if ok]
+        fases_elegiveis = np.asarray(fases_reais)[elegiveis]
+        X = np.nan_to_num(X, nan=0.0)
+        t = instr.marcar("features", t)
+        fases_previstas = grupo.ml_model.predict_lote(X)
+        t = instr.marcar("modelo", t)
         
-        self.performance_monitor.update(fase_real, fase_prevista)
-        self.logger.log_ml_prediction(maquina.id, fase_real, fase_prevista)
+        self.performance_monitor.update_lote(fases_elegiveis, fases_previstas)
+        self.logger.log_ml_predictions(ids_elegiveis, fases_elegiveis, fases_previstas)
+        aprendiz = self.aprendizes.get(grupo.modelo)
+        if aprendiz is not None:
+            aprendiz.registrar(X, fases_elegiveis)
+        instr.contar("previsoes", int(np.count_nonzero(np.asarray(fases_previstas) != -1)))
+        instr.contar("linhas_ml", len(ids_elegiveis))
+        return instr.marcar("logs_ml", t)
+
+    def hora_inicio_ciclo(self):
+        """Hora simulada em que o ciclo atual começou."""
+        return (self.ciclo_atual - 1) * HORAS_POR_CICLO
+
+    def _agendar_fim_reparo(self, indice, tempo_reparo):
+        """
+        O reparo é descontado em blocos de HORAS_POR_CICLO a partir do ciclo seguinte à falha;
+        a máquina é arquivada e substituída no ciclo em que o tempo restante chega a zero.
+        """
+        ciclos = max(1, -(-int(tempo_reparo) // HORAS_POR_CICLO))
+        self.agenda.agendar(self.hora_inicio_ciclo() + ciclos * HORAS_POR_CICLO, "fim_reparo", int(indice))
+
+    def _concluir_reparos_vencidos(self):
+        """Arquiva as máquinas cujo reparo termina neste ciclo e devolve as posições delas no parque."""
+        indices = sorted(chave for _, tipo, chave in self.agenda.retirar_vencidos(self.hora_inicio_ciclo())
+                         if tipo == "fim_reparo")
+        for i in indices:
+            self.logger.archive_machine_history(self._id_na_posicao(i), has_failed=True, problema=self._problema_na_posicao(i))
+        return indices
 
     def executar_ciclo(self):
+        instr = self.instrumentacao
+        instr.iniciar_ciclo()
         self.ciclo_atual += 1
-        novos_registros_para_historia = []
-        indices_para_substituir = []
+        if self.motor == "vetorizado":
+            t = self._executar_ciclo_vetorizado(instr.agora())
+        else:
+            t = self._executar_ciclo_objetos(instr.agora())
+        self.logger.flush()
+        instr.marcar("flush", t)
+        instr.finalizar_ciclo()
+        self.performance_monitor.fechar_ciclo()
+        if self.publicar_resumos:
+            self.publicar_resumo()
+
+    def publicar_resumo(self):
+        """Monta o `ResumoCiclo` do ciclo atual e o publica com uma única atribuição (atômica)."""
+        monitor = self.performance_monitor
+        self.resumo_publicado = ResumoCiclo(
+            self.ciclo_atual, time.perf_counter(), self.num_maquinas(), self.total_falhas, self.total_ticks,
+            monitor.total_predictions, monitor.correct_predictions, monitor.false_alarms, monitor.missed_risks,
+            self.instrumentacao.get_stats() if self.instrumentacao.ativa else None, monitor.get_metricas())
+
+    def _executar_ciclo_objetos(self, t):
+        instr = self.instrumentacao
+        indices_para_substituir = self._concluir_reparos_vencidos()
+        t = instr.marcar("arquivamento", t)
+
+        for grupo in self.grupos:
+            t = self._executar_grupo_objetos(grupo, t)
 
-        for i, maquina in enumerate(self.parque_maquinas):
-            if maquina.health_phase == FASES_SAUDE["Falha"]:
-                maquina.tempo_reparo_restante -= HORAS_POR_CICLO
-                if maquina.tempo_reparo_restante <= 0:
-                    self.logger.archive_machine_history(maquina.id, has_failed=True)
-                    indices_para_substituir.append(i)
-                continue
+        for i in indices_para_substituir:
+            maquina_antiga = self.parque_maquinas[i]
+            grupo = self._grupo_da_posicao(i)
+            grupo.historico.liberar(maquina_antiga.id)
+            grupo.geracoes[i - grupo.inicio] += 1
+            self.parque_maquinas[i] = self._criar_nova_maquina(grupo, i - grupo.inicio)
+            grupo.operando = np.union1d(grupo.operando, [i - grupo.inicio])
+            self.logger.log_event(self.parque_maquinas[i].id, "CREATED", f"Nova máquina {self.parque_maquinas[i].id} substituiu a anterior.")
+        instr.contar("eventos", len(indices_para_substituir))
+        return instr.marcar("substituicao", t)
 
+    def _executar_grupo_objetos(self, grupo, t):
+        """Avança, registra e avalia as máquinas (objetos `Maquina`) de um grupo."""
+        instr = self.instrumentacao
+        novos_registros_para_historia = []
+        # Máquinas em reparo não estão em `operando`: só voltam a ser tocadas quando o fim do reparo vence
+        operando = []
+        for local in grupo.operando.tolist():
+            i = grupo.inicio + local
+            maquina = self.parque_maquinas[i]
             for _ in range(HORAS_POR_CICLO):
                 if maquina.health_phase < FASES_SAUDE["Falha"]:
                     maquina.simular_tick()
+                    self.total_ticks += 1
+                    t = instr.marcar("ticks", t)
                     
-                    # Salva o dado no arquivo CSV do disco a cada tick (hora)
+                    # Salva o dado no log de sensores do modelo a cada tick (hora)
                     self.logger.log_sensor_tick(maquina)
+                    t = instr.marcar("logs_sensores", t)
                     
                     # Coleta o dado para o histórico em memória (para o ML)
-                    novos_registros_para_historia.append({
-                        'machine_id': maquina.id,
-                        'horas_operadas': maquina.horas_operadas,
-                        'health_phase': maquina.health_phase,
-                        'fator_desgaste': maquina.fator_desgaste,
-                        'temp_oleo': maquina.sensores["temp_oleo"].valor_atual,
-                        'vibracao_motor': maquina.sensores["vibracao_motor"].valor_atual,
-                        'pressao_hidraulica': maquina.sensores["pressao_hidraulica"].valor_atual,
-                        'volatilidade_temp': maquina.sensores["temp_oleo"].volatilidade,
-                        'volatilidade_vibracao': maquina.sensores["vibracao_motor"].volatilidade,
-                        'volatilidade_pressao': maquina.sensores["pressao_hidraulica"].volatilidade
-                    })
+                    novos_registros_para_historia.append(maquina.registro())
+                    t = instr.marcar("historico", t)
             
             if maquina.health_phase == FASES_SAUDE["Falha"] and maquina.problema_ativo:
                 self.total_falhas += 1
                 problema_info = CATALOGO_PROBLEMAS[maquina.problema_ativo]
                 self.logger.log_event(maquina.id, "FAILURE", f"Causa: {problema_info['nome_problema']}")
                 self.logger.log_event(maquina.id, "REPAIR_STARTED", f"Reparo iniciado. Tempo: {maquina.tempo_reparo_restante}h")
-                maquina.problema_ativo = None
+                # O problema fica na máquina até a substituição, quando vai junto com o relatório
+                self._agendar_fim_reparo(i, maquina.tempo_reparo_restante)
+                instr.contar("eventos", 2)
+                t = instr.marcar("eventos", t)
+            elif maquina.health_phase < FASES_SAUDE["Falha"]:
+                operando.append(local)
+        grupo.operando = np.array(operando, dtype=np.intp)
     
         if novos_registros_para_historia:
-            self.historico_sensores = pd.concat([self.historico_sensores, pd.DataFrame(novos_registros_para_historia)], ignore_index=True)
-            max_history_size = TAMANHO_DO_PARQUE * 48 
-            if len(self.historico_sensores) > max_history_size:
-                self.historico_sensores = self.historico_sensores.tail(max_history_size)
+            grupo.historico.registrar(
+                [r['machine_id'] for r in novos_registros_para_historia],
+                {col: [r[col] for r in novos_registros_para_historia] for col in novos_registros_para_historia[0]}
+            )
+        instr.contar("ticks", len(novos_registros_para_historia))
+        instr.contar("linhas_sensores", len(novos_registros_para_historia))
+        t = instr.marcar("historico", t)
 
-        for maquina in self.parque_maquinas:
-            if maquina.health_phase < FASES_SAUDE["Falha"]:
-                self._executar_previsao_ml(maquina)
+        maquinas_operando = [self.parque_maquinas[grupo.inicio + local] for local in operando]
+        return self._executar_previsao_ml(grupo, [m.id for m in maquinas_operando],
+                                          [m.health_phase for m in maquinas_operando], t)
 
-        for i in indices_para_substituir:
-            self.parque_maquinas[i] = self._criar_nova_maquina()
-            self.logger.log_event(self.parque_maquinas[i].id, "CREATED", f"Nova máquina {self.parque_maquinas[i].id} substituiu a anterior.")
+    def _executar_ciclo_vetorizado(self, t):
+        """Mesmo ciclo de `executar_ciclo`, mas avançando cada grupo de uma vez a cada hora."""
+        instr = self.instrumentacao
+        indices_para_substituir = np.array(self._concluir_reparos_vencidos(), dtype=np.intp)
+        t = instr.marcar("arquivamento", t)
+
+        for grupo in self.grupos:
+            t = self._executar_grupo_vetorizado(grupo, t)
+
+        for grupo in self.grupos:
+            frota = grupo.frota
+            locais = indices_para_substituir[(indices_para_substituir >= grupo.inicio)
+                                             & (indices_para_substituir < grupo.fim)] - grupo.inicio
+            for i in locais:
+                grupo.historico.liberar(frota.ids[i])
+            novos_ids = [self._novo_id_maquina(grupo.modelo) for _ in locais]
+            grupo.geracoes[locais] += 1
+            frota.substituir_maquinas(locais, novos_ids, fluxos=grupo.fluxos(locais))
+            grupo.operando = np.union1d(grupo.operando, locais)
+            for machine_id in novos_ids:
+                self.logger.log_event(machine_id, "CREATED", f"Nova máquina {machine_id} substituiu a anterior.")
+        instr.contar("eventos", len(indices_para_substituir))
+        return instr.marcar("substituicao", t)
+
+    def _executar_grupo_vetorizado(self, grupo, t):
+        """Avança, registra e avalia a `FrotaVetorizada` de um grupo."""
+        instr = self.instrumentacao
+        frota = grupo.frota
+        # Máquinas em reparo não estão em `operando`: só voltam a ser tocadas quando o fim do reparo vence
+        ativos = inicio_ciclo = grupo.operando
+        for _ in range(HORAS_POR_CICLO):
+            if len(ativos) == 0:
+                break
+            falhou = frota.simular_tick(ativos)
+            self.total_ticks += len(ativos)
+            t = instr.marcar("ticks", t)
+            self.logger.log_sensor_ticks(frota, ativos)
+            t = instr.marcar("logs_sensores", t)
+            grupo.historico.registrar([frota.ids[i] for i in ativos], frota.registros(ativos))
+            t = instr.marcar("historico", t)
+            instr.contar("ticks", len(ativos))
+            instr.contar("linhas_sensores", len(ativos))
+            ativos = ativos[~falhou]
+        grupo.operando = ativos
 
-    def run_simulation_loop(self, total_cycles):
-        self.is_running = True; self.ciclo_atual = 0; self.total_falhas = 0
-        self.performance_monitor.reset(); self.inicializar_parque()
-        self.historico_sensores = pd.DataFrame()
+        # As falhas do ciclo são as máquinas que saíram de `operando`, sem varrer o grupo inteiro
+        falharam = np.setdiff1d(inicio_ciclo, ativos, assume_unique=True)
+        for i in falharam[frota.problema_ativo[falharam] >= 0]:
+            self.total_falhas += 1
+            problema_info = CATALOGO_PROBLEMAS[frota.problemas[frota.problema_ativo[i]]]
+            self.logger.log_event(frota.ids[i], "FAILURE", f"Causa: {problema_info['nome_problema']}")
+            self.logger.log_event(frota.ids[i], "REPAIR_STARTED", f"Reparo iniciado. Tempo: {frota.tempo_reparo_restante[i]}h")
+            self._agendar_fim_reparo(grupo.inicio + i, frota.tempo_reparo_restante[i])
+            instr.contar("eventos", 2)
+        t = instr.marcar("eventos", t)
+
+        return self._executar_previsao_ml(grupo, [frota.ids[i] for i in ativos], frota.health_phase[ativos], t)
+
+    def iniciar_execucao(self):
+        """Zera contadores, monitor e agenda e cria um parque novo (com históricos vazios) para uma nova execução."""
+        self.is_running = True; self.ciclo_atual = 0; self.total_falhas = 0; self.total_ticks = 0
+        self.performance_monitor.reset(); self.instrumentacao.reset(); self.inicializar_parque()
+        self.agenda = AgendaEventos(); self.resumo_publicado = None
+
+    def run_simulation_loop(self, total_cycles, continuar=False):
+        """
+        Executa ciclos até o ciclo `total_cycles` (0 = sem fim). Com `continuar=True` (simulação
+        restaurada de um snapshot) o estado atual é mantido em vez de criar um parque novo.
+        """
+        if continuar:
+            self.is_running = True
+        else:
+            self.iniciar_execucao()
         is_infinite = (total_cycles == 0)
-        while self.is_running:
-            if not is_infinite and self.ciclo_atual >= total_cycles: self.is_running = False; break
-            self.executar_ciclo()
\ No newline at end of file
+        try:
+            while self.is_running:
+                if not is_infinite and self.ciclo_atual >= total_cycles: self.is_running = False; break
+                self.executar_ciclo()
+        finally:
+            self.logger.fechar()
\ No newline at end of file
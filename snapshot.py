@@ -0,0 +1,247 @@
+import os
+import json
+import numpy as np
+
+from config import *
+from machine import Maquina
+from fleet_engine import FrotaVetorizada
+from simulator import Simulator, GrupoModelo
+from event_scheduler import AgendaEventos
+from machine_specs import especificacao
+from random_streams import base_do_modelo
+
+# Arquivo: MAGICO, tamanho do cabeçalho (uint64), cabeçalho JSON e os buffers dos arrays,
+# cada um alinhado em ALINHAMENTO bytes. A carga lê o arquivo uma vez e cria os arrays
+# diretamente sobre os bytes lidos, sem parsing nem cópias intermediárias.
+MAGICO = b"SIMSNAP\x00"
+VERSAO_FORMATO = 2
+ALINHAMENTO = 64
+
+class EstadoSimulacao:
+    """
+    Estado completo de um `Simulator` entre dois ciclos: `meta` (dicionário serializável em JSON
+    com contadores, composição, semente etc.) e `arrays` (nome -> array NumPy com máquinas,
+    fluxos aleatórios, sensores, históricos e agenda). Criado por `capturar` ou `carregar`.
+    """
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+
+    @property
+    def ciclo(self):
+        return self.meta["ciclo_atual"]
+
+    def salvar(self, caminho):
+        """Grava o estado em `caminho` (via arquivo temporário, como a floresta compilada)."""
+        descritores = []
+        offset = 0
+        for nome, array in self.arrays.items():
+            offset = -(-offset // ALINHAMENTO) * ALINHAMENTO
+            descritores.append({"nome": nome, "dtype": array.dtype.str, "forma": list(array.shape), "offset": offset})
+            offset += array.nbytes
+        cabecalho = json.dumps({"versao": VERSAO_FORMATO, "meta": self.meta, "arrays": descritores}).encode('utf-8')
+        inicio_dados = -(-(len(MAGICO) + 8 + len(cabecalho)) // ALINHAMENTO) * ALINHAMENTO
+
+        temporario = caminho + ".tmp"
+        with open(temporario, 'wb') as f:
+            f.write(MAGICO)
+            f.write(np.uint64(len(cabecalho)).tobytes())
+            f.write(cabecalho)
+            for descritor, array in zip(descritores, self.arrays.values()):
+                f.seek(inicio_dados + descritor["offset"])
+                f.write(memoryview(np.ascontiguousarray(array)).cast('B'))
+            f.truncate(inicio_dados + offset)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with open(caminho, 'rb') as f:
+            dados = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(dados)
+        if bytes(dados[:len(MAGICO)]) != MAGICO:
+            raise ValueError(f"'{caminho}' não é um snapshot da simulação.")
+        tamanho_cabecalho = int(np.frombuffer(dados, dtype=np.uint64, count=1, offset=len(MAGICO))[0])
+        cabecalho = json.loads(dados[len(MAGICO) + 8:len(MAGICO) + 8 + tamanho_cabecalho].decode('utf-8'))
+        if cabecalho["versao"] != VERSAO_FORMATO:
+            raise ValueError(f"Versão de snapshot não suportada: {cabecalho['versao']} (esperada {VERSAO_FORMATO}).")
+        inicio_dados = -(-(len(MAGICO) + 8 + tamanho_cabecalho) // ALINHAMENTO) * ALINHAMENTO
+        arrays = {}
+        for descritor in cabecalho["arrays"]:
+            dtype = np.dtype(descritor["dtype"])
+            n = int(np.prod(descritor["forma"], dtype=np.int64))
+            arrays[descritor["nome"]] = np.frombuffer(dados, dtype=dtype, count=n, offset=inicio_dados + descritor["offset"]
+                                                      ).reshape(descritor["forma"])
+        return cls(cabecalho["meta"], arrays)
+
+
+def _textos_para_array(textos):
+    return np.frombuffer("\n".join(textos).encode('utf-8'), dtype=np.uint8)
+
+def _array_para_textos(array, quantidade):
+    if quantidade == 0:
+        return []
+    return array.tobytes().decode('utf-8').split("\n")
+
+def _estado_maquinas(maquinas):
+    """Mesmo formato de `FrotaVetorizada.exportar_estado` a partir de objetos `Maquina` de um só modelo."""
+    spec = maquinas[0].spec if maquinas else None
+    n_sensores = len(spec.sensor_ids) if spec else 0
+    problemas = {id_problema: indice for indice, id_problema in enumerate(spec.problemas)} if spec else {}
+    arrays = {
+        "fator_desgaste": np.array([m.fator_desgaste for m in maquinas], dtype=np.float64),
+        "valores": np.array([[s.valor_atual for s in m.lista_sensores] for m in maquinas], dtype=np.float64).reshape(-1, n_sensores),
+        "volatilidades": np.array([[s.volatilidade for s in m.lista_sensores] for m in maquinas], dtype=np.float64).reshape(-1, n_sensores),
+        "health_phase": np.array([m.health_phase for m in maquinas], dtype=np.int64),
+        "horas_operadas": np.array([m.horas_operadas for m in maquinas], dtype=np.int64),
+        "ticks_para_proximo_teste": np.array([m.ticks_para_proximo_teste for m in maquinas], dtype=np.int64),
+        "problema_ativo": np.array([problemas[m.problema_ativo] if m.problema_ativo else -1 for m in maquinas], dtype=np.int64),
+        "tempo_reparo_restante": np.array([m.tempo_reparo_restante for m in maquinas], dtype=np.int64),
+        "chaves": np.array([m.chave for m in maquinas], dtype=np.uint64),
+        "gamas": np.array([m.gama for m in maquinas], dtype=np.uint64),
+    }
+    return [m.id for m in maquinas], arrays
+
+def _restaurar_maquinas(modelo, ids, arrays):
+    colunas = [arrays[nome].tolist() for nome in FrotaVetorizada.ARRAYS]
+    return [Maquina.de_estado(machine_id, modelo, *valores) for machine_id, *valores in zip(ids, *colunas)]
+
+def capturar(simulator):
+    """
+    Copia o estado completo de `simulator` (entre dois ciclos) para um `EstadoSimulacao`:
+    máquinas, sensores e volatilidades, fluxos aleatórios e gerações das vagas, históricos
+    do ML, agenda de eventos, contadores e monitor de desempenho. Os logs em disco e os
+    tempos da instrumentação não fazem parte do estado.
+    """
+    monitor = simulator.performance_monitor
+    eventos = simulator.agenda.eventos()
+    meta = {
+        "motor": simulator.motor,
+        "tamanho_parque": simulator.tamanho_parque,
+        "composicao": list(simulator.composicao.items()),
+        "prefixo_id": simulator.prefixo_id,
+        "seed": simulator.seed,
+        "semente_execucao": simulator.semente_execucao,
+        "primeira_vaga": simulator.primeira_vaga,
+        "instrumentacao": simulator.instrumentacao.ativa,
+        "contador_maquinas_total": simulator.contador_maquinas_total,
+        "ciclo_atual": simulator.ciclo_atual,
+        "total_falhas": simulator.total_falhas,
+        "total_ticks": simulator.total_ticks,
+        "monitor": {"total_predictions": monitor.total_predictions, "correct_predictions": monitor.correct_predictions,
+                    "false_alarms": monitor.false_alarms, "missed_risks": monitor.missed_risks,
+                    "posicao_janela": monitor.posicao_janela},
+        "tipos_eventos": [tipo for _, tipo, _ in eventos],
+        "grupos": [],
+    }
+    arrays = {
+        "agenda/horas": np.array([hora for hora, _, _ in eventos], dtype=np.int64),
+        "agenda/chaves": np.array([chave for _, _, chave in eventos], dtype=np.int64),
+        "monitor/confusao": monitor.confusao.copy(),
+        "monitor/janela": monitor.janela.copy(),
+        "monitor/confusao_ewma": monitor.confusao_ewma.copy(),
+    }
+    for k, grupo in enumerate(simulator.grupos):
+        if simulator.motor == "vetorizado":
+            ids, estado = grupo.frota.exportar_estado()
+        else:
+            ids, estado = _estado_maquinas(simulator.parque_maquinas[grupo.inicio:grupo.fim])
+        ids_historico, estado_historico = grupo.historico.exportar_estado()
+        arrays[f"grupo{k}/geracoes"] = grupo.geracoes.copy()
+        meta["grupos"].append({"modelo": grupo.modelo, "inicio": grupo.inicio, "fim": grupo.fim,
+                               "primeira_vaga": grupo.primeira_vaga,
+                               "ids": len(ids), "ids_historico": len(ids_historico),
+                               "tamanho_janela": grupo.historico.tamanho_janela})
+        arrays[f"grupo{k}/ids"] = _textos_para_array(ids)
+        arrays.update({f"grupo{k}/{nome}": array for nome, array in estado.items()})
+        arrays[f"grupo{k}/historico/ids"] = _textos_para_array(ids_historico)
+        arrays.update({f"grupo{k}/historico/{nome}": array for nome, array in estado_historico.items()})
+    return EstadoSimulacao(meta, arrays)
+
+def restaurar(estado, logger, ml_model, ramo=None, semente_ramo=None):
+    """
+    Cria um `Simulator` que continua exatamente de onde `estado` parou (`run_simulation_loop(...,
+    continuar=True)`). `logger` e `ml_model` são os mesmos parâmetros do construtor do `Simulator`.
+
+    Com `ramo` (ver `bifurcar`), a semente da execução passa a ser `semente_ramo` (ou uma derivada
+    da semente, do ciclo e do número do ramo) e os fluxos aleatórios de todas as máquinas são
+    recalculados a partir dela, de modo que cada ramo segue um caminho próprio.
+    """
+    meta, arrays = estado.meta, estado.arrays
+    simulator = Simulator(logger, ml_model, motor=meta["motor"], tamanho_parque=meta["tamanho_parque"],
+                          instrumentacao=meta["instrumentacao"], prefixo_id=meta["prefixo_id"], seed=meta["seed"],
+                          composicao=dict(meta["composicao"]), primeira_vaga=meta["primeira_vaga"])
+    simulator.semente_execucao = meta["semente_execucao"]
+    simulator.contador_maquinas_total = meta["contador_maquinas_total"]
+    simulator.ciclo_atual = meta["ciclo_atual"]
+    simulator.total_falhas = meta["total_falhas"]
+    simulator.total_ticks = meta["total_ticks"]
+    monitor = simulator.performance_monitor
+    for campo, valor in meta["monitor"].items():
+        setattr(monitor, campo, valor)
+    # Matrizes do monitor (ausentes em snapshots mais antigos; a janela só volta se tiver o mesmo tamanho)
+    if "monitor/confusao" in arrays:
+        monitor.confusao = arrays["monitor/confusao"].copy()
+        monitor.confusao_ewma = arrays["monitor/confusao_ewma"].copy()
+        if arrays["monitor/janela"].shape == monitor.janela.shape:
+            monitor.janela = arrays["monitor/janela"].copy()
+            monitor.confusao_janela = monitor.janela.sum(axis=0)
+        else:
+            monitor.posicao_janela = 0
+    monitor.posicao_janela %= monitor.janela_ciclos
+    simulator.agenda = AgendaEventos()
+    for hora, tipo, chave in zip(arrays["agenda/horas"].tolist(), meta["tipos_eventos"], arrays["agenda/chaves"].tolist()):
+        simulator.agenda.agendar(hora, tipo, chave)
+
+    if ramo is not None:
+        if semente_ramo is None:
+            semente_ramo = int(np.random.SeedSequence([meta["semente_execucao"], meta["ciclo_atual"], ramo]).generate_state(1)[0])
+        simulator.semente_execucao = semente_ramo
+
+    simulator.parque_maquinas = []
+    simulator.grupos = []
+    for k, info in enumerate(meta["grupos"]):
+        modelo = info["modelo"]
+        if modelo not in CATALOGO_MAQUINAS:
+            raise ValueError(f"O snapshot usa o modelo de máquina '{modelo}', que não está no catálogo.")
+        grupo = GrupoModelo(modelo, info["inicio"], info["fim"] - info["inicio"], simulator.modelos_ml.get(modelo),
+                            info["primeira_vaga"])
+        grupo.base_fluxos = base_do_modelo(simulator.semente_execucao, especificacao(modelo).codigo)
+        grupo.geracoes = np.array(arrays[f"grupo{k}/geracoes"], dtype=np.int64)
+        grupo.definir_operando(simulator.agenda.em_reparo)
+        ids = _array_para_textos(arrays[f"grupo{k}/ids"], info["ids"])
+        estado_maquinas = {nome: arrays[f"grupo{k}/{nome}"] for nome in FrotaVetorizada.ARRAYS}
+        if ramo is not None:
+            estado_maquinas["chaves"], estado_maquinas["gamas"] = grupo.fluxos(np.arange(len(ids)))
+        if simulator.motor == "vetorizado":
+            grupo.frota = FrotaVetorizada(modelo)
+            grupo.frota.carregar_estado(ids, estado_maquinas)
+        else:
+            simulator.parque_maquinas.extend(_restaurar_maquinas(modelo, ids, estado_maquinas))
+
+        if info["tamanho_janela"] != grupo.historico.tamanho_janela:
+            raise ValueError(f"Janela do histórico do snapshot ({info['tamanho_janela']}h) difere da atual "
+                             f"({grupo.historico.tamanho_janela}h).")
+        grupo.historico.carregar_estado(_array_para_textos(arrays[f"grupo{k}/historico/ids"], info["ids_historico"]),
+                                        {nome: arrays[f"grupo{k}/historico/{nome}"] for nome in grupo.historico.ARRAYS})
+        simulator.grupos.append(grupo)
+    return simulator
+
+def salvar_snapshot(simulator, caminho):
+    capturar(simulator).salvar(caminho)
+
+def carregar_snapshot(caminho, logger, ml_model):
+    """Restaura a simulação salva em `caminho` (ver `restaurar`)."""
+    return restaurar(EstadoSimulacao.carregar(caminho), logger, ml_model)
+
+def bifurcar(estado, num_ramos, criar_logger, ml_model, sementes=None):
+    """
+    Gera `num_ramos` continuações independentes do mesmo `estado` (um `EstadoSimulacao` ou o caminho
+    de um snapshot), sem re-simular desde o ciclo 0. `criar_logger(ramo)` devolve o `DataLogger` de
+    cada ramo (normalmente um `base_dir` por ramo). É um gerador: cada simulador é restaurado quando
+    pedido, então basta rodá-los em sequência, como em `for sim in bifurcar(...): sim.run_simulation_loop(...)`.
+    """
+    if isinstance(estado, str):
+        estado = EstadoSimulacao.carregar(estado)
+    for ramo in range(num_ramos):
+        semente_ramo = sementes[ramo] if sementes is not None else None
+        yield restaurar(estado, criar_logger(ramo), ml_model, ramo=ramo, semente_ramo=semente_ramo)
@@ -0,0 +1,10 @@
+import pytest
+
+from config import CATALOGO_MAQUINAS
+from features import verificar_paridade
+
+@pytest.mark.parametrize("modelo", list(CATALOGO_MAQUINAS))
+def test_features_online_iguais_ao_lote(modelo):
+    # `verificar_paridade` levanta AssertionError na primeira hora em que online e lote diferirem
+    linhas = verificar_paridade(num_machines=5, hours_per_machine=300, seed=123, modelo=modelo)
+    assert linhas > 0
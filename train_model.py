@@ -1,6 +1,10 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import joblib
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, ParameterGrid, ParameterSampler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 import seaborn as sns
@@ -8,81 +12,50 @@ import matplotlib.pyplot as plt
 import time
 
 from config import *
-from machine import Maquina
+from training_data import gerar_dados_treinamento
+from features import calcular_features_lote
+from compiled_forest import FlorestaCompilada, caminho_compilado
 
-def generate_training_data(num_machines, hours_per_machine):
-    total_hours = num_machines * hours_per_machine
-    print(f"Gerando dados de treinamento de {num_machines} máquinas ({total_hours} horas totais)...")
-    
-    all_records = []
-    start_time = time.time()
+def generate_training_data(num_machines, hours_per_machine, seed=None, n_workers=1, modelo=MODELO_PADRAO):
+    # A simulação de cada máquina é independente: com n_workers > 1 é distribuída em um pool de processos
+    return gerar_dados_treinamento(num_machines, hours_per_machine, seed=seed, n_workers=n_workers, modelo=modelo)
 
-    for i in range(num_machines):
-        if i % 10 == 0 and i > 0:
-            print(f"  ...simulando máquina {i}/{num_machines}")
-        
-        machine = Maquina(machine_id=f"TRAIN-{i:03d}", modelo="Prensa Hidráulica PH-300T")
-        
-        for _ in range(hours_per_machine):
-            if machine.health_phase == FASES_SAUDE["Falha"]:
-                machine.concluir_reparo()
-
-            machine.simular_tick()
-            
-            record = {
-                'machine_id': machine.id,
-                'horas_operadas': machine.horas_operadas,
-                'health_phase': machine.health_phase,
-                'fator_desgaste': machine.fator_desgaste,
-                'temp_oleo': machine.sensores["temp_oleo"].valor_atual,
-                'vibracao_motor': machine.sensores["vibracao_motor"].valor_atual,
-                'pressao_hidraulica': machine.sensores["pressao_hidraulica"].valor_atual,
-                'volatilidade_temp': machine.sensores["temp_oleo"].volatilidade,
-                'volatilidade_vibracao': machine.sensores["vibracao_motor"].volatilidade,
-                'volatilidade_pressao': machine.sensores["pressao_hidraulica"].volatilidade
-            }
-            all_records.append(record)
-            
-    print(f"Geração de dados brutos concluída em {time.time() - start_time:.2f} segundos.")
-    return pd.DataFrame(all_records)
-
-def engineer_features(df):
+def engineer_features(df, modelo=MODELO_PADRAO):
     print("Iniciando engenharia de features de série temporal...")
     start_time = time.time()
     
-    df = df.sort_values(by=['machine_id', 'horas_operadas']).reset_index(drop=True)
-    grouped = df.groupby('machine_id')
-    windows = [6, 12, 24]
-    
-    for window in windows:
-        rolling_features = grouped.rolling(window=window, min_periods=1).agg({
-            'temp_oleo': ['mean', 'std'],
-            'vibracao_motor': ['mean', 'std', 'max'],
-            'pressao_hidraulica': ['mean', 'std']
-        })
-        rolling_features.columns = [f'{col[0]}_{col[1]}_{window}h' for col in rolling_features.columns]
-        df = pd.concat([df, rolling_features.reset_index(drop=True)], axis=1)
+    # Mesmo cálculo usado pelo simulador ao vivo (features.py), em uma única passada vetorizada
+    df = calcular_features_lote(df, modelo)
 
     df.dropna(inplace=True)
     print(f"Engenharia de features concluída em {time.time() - start_time:.2f} segundos.")
     return df
 
-def train_and_save_model(df):
-    print("\nIniciando treinamento do modelo...")
-    df_train = df[df['health_phase'] != FASES_SAUDE["Falha"]].copy()
+# Hiperparâmetros do modelo salvo; a busca (`buscar_hiperparametros`) testa variações destes
+PARAMETROS_PADRAO = {"n_estimators": 150, "max_depth": 20, "min_samples_leaf": 5}
+
+def separar_treino_teste(df):
+    """Linhas de treino (sem a fase de falha), colunas de features e a divisão estratificada 75/25 usada no treino."""
+    df_train = df[df['health_phase'] != FASES_SAUDE["Falha"]]
 
     print("Distribuição das classes nos dados de treinamento:")
     print(df_train['health_phase'].value_counts())
 
     features = [col for col in df_train.columns if col not in ['machine_id', 'health_phase']]
     target = 'health_phase'
-    
+
     X = df_train[features]
     y = df_train[target]
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
-    
-    model = RandomForestClassifier(n_estimators=150, random_state=42, class_weight='balanced', n_jobs=-1, max_depth=20, min_samples_leaf=5)
+    return X_train, X_test, y_train, y_test
+
+def train_and_save_model(df, modelo=MODELO_PADRAO, parametros=None):
+    print(f"\nIniciando treinamento do modelo para '{modelo}'...")
+    X_train, X_test, y_train, y_test = separar_treino_teste(df)
+
+    parametros = {**PARAMETROS_PADRAO, **(parametros or {})}
+    model = RandomForestClassifier(random_state=42, class_weight='balanced', n_jobs=-1, **parametros)
     
     print("Treinando o RandomForest Classifier com features avançadas...")
     start_time = time.time()
@@ -106,15 +79,115 @@ def train_and_save_model(df):
     plt.xlabel('Fase Prevista')
     plt.show()
 
-    model_filename = "predictive_model.joblib"
+    # Cada modelo de máquina tem o seu arquivo (ver "arquivo_modelo_ml" no catálogo)
+    model_filename = CATALOGO_MAQUINAS[modelo]["arquivo_modelo_ml"]
     print(f"\nSalvando o modelo em '{model_filename}'...")
     joblib.dump(model, model_filename)
+    # Versão compilada (arrays NumPy) usada pelo simulador: carrega e prevê bem mais rápido
+    FlorestaCompilada.compilar(model).salvar(caminho_compilado(model_filename))
     print("Modelo salvo com sucesso!")
 
+def pasta_matriz_features(modelo, num_machines, hours_per_machine, seed):
+    """Pasta do cache da matriz de features de uma combinação de modelo, tamanho dos dados e semente."""
+    nome = "".join(c if c.isalnum() else "_" for c in modelo)
+    return os.path.join(BUSCA_PASTA_CACHE, f"{nome}-{num_machines}x{hours_per_machine}-s{seed}")
+
+def salvar_matriz_features(df, pasta):
+    """
+    Grava a divisão treino/teste de `df` em arquivos .npy (features em float32, fases em int8),
+    que os processos da busca abrem mapeados em memória: todos leem as mesmas páginas, sem cópias.
+    """
+    X_train, X_test, y_train, y_test = separar_treino_teste(df)
+    os.makedirs(pasta, exist_ok=True)
+    # float32 contíguo é o formato que as árvores do sklearn usam, então o fit não converte (nem copia) a matriz
+    np.save(os.path.join(pasta, "X_treino.npy"), np.ascontiguousarray(X_train.to_numpy(dtype=np.float32)))
+    np.save(os.path.join(pasta, "X_teste.npy"), np.ascontiguousarray(X_test.to_numpy(dtype=np.float32)))
+    np.save(os.path.join(pasta, "y_treino.npy"), y_train.to_numpy(dtype=np.int8))
+    np.save(os.path.join(pasta, "y_teste.npy"), y_test.to_numpy(dtype=np.int8))
+    # Gravado por último: marca o cache como completo
+    with open(os.path.join(pasta, "features.json"), "w", encoding="utf-8") as f:
+        json.dump(list(X_train.columns), f, ensure_ascii=False)
+    print(f"Matriz de features salva em '{pasta}' ({len(y_train)} linhas de treino, {len(y_test)} de teste).")
+
+def avaliar_configuracao(args):
+    """
+    Treina um RandomForest com `parametros` sobre a matriz mapeada em `pasta` e o avalia no conjunto de teste.
+    Roda em processos do pool, por isso é uma função de módulo e recebe uma tupla.
+    """
+    pasta, parametros = args
+    X_train = np.load(os.path.join(pasta, "X_treino.npy"), mmap_mode='r')
+    y_train = np.load(os.path.join(pasta, "y_treino.npy"), mmap_mode='r')
+    X_test = np.load(os.path.join(pasta, "X_teste.npy"), mmap_mode='r')
+    y_test = np.load(os.path.join(pasta, "y_teste.npy"), mmap_mode='r')
+
+    # Uma thread por configuração: o paralelismo da busca vem do pool de processos
+    model = RandomForestClassifier(random_state=42, class_weight='balanced', n_jobs=1, **parametros)
+    inicio = time.perf_counter()
+    model.fit(X_train, y_train)
+    tempo_treino = time.perf_counter() - inicio
+    y_pred = model.predict(X_test)
+
+    # Mesmas definições do monitor do simulador: previsão de fase mais grave que a real é alarme
+    # falso, menos grave é risco perdido
+    total = len(y_test)
+    return {"acuracia": float(np.mean(y_pred == y_test) * 100),
+            "riscos_perdidos": float(np.sum(y_pred < y_test) * 100 / total),
+            "alarmes_falsos": float(np.sum(y_pred > y_test) * 100 / total),
+            "tempo_treino_s": tempo_treino}
+
+def buscar_hiperparametros(pasta, grade=BUSCA_GRADE, n_amostras=BUSCA_AMOSTRAS, n_workers=BUSCA_PROCESSOS, seed=42):
+    """
+    Avalia configurações do RandomForest sobre a matriz de features salva em `pasta` (`salvar_matriz_features`).
+
+    Testa a grade completa ou, com `n_amostras` > 0, essa quantidade de configurações sorteadas dela.
+    As configurações são distribuídas em um pool de processos (`n_workers=0` usa todos os núcleos).
+    Cada processo recebe apenas o caminho da pasta e abre os arquivos mapeados em memória. Retorna
+    um DataFrame com a acurácia, as taxas (%) de riscos perdidos e alarmes falsos e o tempo de
+    treino de cada configuração, da maior para a menor acurácia.
+    """
+    if n_amostras > 0:
+        configuracoes = list(ParameterSampler(grade, n_iter=n_amostras, random_state=seed))
+    else:
+        configuracoes = list(ParameterGrid(grade))
+    if n_workers == 0:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(configuracoes))
+
+    print(f"\nBuscando hiperparâmetros: {len(configuracoes)} configuração(ões) em {n_workers} processo(s)...")
+    start_time = time.time()
+    tarefas = [(pasta, parametros) for parametros in configuracoes]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            resultados = list(pool.map(avaliar_configuracao, tarefas))
+    else:
+        resultados = [avaliar_configuracao(tarefa) for tarefa in tarefas]
+    print(f"Busca concluída em {time.time() - start_time:.2f} segundos.")
+
+    # dtype object: mantém valores como max_depth=None legíveis (e os inteiros sem casas decimais)
+    resultados = pd.concat([pd.DataFrame(configuracoes, dtype=object), pd.DataFrame(resultados)], axis=1)
+    resultados = resultados.sort_values(["acuracia", "riscos_perdidos"], ascending=[False, True])
+    resultados = resultados.reset_index(drop=True)
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(resultados.to_string(index=False))
+    return resultados
+
 if __name__ == "__main__":
     NUM_MAQUINAS_TREINO = 50
     HORAS_POR_MAQUINA = 5000 
+    SEMENTE = 42
+    NUM_PROCESSOS = 0  # 0 = todos os núcleos; o resultado não depende deste valor
+    MODELOS = [MODELO_PADRAO]  # ou list(CATALOGO_MAQUINAS) para treinar todos os modelos do catálogo
+    BUSCAR_HIPERPARAMETROS = False  # True = avalia a BUSCA_GRADE do config.py em vez de treinar e salvar o modelo
     
-    df_raw = generate_training_data(NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA)
-    df_featured = engineer_features(df_raw)
-    train_and_save_model(df_featured)
\ No newline at end of file
+    for modelo in MODELOS:
+        if BUSCAR_HIPERPARAMETROS:
+            # Os dados e as features só são gerados na primeira busca com a mesma combinação
+            pasta = pasta_matriz_features(modelo, NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA, SEMENTE)
+            if not os.path.exists(os.path.join(pasta, "features.json")):
+                df_raw = generate_training_data(NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA, seed=SEMENTE, n_workers=NUM_PROCESSOS, modelo=modelo)
+                salvar_matriz_features(engineer_features(df_raw, modelo), pasta)
+            buscar_hiperparametros(pasta)
+            continue
+        df_raw = generate_training_data(NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA, seed=SEMENTE, n_workers=NUM_PROCESSOS, modelo=modelo)
+        df_featured = engineer_features(df_raw, modelo)
+        train_and_save_model(df_featured, modelo)
\ No newline at end of file
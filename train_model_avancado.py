@@ -9,45 +9,18 @@ import numpy as np
 import time
 
 from config import *
-from machine import Maquina
+from training_data import gerar_dados_treinamento
+from features import calcular_features_lote
+from compiled_forest import FlorestaCompilada, caminho_compilado
 
-def generate_rich_training_data(num_machines, hours_per_machine):
+def generate_rich_training_data(num_machines, hours_per_machine, seed=None, n_workers=1):
     """
     Gera dados de várias máquinas para criar um dataset mais diverso e rico.
+    Cada máquina tem semente própria, então o resultado não depende de `n_workers`.
     """
-    total_hours = num_machines * hours_per_machine
-    print(f"Gerando dados de treinamento avançado de {num_machines} máquinas ({total_hours} horas totais)...")
-    
-    all_records = []
-    start_time = time.time()
-
-    for i in range(num_machines):
-        if i % 10 == 0 and i > 0:
-            print(f"  ...simulando máquina {i}/{num_machines}")
-        
-        machine = Maquina(machine_id=f"TRAIN-{i:03d}", modelo="Prensa Hidráulica PH-300T")
-        
-        for _ in range(hours_per_machine):
-            if machine.health_phase == FASES_SAUDE["Falha"]:
-                machine.concluir_reparo()
-
-            machine.simular_tick()
-            
-            record = {
-                'machine_id': machine.id,
-                'health_phase': machine.health_phase,
-                'fator_desgaste': machine.fator_desgaste,
-                'temp_oleo': machine.sensores["temp_oleo"].valor_atual,
-                'vibracao_motor': machine.sensores["vibracao_motor"].valor_atual,
-                'pressao_hidraulica': machine.sensores["pressao_hidraulica"].valor_atual,
-                'volatilidade_temp': machine.sensores["temp_oleo"].volatilidade,
-                'volatilidade_vibracao': machine.sensores["vibracao_motor"].volatilidade,
-                'volatilidade_pressao': machine.sensores["pressao_hidraulica"].volatilidade
-            }
-            all_records.append(record)
-            
-    print(f"Geração de dados brutos concluída em {time.time() - start_time:.2f} segundos.")
-    return pd.DataFrame(all_records)
+    df = gerar_dados_treinamento(num_machines, hours_per_machine, seed=seed, n_workers=n_workers)
+    # Este pipeline recalcula 'horas_operadas' a partir da ordem dos registros
+    return df.drop(columns=['horas_operadas'])
 
 def engineer_features(df):
     """
@@ -57,25 +30,9 @@ def engineer_features(df):
     print("Iniciando engenharia de features de série temporal...")
     start_time = time.time()
     
-    # Ordena os dados para garantir que as janelas móveis sejam calculadas corretamente
-    df = df.sort_values(by=['machine_id', 'horas_operadas']).reset_index(drop=True)
-
-    # Agrupa por máquina para que os cálculos de janela não "vazem" de uma máquina para outra
-    grouped = df.groupby('machine_id')
-
-    windows = [6, 12, 24]
-    
-    for window in windows:
-        # Calcula média, desvio padrão e máximo em janelas móveis
-        rolling_features = grouped.rolling(window=window, min_periods=1).agg({
-            'temp_oleo': ['mean', 'std'],
-            'vibracao_motor': ['mean', 'std', 'max'],
-            'pressao_hidraulica': ['mean', 'std']
-        })
-        
-        rolling_features.columns = [f'{col[0]}_{col[1]}_{window}h' for col in rolling_features.columns]
-        
-        df = pd.concat([df, rolling_features.reset_index(drop=True)], axis=1)
+    # Ordena por máquina/hora e calcula média, desvio padrão e máximo em janelas móveis
+    # sem "vazar" de uma máquina para outra (mesmo módulo usado pelo simulador ao vivo)
+    df = calcular_features_lote(df)
 
     df.dropna(inplace=True)
     
@@ -127,6 +84,8 @@ def train_and_save_model(df):
     model_filename = "predictive_model_avancado.joblib"
     print(f"\nSalvando o modelo avançado em '{model_filename}'...")
     joblib.dump(model, model_filename)
+    # Versão compilada (arrays NumPy) usada pelo simulador: carrega e prevê bem mais rápido
+    FlorestaCompilada.compilar(model).salvar(caminho_compilado(model_filename))
     print("Modelo salvo com sucesso!")
 
 # ==============================================================================
@@ -135,8 +94,10 @@ def train_and_save_model(df):
 if __name__ == "__main__":
     NUM_MAQUINAS_TREINO = 50
     HORAS_POR_MAQUINA = 5000 
+    SEMENTE = 42
+    NUM_PROCESSOS = 0  # 0 = todos os núcleos; o resultado não depende deste valor
     
-    df_raw = generate_rich_training_data(NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA)
+    df_raw = generate_rich_training_data(NUM_MAQUINAS_TREINO, HORAS_POR_MAQUINA, seed=SEMENTE, n_workers=NUM_PROCESSOS)
     
     df_raw['horas_operadas'] = df_raw.groupby('machine_id').cumcount()
     
@@ -0,0 +1,90 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from config import *
+from machine import Maquina
+from machine_specs import especificacao
+
+def semente_da_maquina(seed, indice):
+    """Semente própria de cada máquina, derivada da semente da execução e do índice da máquina."""
+    return int(np.random.SeedSequence([seed, indice]).generate_state(1)[0])
+
+def simular_maquina_treino(args):
+    """
+    Simula uma máquina de treino por `hours_per_machine` horas (reparando-a sempre que falha)
+    e devolve a trajetória como arrays compactos, um por coluna.
+    Roda em processos do pool, por isso é uma função de módulo e recebe uma tupla.
+    """
+    indice, semente, hours_per_machine, modelo = args
+    random.seed(semente)
+    machine = Maquina(machine_id=f"TRAIN-{indice:03d}", modelo=modelo)
+
+    horas_operadas = np.empty(hours_per_machine, dtype=np.int32)
+    health_phase = np.empty(hours_per_machine, dtype=np.int8)
+    fator_desgaste = np.empty(hours_per_machine)
+    sensores = machine.lista_sensores
+    valores = np.empty((hours_per_machine, len(sensores)))
+    volatilidades = np.empty((hours_per_machine, len(sensores)))
+
+    for h in range(hours_per_machine):
+        if machine.health_phase == FASES_SAUDE["Falha"]:
+            machine.concluir_reparo()
+
+        machine.simular_tick()
+
+        horas_operadas[h] = machine.horas_operadas
+        health_phase[h] = machine.health_phase
+        fator_desgaste[h] = machine.fator_desgaste
+        for j, sensor in enumerate(sensores):
+            valores[h, j] = sensor.valor_atual
+            volatilidades[h, j] = sensor.volatilidade
+
+    return machine.id, horas_operadas, health_phase, fator_desgaste, valores, volatilidades
+
+def gerar_dados_treinamento(num_machines, hours_per_machine, seed=None, n_workers=1,
+                            modelo=MODELO_PADRAO):
+    """
+    Gera os dados brutos de treino de `num_machines` máquinas independentes.
+
+    Cada máquina usa uma semente própria derivada de `seed`, então o resultado é o mesmo
+    para qualquer `n_workers`. Com `n_workers` > 1 as máquinas são distribuídas em um pool
+    de processos (`n_workers=0` usa todos os núcleos). As colunas dos sensores são as de `modelo`.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    if n_workers == 0:
+        n_workers = os.cpu_count() or 1
+
+    total_hours = num_machines * hours_per_machine
+    print(f"Gerando dados de treinamento de {num_machines} máquinas ({total_hours} horas totais, "
+          f"semente {seed}, {n_workers} processo(s))...")
+    start_time = time.time()
+
+    tarefas = [(i, semente_da_maquina(seed, i), hours_per_machine, modelo) for i in range(num_machines)]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunksize = max(1, num_machines // (4 * n_workers))
+            resultados = list(pool.map(simular_maquina_treino, tarefas, chunksize=chunksize))
+    else:
+        resultados = [simular_maquina_treino(tarefa) for tarefa in tarefas]
+
+    machine_ids, horas_operadas, health_phase, fator_desgaste, valores, volatilidades = zip(*resultados)
+    valores = np.concatenate(valores)
+    volatilidades = np.concatenate(volatilidades)
+    spec = especificacao(modelo)
+    colunas = {
+        'machine_id': np.repeat(machine_ids, hours_per_machine),
+        'horas_operadas': np.concatenate(horas_operadas),
+        'health_phase': np.concatenate(health_phase),
+        'fator_desgaste': np.concatenate(fator_desgaste),
+    }
+    colunas.update({sensor_id: valores[:, j] for j, sensor_id in enumerate(spec.sensor_ids)})
+    colunas.update({coluna: volatilidades[:, j] for j, coluna in enumerate(spec.colunas_volatilidade)})
+    df = pd.DataFrame(colunas)
+
+    print(f"Geração de dados brutos concluída em {time.time() - start_time:.2f} segundos.")
+    return df